@@ -1,163 +1,444 @@
+import asyncio
+import json
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
 import requests
 import pandas as pd
 import time
 import xml.etree.ElementTree as ET
-from urllib.parse import quote_plus
+from contextlib import contextmanager
+from urllib.parse import quote_plus, urljoin
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 
-class MedicalScraper:
-    def __init__(self):
-        # Configuration de Selenium avec ChromeDriver
+COLUMNS = ["source", "title", "abstract", "journal", "publication_date", "doi", "url"]
+SOURCES = ("PubMed", "INSERM", "WHO")
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) aka_care_quiz"
+
+# Pages de résultats des sources web : URL de recherche et sélecteur CSS d'un résultat
+SEARCH_PAGES = {
+    "INSERM": {
+        "url": "https://www.inserm.fr/?s={query}",
+        "selector": ".list-articles .article-list-item",
+    },
+    "WHO": {
+        "url": "https://www.who.int/fr/home/search-results?indexCatalogue=genericsearchindex1&searchQuery={query}&wordsMode=AnyWord",
+        "selector": ".sf-search-result",
+    },
+}
+# Pages de résultats enregistrées par `--save-html`, analysées par tests/test_scraper_parsers.py
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _result(source, title, summary, url):
+    return {
+        "source": source,
+        "title": title,
+        "abstract": summary,
+        "journal": source,
+        "publication_date": "Non spécifiée",
+        "doi": None,
+        "url": url
+    }
+
+
+def parse_search_results(html, source, base_url=None):
+    """
+    Articles d'une page de résultats INSERM ou WHO (HTML brut) : titre (h2),
+    lien (premier a, rendu absolu) et résumé (premier p) de chaque résultat.
+    Les résultats incomplets sont ignorés, comme avec le navigateur.
+    """
+    base_url = base_url or SEARCH_PAGES[source]["url"]
+    soup = BeautifulSoup(html, "html.parser")
+    articles = []
+    for item in soup.select(SEARCH_PAGES[source]["selector"]):
+        title, link, summary = item.find("h2"), item.find("a", href=True), item.find("p")
+        if title is None or link is None or summary is None:
+            continue
+        text = lambda tag: " ".join(tag.get_text(" ").split())
+        articles.append(_result(source, text(title), text(summary), urljoin(base_url, link["href"])))
+    return articles
+
+
+class DriverPool:
+    """
+    Pool de navigateurs Chrome headless, démarrés à la demande (au plus `size`) :
+    chaque source navigateur emprunte le sien, ce qui permet de scraper INSERM et
+    WHO en parallèle. Aucun Chrome n'est lancé tant qu'aucune source ne le demande.
+    """
+
+    def __init__(self, size=2, page_timeout=30):
+        self.size = size
+        self.page_timeout = page_timeout
+        self.idle = queue.Queue()
+        self.drivers = []
+        self.lock = threading.Lock()
+        self.driver_path = None
+
+    def _start(self):
+        # Selenium n'est importé qu'au premier navigateur : le mode HTTP s'en passe
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+
         options = webdriver.ChromeOptions()
         options.add_argument("--headless")  # Exécuter en arrière-plan
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
-        
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        with self.lock:
+            if self.driver_path is None:
+                self.driver_path = ChromeDriverManager().install()
+        driver = webdriver.Chrome(service=Service(self.driver_path), options=options)
+        driver.set_page_load_timeout(self.page_timeout)  # Un thread bloqué finit par rendre la main
+        return driver
+
+    @contextmanager
+    def driver(self):
+        """Emprunte un navigateur libre, en démarre un si le pool n'est pas plein, sinon attend."""
+        try:
+            driver = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                start = len(self.drivers) < self.size
+                if start:
+                    self.drivers.append(None)  # Place réservée pendant le démarrage
+            if start:
+                try:
+                    driver = self._start()
+                except Exception:
+                    with self.lock:
+                        self.drivers.remove(None)
+                    raise
+                with self.lock:
+                    self.drivers[self.drivers.index(None)] = driver
+            else:
+                driver = self.idle.get()
+        try:
+            yield driver
+        finally:
+            self.idle.put(driver)
+
+    def close(self):
+        with self.lock:
+            drivers, self.drivers = [d for d in self.drivers if d is not None], []
+        for driver in drivers:
+            driver.quit()
+        self.idle = queue.Queue()
+
+
+def _normalize_url(url):
+    return re.sub(r"^https?://(www\.)?", "", str(url).strip().lower()).rstrip("/")
+
+
+def article_keys(article):
+    """Clés d'identité d'un article : DOI, URL et titre normalisé (assez long pour être discriminant)."""
+    keys = set()
+    if article.get("doi"):
+        keys.add("doi:" + str(article["doi"]).strip().lower())
+    if article.get("url"):
+        keys.add("url:" + _normalize_url(article["url"]))
+    title = " ".join(re.findall(r"\w+", str(article.get("title") or "").casefold()))
+    if len(title) >= 30:
+        keys.add("title:" + title)
+    return keys
+
+
+class ArticleDedup:
+    """
+    Fusion en continu des articles des différentes sources : chaque lot est
+    ajouté dès son arrivée, les doublons (même DOI, même URL ou même titre)
+    sont écartés au passage. Le premier arrivé est conservé. Les lots peuvent
+    venir de plusieurs threads (`lock`).
+    """
+
+    def __init__(self):
+        self.seen = set()
+        self.rows = []
+        self.duplicates = 0
+        self.lock = threading.RLock()
+
+    def add(self, articles):
+        """Ajoute un lot ; renvoie les articles nouveaux."""
+        new = []
+        with self.lock:
+            for article in articles:
+                keys = article_keys(article)
+                if keys & self.seen:
+                    self.duplicates += 1
+                    continue
+                self.seen |= keys
+                self.rows.append(article)
+                new.append(article)
+        return new
+
+    def to_frame(self):
+        """Articles retenus, regroupés par source dans l'ordre de `SOURCES`."""
+        df = pd.DataFrame(self.rows, columns=COLUMNS)
+        order = {source: i for i, source in enumerate(SOURCES)}
+        return df.sort_values("source", key=lambda s: s.map(order), kind="stable").reset_index(drop=True)
+
+
+class MedicalScraper:
+    def __init__(self, browsers=2, timeouts=None, mode="http", browser_fallback=True):
+        # INSERM et WHO : "http" (HTML analysé avec BeautifulSoup) ou "browser" (Selenium)
+        self.mode = mode
+        self.browser_fallback = browser_fallback
+        # Navigateurs Selenium (ChromeDriver), démarrés seulement quand une source en a besoin
+        self.drivers = DriverPool(size=browsers)
+        self.page_timeout = 15  # Attente max. des résultats dans une page
+        # Threads des sources INSERM et WHO, hors de l'exécuteur par défaut d'asyncio
+        # (que `asyncio.run` attendrait même après un dépassement de délai)
+        self.executor = ThreadPoolExecutor(max_workers=browsers, thread_name_prefix="scraper")
 
         # Base PubMed API
         self.base_pubmed = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
         self.email = "hmbow@aimsammi.org"
         self.tool = "aka_care_quiz"
-        self.sleep_time = 1  # Pause pour éviter les blocages
-
-    ### 🔹 **1️⃣ Scraper PubMed (API)**
-    def search_pubmed(self, query, retmax=50):
+        # Limite NCBI : 3 requêtes/s, 10 avec une clé d'API
+        self.api_key = os.environ.get("NCBI_API_KEY")
+        self.requests_per_second = 10 if self.api_key else 3
+        self.fetch_batch = 20  # PMIDs par requête efetch
+        # Délai total par source : une source lente ou en panne n'arrête pas les autres
+        self.timeouts = {"PubMed": 120, "INSERM": 60, "WHO": 60, **(timeouts or {})}
+        self.report = {}
+
+    ### 🔹 **1️⃣ Scraper PubMed (API, HTTP asynchrone)**
+    def _pubmed_url(self, endpoint, **params):
+        params.update(tool=self.tool, email=self.email)
+        if self.api_key:
+            params["api_key"] = self.api_key
+        return f"{self.base_pubmed}{endpoint}?" + "&".join(f"{k}={quote_plus(str(v))}" for k, v in params.items())
+
+    async def _get(self, session, url):
+        """GET en respectant le débit autorisé par NCBI ; renvoie (code, texte)."""
+        async with self._rate_lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_request - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_request = max(loop.time(), self._next_request) + 1 / self.requests_per_second
+        async with session.get(url) as response:
+            return response.status, await response.text()
+
+    async def search_pubmed(self, session, query, retmax=50):
         """Cherche des articles sur PubMed et récupère leurs PMIDs"""
-        query_url = f"{self.base_pubmed}esearch.fcgi?db=pubmed&term={quote_plus(query)}&retmax={retmax}&retmode=json"
-        response = requests.get(query_url)
-        time.sleep(self.sleep_time)
-
-        if response.status_code == 200:
-            data = response.json()
-            pmids = data.get('esearchresult', {}).get('idlist', [])
+        status, text = await self._get(session, self._pubmed_url(
+            "esearch.fcgi", db="pubmed", term=query, retmax=retmax, retmode="json"))
+        if status == 200:
+            pmids = json.loads(text).get('esearchresult', {}).get('idlist', [])
             print(f"🔍 {len(pmids)} articles trouvés sur PubMed")
             return pmids
         else:
-            print(f"⚠️ Erreur API PubMed (Code {response.status_code})")
+            print(f"⚠️ Erreur API PubMed (Code {status})")
             return []
 
-    def fetch_pubmed_details(self, pmid):
-        """Récupère les détails d'un article PubMed"""
-        fetch_url = f"{self.base_pubmed}efetch.fcgi?db=pubmed&id={pmid}&retmode=xml"
-        response = requests.get(fetch_url)
-        time.sleep(self.sleep_time)
-
-        if response.status_code == 200:
-            return response.text
+    async def fetch_pubmed_details(self, session, pmids):
+        """Récupère le XML d'un lot d'articles PubMed (une seule requête efetch)"""
+        status, text = await self._get(session, self._pubmed_url(
+            "efetch.fcgi", db="pubmed", id=",".join(pmids), retmode="xml"))
+        if status == 200:
+            return text
         else:
-            print(f"⚠️ Erreur récupération article PubMed {pmid} (Code {response.status_code})")
+            print(f"⚠️ Erreur récupération articles PubMed {pmids[0]}… (Code {status})")
             return None
 
-    def parse_pubmed_xml(self, xml_data):
-        """Analyse XML pour extraire les informations d'un article PubMed"""
+    def _parse_pubmed_article(self, article):
+        return {
+            'source': "PubMed",
+            'title': article.findtext(".//ArticleTitle"),
+            'abstract': " ".join([abstract.text for abstract in article.findall(".//AbstractText") if abstract.text]),
+            'journal': article.findtext(".//Journal/Title"),
+            'publication_date': article.findtext(".//PubDate/Year"),
+            'doi': next((id.text for id in article.findall(".//ArticleId") if id.get("IdType") == "doi"), None),
+            'url': f"https://pubmed.ncbi.nlm.nih.gov/{article.findtext('.//PMID')}/"
+        }
+
+    def parse_pubmed_articles(self, xml_data):
+        """Analyse le XML efetch pour extraire les informations de chaque article PubMed"""
         if xml_data is None:
-            return None
+            return []
 
         try:
             root = ET.fromstring(xml_data)
-            return {
-                'source': "PubMed",
-                'title': root.findtext(".//ArticleTitle"),
-                'abstract': " ".join([abstract.text for abstract in root.findall(".//AbstractText") if abstract.text]),
-                'journal': root.findtext(".//Journal/Title"),
-                'publication_date': root.findtext(".//PubDate/Year"),
-                'doi': next((id.text for id in root.findall(".//ArticleId") if id.get("IdType") == "doi"), None),
-                'url': f"https://pubmed.ncbi.nlm.nih.gov/{root.findtext('.//PMID')}/"
-            }
-
         except ET.ParseError as e:
             print(f"⚠️ Erreur XML: {e}")
-            return None
+            return []
+        articles = root.findall(".//PubmedArticle") or [root]
+        return [self._parse_pubmed_article(article) for article in articles]
 
-    def collect_pubmed(self, query, max_results=50):
-        """Recherche et collecte les articles PubMed"""
-        pmids = self.search_pubmed(query, retmax=max_results)
+    def parse_pubmed_xml(self, xml_data):
+        """Analyse XML pour extraire les informations d'un article PubMed"""
+        articles = self.parse_pubmed_articles(xml_data)
+        return articles[0] if articles else None
+
+    async def acollect_pubmed(self, query, max_results=50, sink=None):
+        """
+        Recherche et collecte les articles PubMed : les détails sont demandés par
+        lots de `fetch_batch` PMIDs, en parallèle dans la limite de débit NCBI.
+        Chaque lot est passé à `sink` dès sa réception.
+        """
+        self._rate_lock = asyncio.Lock()
+        self._next_request = 0.0
         articles = []
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            pmids = await self.search_pubmed(session, query, retmax=max_results)
 
-        for pmid in pmids:
-            xml_data = self.fetch_pubmed_details(pmid)
-            article_data = self.parse_pubmed_xml(xml_data)
-            if article_data:
-                articles.append(article_data)
+            async def fetch(batch):
+                parsed = self.parse_pubmed_articles(await self.fetch_pubmed_details(session, batch))
+                articles.extend(parsed)
+                if sink:
+                    sink(parsed)
 
-        return pd.DataFrame(articles)
+            await asyncio.gather(*(fetch(pmids[i:i + self.fetch_batch])
+                                   for i in range(0, len(pmids), self.fetch_batch)))
+        return pd.DataFrame(articles, columns=COLUMNS)
 
-    ### 🔹 **2️⃣ Scraper INSERM (Selenium)**
-    def collect_inserm(self, query="Maladie rénale chronique"):
-        """Scrape les articles sur INSERM avec Selenium"""
-        search_url = f"https://www.inserm.fr/?s={quote_plus(query)}"
-        self.driver.get(search_url)
-        time.sleep(self.sleep_time)
+    def collect_pubmed(self, query, max_results=50):
+        """Recherche et collecte les articles PubMed"""
+        return asyncio.run(self.acollect_pubmed(query, max_results))
+
+    ### 🔹 **Pages de résultats : HTTP + BeautifulSoup, navigateur en secours**
+    def _scrape_results(self, search_url, selector, source, sink=None, cancelled=None):
+        """
+        Articles d'une page de résultats rendue par un navigateur, une fois ses
+        éléments `selector` affichés ; chacun est passé à `sink` dès sa lecture.
+        """
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
 
         articles = []
-        elements = self.driver.find_elements(By.CSS_SELECTOR, ".list-articles .article-list-item")
-
-        for article in elements:
+        with self.drivers.driver() as driver:
+            driver.get(search_url)
             try:
-                title = article.find_element(By.TAG_NAME, "h2").text
-                link = article.find_element(By.TAG_NAME, "a").get_attribute("href")
-                summary = article.find_element(By.TAG_NAME, "p").text
-
-                articles.append({
-                    "source": "INSERM",
-                    "title": title,
-                    "abstract": summary,
-                    "journal": "INSERM",
-                    "publication_date": "Non spécifiée",
-                    "doi": None,
-                    "url": link
-                })
-            except:
-                continue
-
+                # Attente des résultats plutôt qu'une pause fixe
+                WebDriverWait(driver, self.page_timeout).until(
+                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, selector)))
+            except TimeoutException:
+                print(f"⚠️ Aucun résultat affiché sur {source}")
+                return articles
+
+            for article in driver.find_elements(By.CSS_SELECTOR, selector):
+                if cancelled is not None and cancelled.is_set():
+                    break
+                try:
+                    title = article.find_element(By.TAG_NAME, "h2").text
+                    link = article.find_element(By.TAG_NAME, "a").get_attribute("href")
+                    summary = article.find_element(By.TAG_NAME, "p").text
+                except Exception:
+                    continue
+                articles.append(_result(source, title, summary, urljoin(search_url, link)))
+                if sink:
+                    sink(articles[-1:])
+        return articles
+
+    def fetch_html(self, url):
+        """HTML brut d'une page (sans exécuter son JavaScript), ou None en cas d'échec"""
+        try:
+            response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=self.page_timeout)
+        except requests.RequestException as e:
+            print(f"⚠️ Erreur HTTP {url} : {e}")
+            return None
+        if response.status_code != 200:
+            print(f"⚠️ Erreur HTTP {url} (Code {response.status_code})")
+            return None
+        return response.text
+
+    def collect_search_page(self, source, query, sink=None, cancelled=None):
+        """
+        Articles de la page de résultats de `source` : en mode "http", la page est
+        téléchargée et analysée avec BeautifulSoup ; si elle ne contient aucun
+        résultat (rendue par JavaScript, bloquée…), un navigateur est démarré en
+        secours. En mode "browser", le navigateur sert directement. Les articles
+        sont passés à `sink` dès leur analyse ; `cancelled` (threading.Event)
+        arrête la collecte à l'étape suivante.
+        """
+        page = SEARCH_PAGES[source]
+        search_url = page["url"].format(query=quote_plus(query))
+        if self.mode == "http":
+            html = self.fetch_html(search_url)
+            articles = parse_search_results(html, source, search_url) if html else []
+            if articles and sink:
+                sink(articles)
+            if articles or not self.browser_fallback or (cancelled is not None and cancelled.is_set()):
+                return articles
+            print(f"🌐 {source} : aucun résultat dans le HTML, passage au navigateur")
+        return self._scrape_results(search_url, page["selector"], source, sink, cancelled)
+
+    ### 🔹 **2️⃣ Scraper INSERM**
+    def collect_inserm(self, query="Maladie rénale chronique"):
+        """Scrape les articles sur INSERM"""
+        articles = self.collect_search_page("INSERM", query)
         print(f"🔍 {len(articles)} articles trouvés sur INSERM")
-        return pd.DataFrame(articles)
+        return pd.DataFrame(articles, columns=COLUMNS)
 
-    ### 🔹 **3️⃣ Scraper OMS (WHO) avec Selenium**
+    ### 🔹 **3️⃣ Scraper OMS (WHO)**
     def collect_oms(self, query="rénale"):
-        """Scrape les articles de l'OMS avec Selenium"""
-        search_url = f"https://www.who.int/fr/home/search-results?indexCatalogue=genericsearchindex1&searchQuery={quote_plus(query)}&wordsMode=AnyWord"
-        self.driver.get(search_url)
-        time.sleep(self.sleep_time)
-
-        articles = []
-        elements = self.driver.find_elements(By.CSS_SELECTOR, ".sf-search-result")
-
-        for article in elements:
-            try:
-                title = article.find_element(By.TAG_NAME, "h2").text
-                link = article.find_element(By.TAG_NAME, "a").get_attribute("href")
-                summary = article.find_element(By.TAG_NAME, "p").text
-
-                articles.append({
-                    "source": "WHO",
-                    "title": title,
-                    "abstract": summary,
-                    "journal": "WHO",
-                    "publication_date": "Non spécifiée",
-                    "doi": None,
-                    "url": f"https://www.who.int{link}" if link.startswith("/") else link
-                })
-            except:
-                continue
-
+        """Scrape les articles de l'OMS"""
+        articles = self.collect_search_page("WHO", query)
         print(f"🔍 {len(articles)} articles trouvés sur WHO")
-        return pd.DataFrame(articles)
+        return pd.DataFrame(articles, columns=COLUMNS)
+
+    ### 🔹 **4️⃣ Fusionner toutes les sources (en parallèle)**
+    async def acollect_all_sources(self, query, max_results=50, sources=SOURCES):
+        """
+        Collecte les sources en même temps (PubMed en HTTP asynchrone, INSERM et
+        WHO chacune dans son thread) et fusionne leurs articles au fil de
+        l'eau, sans doublons. Chaque source a son délai (`timeouts`) : en cas de
+        dépassement ou d'erreur, elle est ignorée et les articles déjà reçus sont
+        conservés. `self.report` résume la collecte par source.
+        """
+        dedup = ArticleDedup()
+        self.report = {}
+
+        async def run(source):
+            start = time.perf_counter()
+            added = [0]
+            cancelled = threading.Event()
+
+            def sink(articles):
+                # Appelé depuis la boucle (PubMed) ou le thread de la source (INSERM, WHO)
+                with dedup.lock:
+                    if not cancelled.is_set():
+                        added[0] += len(dedup.add(articles))
 
-    ### 🔹 **4️⃣ Fusionner toutes les sources**
-    def collect_all_sources(self, query, max_results=50):
+            try:
+                if source == "PubMed":
+                    task = self.acollect_pubmed(query, max_results, sink=sink)
+                else:
+                    task = self._in_thread(source, query, sink, cancelled)
+                await asyncio.wait_for(task, self.timeouts[source])
+                status = "ok"
+            except asyncio.TimeoutError:
+                status = "délai dépassé"
+                print(f"⏱️ {source} : délai de {self.timeouts[source]} s dépassé")
+            except Exception as e:
+                status = f"erreur : {e}"
+                print(f"⚠️ {source} ignorée : {e}")
+            with dedup.lock:
+                cancelled.set()  # Après le rapport, le thread de la source ne transmet plus rien
+            self.report[source] = {"statut": status, "articles": added[0],
+                                   "duree_s": round(time.perf_counter() - start, 2)}
+
+        await asyncio.gather(*(run(source) for source in sources))
+        self.report["doublons"] = dedup.duplicates
+        return dedup.to_frame()
+
+    async def _in_thread(self, source, query, sink, cancelled):
+        # HTTP et Selenium sont bloquants : le scraping tourne dans un thread, qui passe
+        # chaque article analysé à `sink`. Après un dépassement, `cancelled` l'arrête à
+        # l'étape suivante et il rend son éventuel navigateur au pool.
+        articles = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.collect_search_page, source, query, sink, cancelled)
+        print(f"🔍 {len(articles)} articles trouvés sur {source}")
+
+    def collect_all_sources(self, query, max_results=50, sources=SOURCES):
         """Récupère les articles de PubMed, INSERM et WHO"""
-        df_pubmed = self.collect_pubmed(query, max_results)
-        df_inserm = self.collect_inserm(query)
-        df_oms = self.collect_oms(query)
-
-        all_articles = pd.concat([df_pubmed, df_inserm, df_oms], ignore_index=True)
-        return all_articles
+        return asyncio.run(self.acollect_all_sources(query, max_results, sources))
 
     def save_to_csv(self, dataframe, filename="articles_medecine.csv"):
         """Sauvegarde les résultats en CSV"""
@@ -168,25 +449,56 @@ class MedicalScraper:
             print("⚠️ Aucun article trouvé, fichier non sauvegardé.")
 
     def close_driver(self):
-        """Ferme Selenium"""
-        self.driver.quit()
+        """
+        Ferme les navigateurs Selenium, après la fin des pages en cours de
+        chargement dans les threads (bornée par les délais de page) : un thread
+        arrêté par un dépassement peut encore utiliser son navigateur.
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.drivers.close()
 
 # 🎯 **Exécution**
 if __name__ == "__main__":
-    scraper = MedicalScraper()
-
-    # 🔍 **Requête**
-    query = "Maladie rénale chronique"
-
-    # 📥 **Collecte de toutes les sources**
-    articles_df = scraper.collect_all_sources(query, max_results=50)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Collecte d'articles sur les maladies rénales (PubMed, INSERM, WHO)")
+    parser.add_argument("--query", default="Maladie rénale chronique")
+    parser.add_argument("--max-results", type=int, default=50, help="Articles PubMed au maximum")
+    parser.add_argument("--sources", nargs="+", choices=SOURCES, default=list(SOURCES))
+    parser.add_argument("--mode", choices=("http", "browser"), default="http",
+                        help="INSERM/WHO : HTML analysé avec BeautifulSoup, ou navigateur Selenium")
+    parser.add_argument("--no-browser-fallback", action="store_true",
+                        help="En mode http, ne jamais démarrer de navigateur")
+    parser.add_argument("--output", default="articles_maladies_renales.csv")
+    parser.add_argument("--save-html", nargs="?", const=FIXTURES_DIR, metavar="DOSSIER",
+                        help="Enregistrer les pages de résultats INSERM/WHO brutes puis quitter "
+                             "(par défaut dans fixtures/, pages utilisées par les tests)")
+    args = parser.parse_args()
+
+    scraper = MedicalScraper(mode=args.mode, browser_fallback=not args.no_browser_fallback)
+
+    if args.save_html:
+        os.makedirs(args.save_html, exist_ok=True)
+        for source in SEARCH_PAGES:
+            html = scraper.fetch_html(SEARCH_PAGES[source]["url"].format(query=quote_plus(args.query)))
+            if html:
+                path = os.path.join(args.save_html, f"{source.lower()}_search.html")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(html)
+                print(f"✅ {path} : {len(parse_search_results(html, source))} articles analysés")
+        raise SystemExit(0)
+
+    # 📥 **Collecte des sources**
+    articles_df = scraper.collect_all_sources(args.query, max_results=args.max_results, sources=args.sources)
+    for source, summary in scraper.report.items():
+        print(f"   {source} : {summary}")
 
     # 💾 **Sauvegarde**
-    scraper.save_to_csv(articles_df, "articles_maladies_renales.csv")
+    scraper.save_to_csv(articles_df, args.output)
 
     # 👀 **Aperçu**
     print("\n📊 Aperçu des données collectées :")
     print(articles_df.head())
 
-    # 🔄 **Fermer Selenium**
-    scraper.close_driver()
\ No newline at end of file
+    # 🔄 **Fermer Selenium (s'il a été démarré)**
+    scraper.close_driver()
@@ -1,12 +1,74 @@
+"""Fine-tuning de LLaMA 2 sur les paires (abstract, QCM) et génération de QCM.
+
+Chaîne de données :
+- tokenisation sans padding (le padding est fait par lot), mise en cache sur
+  disque et réutilisée d'une exécution à l'autre tant que les données, le
+  tokenizer et `max_length` ne changent pas ;
+- `--pipeline bucket` : lots regroupés par longueur (`LengthGroupedSampler`) et
+  padding dynamique au plus long exemple du lot ;
+- `--pipeline pack` : les exemples courts sont regroupés (first-fit
+  decreasing) en séquences d'au plus `max_length` tokens, les `position_ids`
+  repartant de 0 à chaque exemple ; les lots n'ont ni `attention_mask` ni
+  cache KV, si bien que transformers déduit les frontières des `position_ids` et
+  qu'aucun exemple ne voit les précédents (flash attention « varlen » si
+  `flash_attn` est installé sur GPU, masque par blocs sinon) ;
+- `--pipeline max_length` : l'ancien comportement (padding fixe à 512), gardé
+  pour comparaison.
+Le collator est celui d'un modèle causal : `labels` = `input_ids`, -100 sur
+le padding et, en `pack`, sur le premier token de chaque exemple regroupé.
+
+Avec `--lora`, seuls des adaptateurs LoRA sont entraînés (gradient
+checkpointing activé, poids de base en 4 bits avec `--load-in-4bit`) et seul
+l'adaptateur est sauvegardé ; `QaLlm.load_adapter` le charge ensuite sur le
+modèle de base partagé. `--smoke` fait un court entraînement LoRA sur CPU avec
+un modèle minuscule.
+
+`generate_qcms` génère par lots (padding à gauche, cache KV,
+`max_new_tokens`) sur le périphérique disponible, CPU compris, et renvoie les
+QCM au fil des lots ; `--generate N` l'applique aux N premiers abstracts.
+
+Exemples :
+    python generate_qcm_with_llama2.py --benchmark 20            # tokens/s des trois chaînes
+    python generate_qcm_with_llama2.py --pipeline pack --batch-size 4
+    python generate_qcm_with_llama2.py --lora --load-in-4bit     # QLoRA
+    python generate_qcm_with_llama2.py --smoke
+    python generate_qcm_with_llama2.py --generate 16 --adapter ./llama2_qcm_lora
+"""
+import argparse
+import hashlib
+import math
+import os
+import time
+
 import torch
-from datasets import Dataset, load_dataset
-from transformers import AutoModelForCausalLM, AutoTokenizer, TrainingArguments, Trainer, DataCollatorForSeq2Seq
+from datasets import Dataset, load_from_disk
+from transformers import AutoModelForCausalLM, AutoTokenizer, TrainingArguments, Trainer
 import pandas as pd
 from clean_text import clean_text
 
-# Charger les articles collectés
-df = pd.read_csv("articles_maladies_renales.csv")
+MODEL_NAME = "meta-llama/Llama-2-7b-chat-hf"
+DATA_PATH = "articles_maladies_renales.csv"
+OUTPUT_DIR = "./llama2_qcm_finetuned"
+ADAPTER_DIR = "./llama2_qcm_lora"
+TINY_MODEL = "hf-internal-testing/tiny-random-LlamaForCausalLM"
+LORA_TARGET_MODULES = ["q_proj", "k_proj", "v_proj", "o_proj"]
+TOKEN_CACHE_DIR = ".token_cache"
+MAX_LENGTH = 512
+PIPELINES = ("max_length", "bucket", "pack")
+
 
+def load_examples(path=DATA_PATH, question_column="qcm"):
+    """Charge les articles collectés et nettoie les abstracts."""
+    df = pd.read_csv(path)
+
+    # Appliquer le nettoyage sur les abstracts en anglais et français
+    df["abstract_clean"] = df["abstract"].apply(clean_text)
+    df["abstract_fr_clean"] = df["abstract_fr"].apply(clean_text)
+
+    # Supprimer les lignes avec abstracts vides
+    df = df[df["abstract_clean"] != ""]
+    df = df[df["abstract_fr_clean"] != ""]
+    return df.assign(qcm=df[question_column])
 
 
 # Charger les données en Pandas et les convertir en dataset Hugging Face
@@ -17,81 +79,416 @@ def prepare_dataset(df):
     }
     return Dataset.from_dict(data)
 
-# Charger et tokenizer les données
-def tokenize_function(examples, tokenizer):
-    inputs = [f"Contexte: {c}\nQuestion: {q}" for c, q in zip(examples["context"], examples["question"])]
-    return tokenizer(inputs, padding="max_length", truncation=True, max_length=512)
 
+def format_example(context, question):
+    return f"Contexte: {context}\nQuestion: {question}"
 
-# Appliquer le nettoyage sur les abstracts en anglais et français
-df["abstract_clean"] = df["abstract"].apply(clean_text)
-df["abstract_fr_clean"] = df["abstract_fr"].apply(clean_text)
 
-# Supprimer les lignes avec abstracts vides
-df = df[df["abstract_clean"] != ""]
-df = df[df["abstract_fr_clean"] != ""]
+# Tokenisation sans padding : la longueur de chaque exemple sert au regroupement des lots
+def tokenize_function(examples, tokenizer, max_length=MAX_LENGTH):
+    inputs = [format_example(c, q) for c, q in zip(examples["context"], examples["question"])]
+    tokens = tokenizer(inputs, truncation=True, max_length=max_length - 1)
+    # Le modèle doit apprendre à terminer le QCM
+    tokens["input_ids"] = [ids + [tokenizer.eos_token_id] for ids in tokens["input_ids"]]
+    tokens["length"] = [len(ids) for ids in tokens["input_ids"]]
+    return {"input_ids": tokens["input_ids"], "length": tokens["length"]}
 
-# Configuration du modèle et du tokenizer
-MODEL_NAME = "meta-llama/Llama-2-7b-chat-hf"
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForCausalLM.from_pretrained(MODEL_NAME, torch_dtype=torch.float16, device_map="auto")
+
+def tokenize_dataset(dataset, tokenizer, max_length=MAX_LENGTH, cache_dir=TOKEN_CACHE_DIR):
+    """
+    Tokenise `dataset`, ou relit la version en cache. La clé du cache couvre
+    les textes, le vocabulaire du tokenizer et `max_length`.
+    """
+    digest = hashlib.sha1()
+    digest.update(f"{tokenizer.name_or_path}|{len(tokenizer)}|{tokenizer.eos_token_id}|{max_length}".encode())
+    for context, question in zip(dataset["context"], dataset["question"]):
+        digest.update(format_example(context, question).encode("utf-8"))
+        digest.update(b"\0")
+    path = os.path.join(cache_dir, digest.hexdigest()[:16])
+
+    if os.path.isdir(path):
+        print(f"✅ Tokens relus depuis le cache {path}")
+        return load_from_disk(path)
+    tokenized = dataset.map(
+        lambda x: tokenize_function(x, tokenizer, max_length),
+        batched=True, remove_columns=dataset.column_names,
+    )
+    tokenized.save_to_disk(path)
+    return tokenized
+
+
+def pad_to_max_length(dataset, pad_token_id, max_length=MAX_LENGTH):
+    """Ancien comportement : chaque exemple est complété jusqu'à `max_length` tokens."""
+    return dataset.map(
+        lambda x: {
+            "input_ids": [ids + [pad_token_id] * (max_length - len(ids)) for ids in x["input_ids"]],
+            "attention_mask": [[1] * len(ids) + [0] * (max_length - len(ids)) for ids in x["input_ids"]],
+        },
+        batched=True,
+    )
+
+
+def pack_examples(dataset, max_length=MAX_LENGTH):
+    """
+    Regroupe les exemples en séquences d'au plus `max_length` tokens (first-fit
+    decreasing). Les `position_ids` repartent de 0 à chaque exemple : sans
+    `attention_mask` (voir `causal_lm_collator`), transformers en déduit les
+    frontières et l'attention ne les traverse pas.
+    """
+    lengths = dataset["length"]
+    bins, free = [], []  # Indices des exemples par séquence, et place restante
+    for idx in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+        for b, space in enumerate(free):
+            if lengths[idx] <= space:
+                bins[b].append(idx)
+                free[b] -= lengths[idx]
+                break
+        else:
+            bins.append([idx])
+            free.append(max_length - lengths[idx])
+
+    all_ids = dataset["input_ids"]
+    packed = {"input_ids": [], "position_ids": [], "length": []}
+    for members in bins:
+        ids = [token for idx in members for token in all_ids[idx]]
+        packed["input_ids"].append(ids)
+        packed["position_ids"].append([pos for idx in members for pos in range(lengths[idx])])
+        packed["length"].append(len(ids))
+    return Dataset.from_dict(packed)
+
+
+def causal_lm_collator(pad_token_id, pad_to_multiple_of=8):
+    """
+    Collator d'un modèle causal : padding à droite au plus long exemple du lot
+    (arrondi à `pad_to_multiple_of`), `labels` = `input_ids` avec -100 sur le
+    padding. Le décalage d'un token est fait par le modèle.
+
+    Séquences regroupées (`position_ids`) : pas d'`attention_mask` ni de cache
+    KV (`use_cache=False`), sans quoi transformers ne déduit pas les frontières
+    des `position_ids` et chaque exemple verrait les précédents ; le padding
+    forme un dernier segment, ignoré par la perte. Le premier label de chaque
+    segment (`position_ids == 0`) vaut -100, comme dans
+    `DataCollatorWithFlattening` : après décalage, le dernier token d'un exemple
+    n'apprend pas à prédire le premier de l'exemple suivant.
+    """
+    def collate(features):
+        longest = max(len(f["input_ids"]) for f in features)
+        longest = math.ceil(longest / pad_to_multiple_of) * pad_to_multiple_of
+        packed = "position_ids" in features[0]
+        batch = {"input_ids": [], "labels": []}
+        batch.update({"position_ids": []} if packed else {"attention_mask": []})
+        for f in features:
+            ids = f["input_ids"]
+            mask = f.get("attention_mask") or [1] * len(ids)
+            pad = longest - len(ids)
+            batch["input_ids"].append(ids + [pad_token_id] * pad)
+            labels = [t if m else -100 for t, m in zip(ids, mask)] + [-100] * pad
+            if packed:
+                positions = f["position_ids"] + list(range(pad))
+                labels = [-100 if p == 0 else t for t, p in zip(labels, positions)]
+                batch["position_ids"].append(positions)
+            else:
+                batch["attention_mask"].append(mask + [0] * pad)
+            batch["labels"].append(labels)
+        batch = {name: torch.tensor(values) for name, values in batch.items()}
+        if packed:
+            batch["use_cache"] = False
+        return batch
+
+    return collate
+
+
+def build_pipeline(tokenized, tokenizer, pipeline="bucket", max_length=MAX_LENGTH):
+    """Dataset d'entraînement prêt pour `Trainer` selon la chaîne choisie."""
+    if pipeline == "max_length":
+        return pad_to_max_length(tokenized, tokenizer.pad_token_id, max_length)
+    if pipeline == "pack":
+        return pack_examples(tokenized, max_length)
+    return tokenized
+
+
+def packing_attention():
+    """
+    Implémentation d'attention pour les séquences regroupées :
+    "flash_attention_2" (noyaux à longueurs variables) si `flash_attn` est
+    installé avec un GPU, sinon celle par défaut, avec un masque par blocs.
+    """
+    if not torch.cuda.is_available():
+        return None
+    try:
+        import flash_attn  # noqa: F401
+    except ImportError:
+        return None
+    return "flash_attention_2"
 
 
+def load_model(model_name=MODEL_NAME, load_in_4bit=False, attn_implementation=None):
+    """
+    Modèle et tokenizer ; sans token de padding, LLaMA utilise <unk> (et non
+    </s>, qui doit rester appris). `load_in_4bit` quantifie les poids de base
+    en NF4 (bitsandbytes, GPU uniquement). `attn_implementation` : voir
+    `packing_attention`.
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.unk_token or tokenizer.eos_token
+    tokenizer.padding_side = "right"
+    dtype = torch.float16 if torch.cuda.is_available() else torch.float32
 
-# Charger le dataset (remplace 'df' par ton DataFrame contenant les données)
-dataset = prepare_dataset(df)
-tokenized_dataset = dataset.map(lambda x: tokenize_function(x, tokenizer), batched=True)
+    quantization_config = None
+    if load_in_4bit:
+        from transformers import BitsAndBytesConfig
+        quantization_config = BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_use_double_quant=True,
+            bnb_4bit_compute_dtype=dtype,
+        )
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name, dtype=dtype, device_map="auto", quantization_config=quantization_config,
+        attn_implementation=attn_implementation,
+    )
+    return model, tokenizer
 
-# Séparation train/test
-train_test_split = tokenized_dataset.train_test_split(test_size=0.1)
-train_dataset, eval_dataset = train_test_split["train"], train_test_split["test"]
 
+def apply_lora(model, r=16, alpha=32, dropout=0.05, target_modules=LORA_TARGET_MODULES):
+    """Gèle le modèle de base et ajoute des adaptateurs LoRA sur les projections de l'attention."""
+    from peft import LoraConfig, get_peft_model, prepare_model_for_kbit_training
 
+    if getattr(model, "is_loaded_in_4bit", False):
+        # Normes en fp32 et gradient checkpointing, comme le recommande QLoRA
+        model = prepare_model_for_kbit_training(
+            model, use_gradient_checkpointing=True, gradient_checkpointing_kwargs={"use_reentrant": False},
+        )
+    config = LoraConfig(
+        r=r, lora_alpha=alpha, lora_dropout=dropout, target_modules=target_modules,
+        bias="none", task_type="CAUSAL_LM",
+    )
+    model = get_peft_model(model, config)
+    model.print_trainable_parameters()
+    return model
 
-# Paramètres d'entraînement
-training_args = TrainingArguments(
-    output_dir="./llama2_qcm_finetuned",
-    evaluation_strategy="epoch",
-    save_strategy="epoch",
-    per_device_train_batch_size=2,
-    per_device_eval_batch_size=2,
-    num_train_epochs=3,
-    weight_decay=0.01,
-    fp16=True,
-    push_to_hub=False,
-    logging_dir="./logs",
-)
 
-# Préparer le data collator pour le padding
-collator = DataCollatorForSeq2Seq(tokenizer, model=model)
+def make_trainer(model, tokenizer, train_dataset, eval_dataset=None, pipeline="bucket",
+                 output_dir=OUTPUT_DIR, batch_size=4, epochs=3, max_steps=-1, lora=False):
+    # Paramètres d'entraînement
+    training_args = TrainingArguments(
+        output_dir=output_dir,
+        eval_strategy="epoch" if eval_dataset is not None else "no",
+        save_strategy="epoch" if max_steps < 0 else "no",
+        # Une seule copie gardée ; en LoRA, les points de contrôle ne contiennent que l'adaptateur
+        save_total_limit=1,
+        # Les activations sont recalculées à la rétropropagation au lieu d'être gardées
+        gradient_checkpointing=lora,
+        gradient_checkpointing_kwargs={"use_reentrant": False} if lora else None,
+        per_device_train_batch_size=batch_size,
+        per_device_eval_batch_size=batch_size,
+        num_train_epochs=epochs,
+        max_steps=max_steps,
+        weight_decay=0.01,
+        fp16=torch.cuda.is_available(),
+        # Lots de longueurs voisines : le padding dynamique reste faible
+        train_sampling_strategy="group_by_length" if pipeline == "bucket" else "random",
+        length_column_name="length",
+        remove_unused_columns=False,
+        push_to_hub=False,
+        report_to=[],
+    )
+
+    # Initialiser le Trainer
+    return Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        eval_dataset=eval_dataset,
+        processing_class=tokenizer,
+        data_collator=causal_lm_collator(tokenizer.pad_token_id),
+    )
 
-# Initialiser le Trainer
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=train_dataset,
-    eval_dataset=eval_dataset,
-    tokenizer=tokenizer,
-    data_collator=collator,
-)
 
 # Lancer l'entraînement
-def train_model():
+def train_model(trainer, model, tokenizer, output_dir=OUTPUT_DIR):
     trainer.train()
-    model.save_pretrained("./llama2_qcm_finetuned")
-    tokenizer.save_pretrained("./llama2_qcm_finetuned")
+    # Pour un modèle LoRA, `save_pretrained` n'écrit que l'adaptateur (quelques Mo)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
     print("✅ Fine-tuning terminé et modèle sauvegardé !")
 
+
+def benchmark(model, tokenizer, tokenized, steps=20, batch_size=4, max_length=MAX_LENGTH, lora=False, warmup=3):
+    """
+    Débit d'entraînement de chaque chaîne sur `steps` pas : tokens utiles
+    (tokens prédits, hors padding) par seconde et part du padding dans les lots.
+    Chaque chaîne fait d'abord `warmup` pas non chronométrés, pour que le
+    démarrage (noyaux, allocations, optimiseur) ne pèse pas sur la première
+    mesure.
+    """
+    results = []
+    output_dir = os.path.join(TOKEN_CACHE_DIR, "benchmark")
+    for pipeline in PIPELINES:
+        dataset = build_pipeline(tokenized, tokenizer, pipeline, max_length)
+        if warmup:
+            make_trainer(model, tokenizer, dataset, pipeline=pipeline, batch_size=batch_size,
+                         output_dir=output_dir, max_steps=warmup, lora=lora).train()
+        trainer = make_trainer(model, tokenizer, dataset, pipeline=pipeline, batch_size=batch_size,
+                               output_dir=output_dir, max_steps=steps, lora=lora)
+        real = padded = 0
+        for i, batch in enumerate(trainer.get_train_dataloader()):
+            if i == steps:
+                break
+            # Cibles après décalage : même décompte avec ou sans regroupement
+            real += int((batch["labels"][:, 1:] != -100).sum())
+            padded += batch["input_ids"].numel()
+
+        start = time.perf_counter()
+        trainer.train()
+        elapsed = time.perf_counter() - start
+        results.append({
+            "pipeline": pipeline,
+            "sequences": len(dataset),
+            "padding": 1 - real / padded,
+            "tokens_s": real / elapsed,
+        })
+
+    print(f"{'Chaîne':<12}{'Séquences':>11}{'Padding':>10}{'Tokens/s':>11}")
+    for row in results:
+        print(f"{row['pipeline']:<12}{row['sequences']:>11}{row['padding']:>10.1%}{row['tokens_s']:>11.1f}")
+    return results
+
+
 # Génération de QCM après fine-tuning
-def generate_qcm_with_llama2(context):
+def generation_prompt(context):
+    return f"Contexte: {context}\nGénère une question à choix multiples sur ce sujet."
+
+
+def fit_context(context, tokenizer, max_prompt_length=MAX_LENGTH):
+    """
+    Contexte raccourci (en tokens) pour que le prompt complet tienne dans
+    `max_prompt_length` : c'est l'abstract qui est coupé, jamais l'instruction
+    qui le suit.
+    """
+    budget = max(max_prompt_length - len(tokenizer(generation_prompt(""))["input_ids"]), 0)
+    ids = tokenizer(context, add_special_tokens=False)["input_ids"]
+    return context if len(ids) <= budget else tokenizer.decode(ids[:budget], skip_special_tokens=True)
+
+
+def generate_qcms(contexts, model, tokenizer, batch_size=8, max_new_tokens=256, max_prompt_length=MAX_LENGTH,
+                  **generate_kwargs):
+    """
+    Génère un QCM par contexte, par lots de `batch_size`. Les prompts sont
+    triés par longueur pour limiter le padding (à gauche, pour que tous les
+    prompts se terminent au même indice). Les contextes trop longs sont coupés
+    avant l'instruction (`fit_context`). Renvoie au fil de l'eau des paires
+    (indice du contexte, texte généré), lot après lot.
+    """
+    prompts = [generation_prompt(fit_context(context, tokenizer, max_prompt_length)) for context in contexts]
+    order = sorted(range(len(prompts)), key=lambda i: len(prompts[i]))
+    padding_side, tokenizer.padding_side = tokenizer.padding_side, "left"
+    # Filet de sécurité (re-tokenisation à la jonction) : on coupe le début, pas l'instruction
+    truncation_side, tokenizer.truncation_side = tokenizer.truncation_side, "left"
+    model.eval()
+    try:
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = tokenizer(
+                [prompts[i] for i in batch], return_tensors="pt", padding=True,
+                truncation=True, max_length=max_prompt_length,
+            ).to(model.device)
+            with torch.inference_mode():
+                outputs = model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    use_cache=True,
+                    pad_token_id=tokenizer.pad_token_id,
+                    **generate_kwargs,
+                )
+            # Seuls les tokens générés après le prompt sont décodés
+            texts = tokenizer.batch_decode(outputs[:, inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+            yield from zip(batch, texts)
+    finally:
+        tokenizer.padding_side = padding_side
+        tokenizer.truncation_side = truncation_side
+
+
+def generate_qcm_with_llama2(context, model, tokenizer, **kwargs):
     """Génère une question QCM à partir du contexte médical avec LLaMA 2 fine-tuné"""
-    prompt = f"Contexte: {context}\nGénère une question à choix multiples sur ce sujet."
-    inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-    outputs = model.generate(**inputs, max_length=100)
-    return tokenizer.decode(outputs[0], skip_special_tokens=True)
+    return next(generate_qcms([context], model, tokenizer, **kwargs))[1]
+
+
+def run_generation(contexts, model, tokenizer, batch_size=8, max_new_tokens=256):
+    """Affiche les QCM à mesure qu'ils sont générés, puis le débit en tokens générés par seconde."""
+    start, generated = time.perf_counter(), 0
+    for idx, text in generate_qcms(contexts, model, tokenizer, batch_size, max_new_tokens):
+        generated += len(tokenizer(text, add_special_tokens=False)["input_ids"])
+        print(f"--- [{idx}] {text.strip()}")
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(contexts)} QCM en {elapsed:.1f} s ({generated / elapsed:.1f} tokens/s sur {model.device})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--question-column", default="qcm")
+    parser.add_argument("--pipeline", choices=PIPELINES, default="bucket")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--max-steps", type=int, default=-1)
+    parser.add_argument("--output-dir", help=f"Par défaut {OUTPUT_DIR}, ou {ADAPTER_DIR} avec --lora")
+    parser.add_argument("--benchmark", type=int, metavar="STEPS",
+                        help="Mesurer les tokens/s de chaque chaîne sur STEPS pas au lieu d'entraîner")
+    parser.add_argument("--lora", action="store_true", help="N'entraîner et ne sauvegarder qu'un adaptateur LoRA")
+    parser.add_argument("--load-in-4bit", action="store_true", help="Poids de base en 4 bits (QLoRA, GPU)")
+    parser.add_argument("--lora-r", type=int, default=16)
+    parser.add_argument("--lora-alpha", type=int, default=32)
+    parser.add_argument("--lora-dropout", type=float, default=0.05)
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="Générer les QCM des N premiers abstracts au lieu d'entraîner")
+    parser.add_argument("--adapter", help="Adaptateur LoRA à appliquer pour --generate")
+    parser.add_argument("--max-new-tokens", type=int, default=256)
+    parser.add_argument("--smoke", action="store_true",
+                        help=f"Court entraînement LoRA sur CPU avec {TINY_MODEL}, les titres servant de questions")
+    args = parser.parse_args()
+
+    if args.smoke:
+        args.model, args.question_column, args.lora, args.load_in_4bit = TINY_MODEL, "title", True, False
+        args.max_length, args.max_steps, args.batch_size = 128, 4, 2
+        args.output_dir = args.output_dir or os.path.join(TOKEN_CACHE_DIR, "smoke_adapter")
+    args.output_dir = args.output_dir or (ADAPTER_DIR if args.lora else OUTPUT_DIR)
+
+    packing = args.pipeline == "pack" or args.benchmark
+    model, tokenizer = load_model(args.model, args.load_in_4bit, packing_attention() if packing else None)
+    if args.generate:
+        if args.adapter:
+            model.load_adapter(args.adapter)
+        contexts = pd.read_csv(args.data)["abstract_fr"].map(clean_text)
+        contexts = contexts[contexts != ""].head(args.generate).tolist()
+        run_generation(contexts, model, tokenizer, args.batch_size, args.max_new_tokens)
+        return
+
+    df = load_examples(args.data, args.question_column)
+    dataset = prepare_dataset(df.head(32) if args.smoke else df)
+    tokenized = tokenize_dataset(dataset, tokenizer, args.max_length)
+    if args.lora:
+        model = apply_lora(model, args.lora_r, args.lora_alpha, args.lora_dropout)
+
+    if args.benchmark:
+        benchmark(model, tokenizer, tokenized, args.benchmark, args.batch_size, args.max_length, args.lora)
+        return
+
+    # Séparation train/test (avant le regroupement, pour ne pas mêler les deux)
+    train_test_split = tokenized.train_test_split(test_size=0.1, seed=0)
+    train_dataset = build_pipeline(train_test_split["train"], tokenizer, args.pipeline, args.max_length)
+    eval_dataset = build_pipeline(train_test_split["test"], tokenizer, args.pipeline, args.max_length)
+
+    trainer = make_trainer(model, tokenizer, train_dataset, eval_dataset, args.pipeline,
+                           args.output_dir, args.batch_size, args.epochs, args.max_steps, args.lora)
+    train_model(trainer, model, tokenizer, args.output_dir)
+    test_context = "L'insuffisance rénale chronique est une maladie progressive affectant les reins."
+    print(generate_qcm_with_llama2(test_context, model, tokenizer, max_new_tokens=args.max_new_tokens))
+
 
 # Exemple d'utilisation
 if __name__ == "__main__":
-    train_model()
-    test_context = "L'insuffisance rénale chronique est une maladie progressive affectant les reins."
-    print(generate_qcm_with_llama2(test_context))
+    main()
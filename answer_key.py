@@ -0,0 +1,198 @@
+"""Array-backed answer key for MCQ banks in the CKD.csv format.
+
+Each row of the CSV has an `MCQ` question, a `Choices` string such as
+"a: first | b: second | c: third | d: fourth" and a `Correct` option key.
+The file is parsed once with vectorised pandas string operations into NumPy
+arrays, so loading and grading stay fast for banks with tens of thousands
+of questions. Optional `Topic` and `Difficulty` columns are kept as strata
+for sampling per-learner sessions.
+
+`AnswerKey.save` writes every array (texts included, as UTF-8 string arenas)
+to a directory of `.npy` files; `AnswerKey.load` maps them read-only, so
+several server processes share a single copy of the bank in the page cache.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+STRATA_COLUMNS = ("Topic", "Difficulty")
+
+
+class StringArena:
+    """Immutable list of strings stored as one UTF-8 buffer plus offsets."""
+
+    def __init__(self, data, offsets):
+        self.data = data        # (total_bytes,) uint8
+        self.offsets = offsets  # (n + 1,) int64
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [("" if s is None else str(s)).encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def save(self, directory, name):
+        np.save(os.path.join(directory, f"{name}.data.npy"), self.data)
+        np.save(os.path.join(directory, f"{name}.offsets.npy"), self.offsets)
+
+    @classmethod
+    def load(cls, directory, name, mmap_mode="r"):
+        return cls(
+            np.load(os.path.join(directory, f"{name}.data.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode=mmap_mode),
+        )
+
+
+class AnswerKey:
+    """Typed question table: one row per question, one column per option."""
+
+    def __init__(self, questions, option_keys, option_texts, correct_index, strata=None):
+        self.questions = questions          # StringArena, n entries
+        self.option_keys = option_keys      # (n, k) str, "" for missing options
+        self.option_texts = option_texts    # StringArena, n * k entries (row-major)
+        self.correct_index = correct_index  # (n,) int8, -1 if the answer key is not among the options
+        rows = np.arange(len(correct_index))
+        self.correct_key = np.where(correct_index >= 0, option_keys[rows, correct_index], "")
+        self.strata = strata or {}          # column -> (n,) stratum labels
+        self._strata_index = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        df = df.reset_index(drop=True)
+
+        # Split every "key: text" choice of the bank in one pass, then scatter into (n, k) arrays
+        flat = df["Choices"].fillna("").str.split(" | ", regex=False).explode()
+        rows = flat.index.to_numpy()
+        cols = flat.groupby(level=0).cumcount().to_numpy()
+        parts = flat.str.partition(":")
+        n_options = int(cols.max()) + 1 if len(cols) else 0
+
+        option_keys = np.full((len(df), n_options), "", dtype=object)
+        option_texts = np.full((len(df), n_options), "", dtype=object)
+        option_keys[rows, cols] = parts[0].str.strip().to_numpy()
+        option_texts[rows, cols] = parts[2].str.strip().to_numpy()
+        option_keys = option_keys.astype(str)
+
+        correct = df["Correct"].fillna("").astype(str).str.strip().to_numpy(dtype=str)
+        matches = option_keys == correct[:, None]
+        correct_index = np.where(matches.any(axis=1), matches.argmax(axis=1), -1).astype(np.int8)
+
+        strata = {col: df[col].fillna("").astype(str).to_numpy(dtype=str) for col in STRATA_COLUMNS if col in df}
+        return cls(
+            StringArena.from_strings(df["MCQ"]),
+            option_keys,
+            StringArena.from_strings(option_texts.ravel()),
+            correct_index,
+            strata,
+        )
+
+    @classmethod
+    def from_csv(cls, path):
+        columns = {"MCQ", "Choices", "Correct", *STRATA_COLUMNS}
+        return cls.from_frame(pd.read_csv(path, usecols=lambda col: col in columns))
+
+    def save(self, directory):
+        """Write the key as `.npy` files into a temporary directory, then swap it in."""
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        self.questions.save(tmp_dir, "questions")
+        self.option_texts.save(tmp_dir, "option_texts")
+        np.save(os.path.join(tmp_dir, "option_keys.npy"), self.option_keys)
+        np.save(os.path.join(tmp_dir, "correct_index.npy"), self.correct_index)
+        for column, labels in self.strata.items():
+            np.save(os.path.join(tmp_dir, f"strata_{column}.npy"), labels)
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"strata": list(self.strata)}, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Open a saved key; with the default `mmap_mode="r"` pages are read only when accessed."""
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            StringArena.load(directory, "questions", mmap_mode),
+            np.load(os.path.join(directory, "option_keys.npy"), mmap_mode=mmap_mode),
+            StringArena.load(directory, "option_texts", mmap_mode),
+            np.load(os.path.join(directory, "correct_index.npy"), mmap_mode=mmap_mode),
+            {col: np.load(os.path.join(directory, f"strata_{col}.npy"), mmap_mode=mmap_mode) for col in meta["strata"]},
+        )
+
+    def __len__(self):
+        return len(self.correct_index)
+
+    def choices(self, idx):
+        """(text, key) pairs for question `idx`, as expected by `gr.Radio(choices=...)`."""
+        n_options = self.option_keys.shape[1]
+        return [
+            (self.option_texts[idx * n_options + j], str(key))
+            for j, key in enumerate(self.option_keys[idx]) if key
+        ]
+
+    def correct_option_text(self, idx):
+        """Text of the correct option of question `idx` ("" if the answer key is invalid)."""
+        j = self.correct_index[idx]
+        return self.option_texts[idx * self.option_keys.shape[1] + j] if j >= 0 else ""
+
+    def _stratum_groups(self, column):
+        """Question ids grouped by stratum: (labels, counts, ids sorted by stratum, offsets)."""
+        if column not in self._strata_index:
+            labels, codes, counts = np.unique(self.strata[column], return_inverse=True, return_counts=True)
+            order = np.argsort(codes, kind="stable")
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            self._strata_index[column] = (labels, counts, order, offsets)
+        return self._strata_index[column]
+
+    def sample(self, n, stratify_by=None, rng=None):
+        """
+        Draw `n` distinct question ids. With `stratify_by` (a strata column),
+        each stratum gets a share of `n` proportional to its size; the cost
+        depends on `n` and the number of strata, not on the bank size.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        n = min(n, len(self))
+        if n <= 0:
+            return np.array([], dtype=np.int64)
+        if not stratify_by or stratify_by not in self.strata:
+            return rng.choice(len(self), size=n, replace=False)
+
+        labels, counts, order, offsets = self._stratum_groups(stratify_by)
+        # Largest-remainder allocation of n across strata
+        quotas = counts * n / counts.sum()
+        alloc = np.floor(quotas).astype(int)
+        remainder = n - alloc.sum()
+        if remainder:
+            alloc[np.argsort(alloc - quotas)[:remainder]] += 1
+
+        ids = [
+            order[offsets[s] + rng.choice(counts[s], size=alloc[s], replace=False)]
+            for s in np.flatnonzero(alloc)
+        ]
+        ids = np.concatenate(ids)
+        rng.shuffle(ids)
+        return ids
+
+    def score(self, responses, ids=None):
+        """
+        Number of correct responses. `responses` are option keys (None when
+        unanswered) for questions `ids`, or for the first questions of the
+        bank when `ids` is None.
+        """
+        responses = np.array(["" if r is None else r for r in responses], dtype=str)
+        expected = self.correct_key[:len(responses)] if ids is None else self.correct_key[np.asarray(ids)]
+        return int(np.count_nonzero((responses == expected) & (expected != "")))
@@ -0,0 +1,292 @@
+"""Génération de quiz sur tout le corpus, par shards, avec reprise.
+
+Les articles sont répartis en `--shards` shards selon une empreinte stable de
+leur PMID (identique sur toutes les machines). Chaque nœud traite les shards
+`i` tels que `i % --nodes == --node-index`, répartis entre `--workers`
+processus. Pour chaque shard :
+- les questions retenues par le contrôle qualité (`quality_filter` :
+  heuristiques, puis juge LLM `--judge` pour les seules questions douteuses)
+  sont ajoutées lot après lot à `shard-XXXXX.partial.jsonl`, avec le PMID de
+  chaque abstract traité : après une interruption, le shard reprend où il
+  s'était arrêté ;
+- une fois terminé sans appel en échec, le fichier devient `shard-XXXXX.jsonl`
+  et un manifeste `shard-XXXXX.done.json` est écrit ; les shards terminés sont
+  ignorés aux exécutions suivantes.
+Un shard qui lève une exception est noté en échec sans arrêter les autres.
+La progression (articles, questions, débit, temps restant) est affichée en
+continu ; le bilan de l'exécution (shards terminés, incomplets ou en erreur)
+est écrit dans `node-XXX.manifest.json`.
+
+Avec `--backend llama`, chaque processus charge sa propre copie du modèle :
+`--workers` vaut alors 1 par défaut.
+
+Exemples :
+    python batch_quiz.py --backend stub --workers 4                  # essai à blanc
+    python batch_quiz.py --backend groq --workers 8 --shards 256
+    python batch_quiz.py --backend llama --nodes 4 --node-index 2     # sur le 3e nœud
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+
+from quality_filter import QualityFilter, make_judge
+from quiz_validation import from_transformed, parse_json_quiz
+from retrieval import CORPUS_FILES, load_articles
+
+OUTPUT_DIR = "quiz_output"
+BACKENDS = ("groq", "llama", "stub")
+
+
+def shard_of(pmid, n_shards):
+    """Shard d'un PMID (empreinte SHA-1, indépendante du processus et de la machine)."""
+    return int(hashlib.sha1(str(pmid).encode()).hexdigest()[:8], 16) % n_shards
+
+
+def shard_path(output_dir, shard, suffix):
+    return os.path.join(output_dir, f"shard-{shard:05d}{suffix}")
+
+
+# ------------------------------------------------------------------ backends
+class Generator:
+    """
+    Génère les questions (au format commun) d'un lot d'abstracts :
+    [(pmid, [questions])], avec None à la place des questions si l'appel au
+    modèle a échoué (l'abstract sera retenté).
+    """
+
+    def __init__(self, backend, args):
+        self.backend = backend
+        self.args = args
+        if backend == "llama":
+            # Chargé une fois par processus : QaLlm lit le modèle à l'import
+            import quizz_generator
+            self.quizz_generator = quizz_generator
+
+    def __call__(self, articles):
+        if self.backend == "llama":
+            return asyncio.run(self._llama(articles))
+        return [(article["pmid"], self._json_backend(article["text"])) for article in articles]
+
+    def _json_backend(self, text):
+        from groq_client import extract_json_from_text, query_groq
+        from prompts import create_prompt_with_langchain
+
+        prompt = create_prompt_with_langchain(self.args.topic, self.args.number, self.args.difficulty, context=text)
+        if self.backend == "stub":
+            from bench_backends import stub_json
+            response = stub_json(self.args.number)
+        else:
+            response = query_groq(prompt, self.args.model)
+            if response is None:
+                return None
+        return parse_json_quiz(extract_json_from_text(response))
+
+    async def _llama(self, articles):
+        from text_to_quizz import transform
+
+        qg = self.quizz_generator
+        prompts = [qg.qa_chain.prompt.format(text=article["text"]) for article in articles]
+        outputs = await qg.generate_from_prompts(prompts)
+        results = []
+        for article, output in zip(articles, outputs):
+            parsed = qg.parse_output(output)
+            results.append((article["pmid"], [from_transformed(q) for q in transform([parsed])] if parsed else []))
+        return results
+
+
+# -------------------------------------------------------------------- shards
+_generator = None
+_quality_filter = None
+_progress = None
+
+
+def _init_worker(backend, args, progress):
+    global _generator, _quality_filter, _progress
+    _generator = Generator(backend, args)
+    _quality_filter = QualityFilter(make_judge(args.judge, args.model))
+    _progress = progress
+
+
+def process_shard(shard, articles, args):
+    """Traite un shard (en reprenant son fichier partiel) ; renvoie son manifeste."""
+    partial = shard_path(args.output_dir, shard, ".partial.jsonl")
+    done = set()
+    if os.path.exists(partial):
+        with open(partial, "rb+") as f:
+            complete = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Dernière ligne tronquée par une interruption
+                done.add(json.loads(line)["pmid"])
+                complete += len(line)
+            f.truncate(complete)
+    todo = [article for article in articles if article["pmid"] not in done]
+    _progress.put((len(articles) - len(todo), 0))
+
+    start, failed = time.perf_counter(), 0
+    with open(partial, "a", encoding="utf-8") as f:
+        for i in range(0, len(todo), args.batch_size):
+            batch = todo[i:i + args.batch_size]
+            results = [(pmid, questions) for pmid, questions in _generator(batch) if questions is not None]
+            failed += len(batch) - len(results)
+
+            # Contrôle qualité sur tout le lot : un seul passage vectorisé, un appel au juge par paquet de douteuses
+            texts = {article["pmid"]: article["text"] for article in batch}
+            questions = [q for _, qs in results for q in qs]
+            kept, _ = _quality_filter(questions, [texts[pmid] for pmid, qs in results for _ in qs])
+            kept = set(kept)
+            n_valid, offset = 0, 0
+            for pmid, qs in results:
+                valid = [q for j, q in enumerate(qs, start=offset) if j in kept]
+                offset += len(qs)
+                n_valid += len(valid)
+                # Une ligne par abstract traité, même sans question valide : il ne sera pas refait
+                f.write(json.dumps({"pmid": pmid, "questions": valid, "rejected": len(qs) - len(valid)},
+                                   ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            _progress.put((len(batch), n_valid))
+
+    with open(partial, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    manifest = {
+        "shard": shard,
+        "articles": len(records),
+        "questions": sum(len(r["questions"]) for r in records),
+        "rejected": sum(r["rejected"] for r in records),
+        "failed": failed,
+        "backend": args.backend,
+        "seconds": time.perf_counter() - start,
+    }
+    if failed:
+        # Le shard reste partiel : les abstracts en échec seront retentés à la prochaine exécution
+        return manifest
+    os.replace(partial, shard_path(args.output_dir, shard, ".jsonl"))
+    with open(shard_path(args.output_dir, shard, ".done.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def pending_shards(articles, args):
+    """Shards de ce nœud non encore terminés : {shard: [articles]}."""
+    shards = {}
+    for article in articles:
+        shard = shard_of(article["pmid"], args.shards)
+        if shard % args.nodes == args.node_index:
+            shards.setdefault(shard, []).append(article)
+    return {
+        shard: members for shard, members in sorted(shards.items())
+        if not os.path.exists(shard_path(args.output_dir, shard, ".done.json"))
+    }, shards
+
+
+class Progress:
+    """Agrège les messages des workers (articles, questions) et affiche débit et temps restant."""
+
+    def __init__(self, messages, total, every=2.0):
+        self.messages = messages
+        self.total = total
+        self.every = every
+        self.articles = self.questions = 0
+        self.start = self.last = time.perf_counter()
+
+    def drain(self, timeout=0.1):
+        try:
+            while True:
+                articles, questions = self.messages.get(timeout=timeout)
+                self.articles += articles
+                self.questions += questions
+        except queue.Empty:
+            pass
+
+    def poll(self):
+        self.drain()
+        if time.perf_counter() - self.last >= self.every:
+            self.report()
+
+    def report(self):
+        self.last = time.perf_counter()
+        rate = self.articles / (self.last - self.start)
+        eta = f"{(self.total - self.articles) / rate:.0f} s" if rate else "?"
+        print(f"⏳ {self.articles}/{self.total} articles, {self.questions} questions, "
+              f"{rate:.2f} articles/s, reste ≈ {eta}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, default="groq")
+    parser.add_argument("--workers", type=int,
+                        help="Processus (défaut : 1 avec llama, un modèle par processus ; sinon un par cœur)")
+    parser.add_argument("--shards", type=int, default=64, help="Nombre total de shards (identique sur tous les nœuds)")
+    parser.add_argument("--nodes", type=int, default=1)
+    parser.add_argument("--node-index", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=4, help="Abstracts par lot (et par point de reprise)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--topic", default="Insuffisance Rénale Chronique")
+    parser.add_argument("--number", type=int, default=2, help="QCM demandés par abstract (Groq)")
+    parser.add_argument("--difficulty", default="Moyen")
+    parser.add_argument("--model", default="mistral-saba-24b", help="Modèle Groq (génération et juge)")
+    parser.add_argument("--judge", choices=("none", "groq", "stub"), default="none",
+                        help="Juge LLM des questions douteuses (sans juge, elles sont écartées)")
+    args = parser.parse_args()
+    if args.workers is None:
+        args.workers = 1 if args.backend == "llama" else os.cpu_count() or 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    articles = load_articles(CORPUS_FILES)
+    pending, node_shards = pending_shards(articles, args)
+    total = sum(len(members) for members in pending.values())
+    print(f"🗂️ {len(node_shards)} shards pour ce nœud, {len(node_shards) - len(pending)} déjà terminés, "
+          f"{total} articles à traiter")
+    if not pending:
+        return
+
+    # Le modèle LLaMA n'est chargé qu'une fois par processus : "spawn" évite de dupliquer un état CUDA
+    context = mp.get_context("spawn" if args.backend == "llama" else None)
+    messages = context.Queue()
+    progress = Progress(messages, total)
+    with context.Pool(args.workers, initializer=_init_worker, initargs=(args.backend, args, messages)) as pool:
+        results = [pool.apply_async(process_shard, (shard, members, args)) for shard, members in pending.items()]
+        while not all(result.ready() for result in results):
+            progress.poll()
+        manifests = []
+        for shard, result in zip(pending, results):
+            try:
+                manifests.append(result.get())
+            except Exception as e:
+                # Un shard en erreur n'arrête pas les autres ; il sera retenté à la prochaine exécution
+                print(f"❌ Shard {shard} : {e!r}")
+                manifests.append({"shard": shard, "articles": 0, "questions": 0, "rejected": 0,
+                                  "failed": len(pending[shard]), "error": repr(e), "backend": args.backend})
+    progress.drain(timeout=0.5)
+    progress.report()
+
+    elapsed = time.perf_counter() - progress.start
+    n_questions = sum(m["questions"] for m in manifests)
+    n_rejected = sum(m["rejected"] for m in manifests)
+    print(f"✅ {sum('error' not in m for m in manifests)} shards en {elapsed:.1f} s : {n_questions} questions validées, "
+          f"{n_rejected} rejetées ({n_questions / elapsed:.2f} questions/s) dans {args.output_dir}")
+    errors = [m["shard"] for m in manifests if "error" in m]
+    incomplete = [m["shard"] for m in manifests if m["failed"] and "error" not in m]
+    if incomplete:
+        print(f"⚠️ {len(incomplete)} shards incomplets (appels en échec), à relancer : {incomplete}")
+    if errors:
+        print(f"❌ {len(errors)} shards en erreur, à relancer : {errors}")
+
+    summary_path = os.path.join(args.output_dir, f"node-{args.node_index:03d}.manifest.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "node": args.node_index, "nodes": args.nodes, "backend": args.backend, "seconds": elapsed,
+            "done": sorted(m["shard"] for m in manifests if not m["failed"]),
+            "incomplete": incomplete, "errors": errors, "shards": manifests,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"🧾 Bilan écrit dans {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
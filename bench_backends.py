@@ -0,0 +1,282 @@
+"""Banc de comparaison des backends de génération de QCM sur un échantillon fixe d'abstracts.
+
+Backends :
+- "groq" : le chemin de `streamlit_app` (prompt JSON, API Groq, extraction du JSON) ;
+- "chain" : `QCMGenerateChain` sur le modèle de `QaLlm` (LLaMA 2) ;
+- "finetuned" : `generate_qcms` du script de fine-tuning (modèle ou adaptateur LoRA).
+Avec `--stub`, Groq et la chaîne répondent par des sorties locales préenregistrées
+(latence simulée par une attente de `--stub-latency` s par appel) et le modèle
+fine-tuné est remplacé par un LLaMA minuscule aléatoire construit sur place (aucun
+téléchargement) : le banc tourne hors ligne, sur CPU.
+
+Mesures par backend : débit (caractères générés/s, et tokens générés/s comptés
+par le tokenizer du modèle quand il est local), latences p50/p95 par abstract,
+taux de parsing réussi, taux de questions aux options dupliquées et cohérence
+réponse/options (la réponse est une des options). Le rapport JSON peut servir de
+référence : `--baseline` signale les régressions au-delà de `--tolerance`.
+
+Exemples :
+    python bench_backends.py --stub --json bench_backends.json
+    python bench_backends.py --backends groq finetuned --adapter ./llama2_qcm_lora --baseline bench_backends.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from clean_text import load_clean_articles
+from prompts import create_prompt_with_langchain
+from quiz_validation import answer_is_consistent, has_duplicate_options, is_well_formed, parse_blocks, parse_json_quiz
+
+BACKENDS = ("groq", "chain", "finetuned")
+FINETUNED_DIR = os.path.join("Collect_Dataset_Kidney_Disease", "llama2_qcm_finetuned")
+SAMPLE_PATH = os.path.join("Collect_Dataset_Kidney_Disease", "articles_maladies_renales.csv")
+
+STUB_TEXT = """Question 1: Quel marqueur sert à estimer le débit de filtration glomérulaire ?
+CHOICE_A: La créatinine sérique
+CHOICE_B: La bilirubine
+CHOICE_C: La troponine
+CHOICE_D: La lipase
+
+Answer: A
+
+Question 2: Quel stade correspond à un DFG inférieur à 15 mL/min/1,73 m² ?
+CHOICE_A: Stade 2
+CHOICE_B: Stade 3
+CHOICE_C: Stade 4
+CHOICE_D: Stade 5
+
+Answer: D
+"""
+
+
+def stub_json(number):
+    """Réponse JSON préenregistrée au format du prompt Groq."""
+    return json.dumps({
+        str(i): {
+            "question": f"Question {i} sur l'insuffisance rénale chronique ?",
+            "options": {"a": "Créatinine", "b": "Bilirubine", "c": "Troponine", "d": "Lipase"},
+            "correct": "a",
+            "explanation": "La créatinine sert à estimer le DFG.",
+        }
+        for i in range(1, number + 1)
+    }, ensure_ascii=False)
+
+
+def stub_model(corpus):
+    """
+    (modèle, tokenizer) : LLaMA aléatoire minuscule et tokenizer BPE entraîné sur
+    `corpus`, construits en mémoire pour `--stub`.
+    """
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    tok = Tokenizer(models.BPE(unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(vocab_size=400, special_tokens=["<unk>", "<s>", "</s>"],
+                                  initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    tok.train_from_iterator(corpus, trainer)
+    # Comme `load_model` : <unk> sert de padding
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tok, unk_token="<unk>", bos_token="<s>",
+                                        eos_token="</s>", pad_token="<unk>")
+    torch.manual_seed(0)
+    model = LlamaForCausalLM(LlamaConfig(
+        vocab_size=len(tokenizer), hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=4, max_position_embeddings=2048,
+        pad_token_id=0, bos_token_id=1, eos_token_id=2,
+    ))
+    return model.eval(), tokenizer
+
+
+# ----------------------------------------------------------------- backends
+def tokenizer_counter(tokenizer):
+    """Nombre de tokens d'un texte généré, selon le tokenizer du modèle."""
+    return lambda text: len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def groq_backend(args):
+    """
+    (abstract -> [(texte brut, questions)], compteur de tokens) pour le chemin
+    Groq de `streamlit_app` ; le tokenizer du modèle distant n'est pas connu.
+    """
+    from groq_client import extract_json_from_text, query_groq
+
+    def run(abstract):
+        prompt = create_prompt_with_langchain(args.topic, args.number, args.difficulty, context=abstract)
+        if args.stub:
+            time.sleep(args.stub_latency)
+            text = stub_json(args.number)
+        else:
+            text = query_groq(prompt, args.model)
+        return [(text or "", parse_json_quiz(extract_json_from_text(text)))]
+
+    return run, None
+
+
+def chain_backend(args):
+    """`QCMGenerateChain.predict` sur LLaMA 2 (ou sur un LLM factice avec `--stub`)."""
+    from qcm_chain import QCMGenerateChain
+
+    count = None
+    if args.stub:
+        from langchain_community.llms.fake import FakeListLLM
+        llm = FakeListLLM(responses=[STUB_TEXT], sleep=args.stub_latency)
+    else:
+        from qa_llm import QaLlm
+        from qcm_chain import PROMPT_PREFIX
+        llm = QaLlm(adapter=args.adapter, prefix=PROMPT_PREFIX).get_llm()
+        # Seule la suite générée est analysée : le prompt contient un exemple de QCM
+        # que `parse_blocks` reconnaîtrait comme une réponse réussie
+        llm.pipeline_kwargs = {**(llm.pipeline_kwargs or {}), "return_full_text": False}
+        count = tokenizer_counter(llm.pipeline.tokenizer)
+    chain = QCMGenerateChain.from_llm(llm)
+
+    def run(abstract):
+        if args.stub:
+            # `FakeListLLM` n'attend `sleep` qu'en streaming : la latence est simulée ici
+            time.sleep(args.stub_latency)
+        text = chain.predict(text=abstract)
+        return [(text, parse_blocks(text))]
+
+    return run, count
+
+
+def finetuned_backend(args, abstracts):
+    """`generate_qcms` par lots ; chaque lot est chronométré puis réparti entre ses abstracts."""
+    sys.path.append("Collect_Dataset_Kidney_Disease")
+    from generate_qcm_with_llama2 import generate_qcms, load_model
+
+    if args.stub:
+        model, tokenizer = stub_model([STUB_TEXT, *abstracts])
+    else:
+        model, tokenizer = load_model(args.finetuned_model)
+    if args.adapter:
+        model.load_adapter(args.adapter)
+
+    def run_batch(abstracts):
+        texts = dict(generate_qcms(abstracts, model, tokenizer, len(abstracts), args.max_new_tokens))
+        return [(texts[i], parse_blocks(texts[i])) for i in range(len(abstracts))]
+
+    return run_batch, tokenizer_counter(tokenizer)
+
+
+def run_backend(name, abstracts, args):
+    """Mesures d'un backend sur l'échantillon."""
+    if name == "finetuned":
+        run_batch, count = finetuned_backend(args, abstracts)
+        batches = [abstracts[i:i + args.batch_size] for i in range(0, len(abstracts), args.batch_size)]
+    else:
+        run, count = {"groq": groq_backend, "chain": chain_backend}[name](args)
+        run_batch = lambda batch: run(batch[0])
+        batches = [[abstract] for abstract in abstracts]
+
+    latencies, outputs, errors = [], [], 0
+    start = time.perf_counter()
+    for batch in batches:
+        batch_start = time.perf_counter()
+        try:
+            results = run_batch(batch)
+        except Exception as e:
+            print(f"❌ {name} : {e}")
+            errors += len(batch)
+            continue
+        latencies += [(time.perf_counter() - batch_start) / len(batch)] * len(batch)
+        outputs += results
+    elapsed = time.perf_counter() - start
+
+    questions = [q for _, qs in outputs for q in qs if is_well_formed(q)]
+    calls = len(abstracts)
+    return {
+        "backend": name,
+        "appels": calls,
+        "erreurs": errors,
+        "caracteres_s": sum(len(text) for text, _ in outputs) / elapsed if elapsed else 0.0,
+        "tokens_s": sum(count(text) for text, _ in outputs) / elapsed if count and elapsed else None,
+        "latence_p50_s": float(np.percentile(latencies, 50)) if latencies else None,
+        "latence_p95_s": float(np.percentile(latencies, 95)) if latencies else None,
+        "parsing_ok": sum(any(is_well_formed(q) for q in qs) for _, qs in outputs) / calls,
+        "questions": len(questions),
+        "options_dupliquees": float(np.mean([has_duplicate_options(q) for q in questions])) if questions else None,
+        "reponse_coherente": float(np.mean([answer_is_consistent(q) for q in questions])) if questions else None,
+    }
+
+
+# ---------------------------------------------------------------- rapports
+# Sens de chaque mesure : +1 plus c'est haut mieux c'est, -1 l'inverse
+DIRECTIONS = {
+    "caracteres_s": 1, "tokens_s": 1, "parsing_ok": 1, "reponse_coherente": 1,
+    "latence_p50_s": -1, "latence_p95_s": -1, "options_dupliquees": -1,
+}
+
+
+def find_regressions(report, baseline, tolerance):
+    """Mesures dégradées de plus de `tolerance` (relative) par rapport au rapport de référence."""
+    previous = {row["backend"]: row for row in baseline["resultats"]}
+    regressions = []
+    for row in report:
+        ref = previous.get(row["backend"], {})
+        for metric, direction in DIRECTIONS.items():
+            old, new = ref.get(metric), row.get(metric)
+            if old is None or new is None:
+                continue
+            if direction * (new - old) < -tolerance * max(abs(old), 1e-9):
+                regressions.append(f"{row['backend']}.{metric} : {old:.3f} → {new:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--data", default=SAMPLE_PATH, help="CSV des articles (colonne abstract_fr)")
+    parser.add_argument("--sample", type=int, default=10, help="Nombre d'abstracts de l'échantillon")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub", action="store_true", help="Backends locaux, sans API ni LLaMA 2")
+    parser.add_argument("--stub-latency", type=float, default=0.05)
+    parser.add_argument("--topic", default="Insuffisance Rénale Chronique")
+    parser.add_argument("--number", type=int, default=2, help="QCM demandés à Groq par abstract")
+    parser.add_argument("--difficulty", default="Moyen")
+    parser.add_argument("--model", default="mistral-saba-24b", help="Modèle Groq")
+    parser.add_argument("--finetuned-model", default=FINETUNED_DIR)
+    parser.add_argument("--adapter", help="Adaptateur LoRA pour la chaîne et le modèle fine-tuné")
+    parser.add_argument("--batch-size", type=int, default=4, help="Taille des lots du modèle fine-tuné")
+    parser.add_argument("--max-new-tokens", type=int, default=256)
+    parser.add_argument("--json", help="Écrire le rapport dans ce fichier")
+    parser.add_argument("--baseline", help="Rapport de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    articles = load_clean_articles(args.data)
+    abstracts = articles["abstract_fr_clean"].sample(min(args.sample, len(articles)), random_state=args.seed).tolist()
+
+    report = [run_backend(name, abstracts, args) for name in args.backends]
+
+    print(f"{'Backend':<11}{'Car./s':>9}{'Tokens/s':>10}{'p50 s':>8}{'p95 s':>8}{'Parsing':>9}{'Doublons':>10}{'Cohérence':>11}{'Erreurs':>9}")
+    cell = lambda value, width, spec: f"{value:>{width}{spec}}" if value is not None else f"{'-':>{width}}"
+    for row in report:
+        print(f"{row['backend']:<11}{cell(row['caracteres_s'], 9, '.0f')}{cell(row['tokens_s'], 10, '.1f')}{cell(row['latence_p50_s'], 8, '.2f')}"
+              f"{cell(row['latence_p95_s'], 8, '.2f')}{cell(row['parsing_ok'], 9, '.0%')}"
+              f"{cell(row['options_dupliquees'], 10, '.0%')}{cell(row['reponse_coherente'], 11, '.0%')}{row['erreurs']:>9}")
+    print("(tokens : tokenizer du modèle local, inconnus pour Groq)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parametres": vars(args), "echantillon": len(abstracts), "resultats": report},
+                      f, ensure_ascii=False, indent=2)
+        print(f"✅ Rapport écrit dans {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"⚠️ Régression {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Banc de mesure des variantes de prompt (tokens et latence de bout en bout).
+
+Exemples :
+    python bench_prompts.py                                  # hors ligne : tokens et temps de construction
+    python bench_prompts.py --context                        # avec les extraits PubMed
+    python bench_prompts.py --live --runs 5 --model llama3-70b-8192 --json bench_prompts.json
+"""
+import argparse
+import json
+import statistics
+import time
+from functools import lru_cache
+
+from langchain.prompts import PromptTemplate
+
+from prompts import CONTEXT_INSTRUCTIONS, FULL_TEMPLATE, PROMPT_TEMPLATES, create_prompt_with_langchain
+from retrieval import estimate_tokens
+
+
+@lru_cache(maxsize=None)
+def get_encoder():
+    """Encodeur tiktoken s'il est installé, sinon None (estimation ≈ 4 caractères/token)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text):
+    encoder = get_encoder()
+    return len(encoder.encode(text)) if encoder else estimate_tokens(text)
+
+
+def time_build(build, repeat):
+    """Temps moyen de construction d'un prompt, en microsecondes."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        build()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run_live(prompt, number, model, runs):
+    """Latences de bout en bout (requête Groq + extraction du JSON) et taux de réussite du parsing."""
+    from groq_client import extract_json_from_text, query_groq
+
+    latencies, parsed = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        quiz = extract_json_from_text(query_groq(prompt, model))
+        latencies.append(time.perf_counter() - start)
+        if "error" not in quiz and len(quiz) == number:
+            parsed += 1
+    return {
+        "latence_p50_s": statistics.median(latencies),
+        "latence_moyenne_s": statistics.mean(latencies),
+        "parsing_ok": parsed / runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topic", default="Insuffisance Rénale Chronique")
+    parser.add_argument("--number", type=int, default=5)
+    parser.add_argument("--difficulty", default="Moyen")
+    parser.add_argument("--context", action="store_true", help="Ajouter les extraits PubMed au prompt")
+    parser.add_argument("--live", action="store_true", help="Appeler l'API Groq pour mesurer la latence")
+    parser.add_argument("--model", default="mistral-saba-24b")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="Écrire le rapport dans ce fichier")
+    args = parser.parse_args()
+
+    context = ""
+    if args.context:
+        from retrieval import get_index, pack_passages
+        context, _ = pack_passages(get_index().search(args.topic, k=8))
+
+    params = dict(topic=args.topic, number=args.number, difficulty=args.difficulty)
+    report = []
+
+    # Référence : template recompilé à chaque appel (comportement historique)
+    def build_uncompiled():
+        context_block = CONTEXT_INSTRUCTIONS.format(context=context) if context else ""
+        return PromptTemplate.from_template(FULL_TEMPLATE).format(context=context_block, **params)
+
+    variants = [("complet (non précompilé)", build_uncompiled, None)]
+    for variant in PROMPT_TEMPLATES:
+        variants.append((variant, lambda v=variant: create_prompt_with_langchain(context=context, variant=v, **params), variant))
+
+    for name, build, variant in variants:
+        prompt = build()
+        row = {
+            "variante": name,
+            "caracteres": len(prompt),
+            "tokens_prompt": count_tokens(prompt),
+            "construction_us": time_build(build, 200),
+        }
+        if args.live and variant:
+            row.update(run_live(prompt, args.number, args.model, args.runs))
+        report.append(row)
+
+    unit = "tiktoken" if get_encoder() else "estimation"
+    print(f"{'Variante':<26}{'Caract.':>9}{'Tokens':>9}{'Constr. µs':>12}{'p50 s':>9}{'Moy. s':>9}{'JSON ok':>9}")
+    for row in report:
+        live_cols = "".join(
+            f"{row[key]:>9.2f}" if key in row else f"{'-':>9}"
+            for key in ("latence_p50_s", "latence_moyenne_s", "parsing_ok")
+        )
+        print(f"{row['variante']:<26}{row['caracteres']:>9}{row['tokens_prompt']:>9}{row['construction_us']:>12.1f}{live_cols}")
+    print(f"(tokens : {unit})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parametres": vars(args), "resultats": report}, f, ensure_ascii=False, indent=2)
+        print(f"✅ Rapport écrit dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,33 @@
+"""LangChain callbacks: counting handler and production metrics.
+
+`MetricsCallbackHandler` records, per LLM call, the latency, time to first
+token (when streaming), prompt/completion tokens and errors into the
+histograms of a `MetricsRegistry`, exported as Prometheus text or JSON. With
+`tracing=True` and OpenTelemetry installed, chain and LLM runs also become
+nested spans; `stage()` adds spans for steps outside LangChain (e.g. parsing).
+"""
+import bisect
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 from langchain.callbacks.base import BaseCallbackHandler
 from pydantic import BaseModel
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
+from uuid import UUID
 from langchain.schema import AgentAction, AgentFinish, LLMResult
 
+try:
+    from opentelemetry import trace
+except ImportError:  # Spans are optional
+    trace = None
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
 class BaseMyCallbackHandler(BaseModel):
     """Base fake callback handler for testing."""
 
@@ -54,7 +79,6 @@ class MyCallbackHandler(BaseMyCallbackHandler, BaseCallbackHandler):
         """Run when LLM starts running."""
         self.llm_starts += 1
         self.starts += 1
-        print(prompts[0])
 
     def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
         """Run when LLM generates a new token."""
@@ -62,7 +86,6 @@ class MyCallbackHandler(BaseMyCallbackHandler, BaseCallbackHandler):
 
     def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
         """Run when LLM ends running."""
-        print(response)
         self.llm_ends += 1
         self.ends += 1
 
@@ -120,4 +143,252 @@ class MyCallbackHandler(BaseMyCallbackHandler, BaseCallbackHandler):
     def on_agent_action(self, action: AgentAction, **kwargs: Any) -> Any:
         """Run on agent action."""
         self.tool_starts += 1
-        self.starts += 1
\ No newline at end of file
+        self.starts += 1
+
+
+def estimate_tokens(text):
+    """Rough token count (≈ 4 characters per token) when the LLM reports no usage."""
+    return len(text) // 4 + 1
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus model (buckets, sum, count)."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total, result = 0, []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters, keyed by name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.counters = defaultdict(float)  # (name, labels) -> value
+        self.help = {}
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+                self.help.setdefault(name, help)
+            histogram.observe(value)
+
+    def inc(self, name, value=1, help="", **labels):
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+            self.help.setdefault(name, help)
+
+    @staticmethod
+    def _labels(labels, **extra):
+        items = [*labels, *extra.items()]
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}" if items else ""
+
+    def to_prometheus(self):
+        """Prometheus text exposition format."""
+        lines, described = [], set()
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in described:
+                    described.add(name)
+                    lines += [f"# HELP {name} {self.help[name]}", f"# TYPE {name} counter"]
+                lines.append(f"{name}{self._labels(labels)} {value:g}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in described:
+                    described.add(name)
+                    lines += [f"# HELP {name} {self.help[name]}", f"# TYPE {name} histogram"]
+                for bound, count in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{self._labels(labels, le=le)} {count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {histogram.sum:g}")
+                lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name, "labels": dict(labels), "count": h.count, "sum": h.sum,
+                        "buckets": [["+Inf" if b == float("inf") else b, c] for b, c in h.cumulative()],
+                    }
+                    for (name, labels), h in sorted(self.histograms.items())
+                ],
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+
+# Default registry shared by the handlers of the process
+REGISTRY = MetricsRegistry()
+
+
+def start_metrics_server(port=9100, registry=REGISTRY):
+    """Serve `/metrics` (Prometheus text) and `/metrics.json` from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, content_type = registry.to_json(), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            body = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records LLM and chain calls into `registry`. The work per callback is a
+    clock read and a few dictionary and bisect operations, so the handler can
+    stay enabled in production.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, tracing: bool = False,
+                 tracer_name: str = "kidney_quiz") -> None:
+        self.registry = registry
+        self.tracer = trace.get_tracer(tracer_name) if tracing and trace else None
+        self._runs = {}  # run_id -> (label, start, prompt tokens)
+        self._first_token = set()
+        self._spans = {}  # run_id -> span
+
+    # ------------------------------------------------------------- spans
+    def _start_span(self, name, run_id, parent_run_id):
+        if self.tracer is None:
+            return
+        parent = self._spans.get(parent_run_id)
+        context = trace.set_span_in_context(parent) if parent is not None else None
+        self._spans[run_id] = self.tracer.start_span(name, context=context)
+
+    def _end_span(self, run_id, error=None):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            if error is not None:
+                span.record_exception(error)
+                span.set_status(trace.Status(trace.StatusCode.ERROR))
+            span.end()
+
+    @contextmanager
+    def stage(self, name, parent_run_id=None, **attributes):
+        """
+        Times a step outside LangChain (e.g. "parse"). When tracing, the step is a
+        span under the run `parent_run_id` (e.g. the chain run), or else under the
+        current span.
+        """
+        start = time.perf_counter()
+        span = None
+        if self.tracer is not None:
+            parent = self._spans.get(parent_run_id)
+            context = trace.set_span_in_context(parent) if parent is not None else None
+            span = self.tracer.start_as_current_span(name, context=context, attributes=attributes)
+        try:
+            if span is None:
+                yield
+            else:
+                with span:
+                    yield
+        except Exception as e:
+            self.registry.inc("quiz_stage_errors_total", help="Errors per stage", stage=name, error=type(e).__name__)
+            raise
+        finally:
+            self.registry.observe("quiz_stage_seconds", time.perf_counter() - start,
+                                  help="Duration of pipeline stages", stage=name)
+
+    # --------------------------------------------------------------- LLM
+    @staticmethod
+    def _label(serialized, kwargs):
+        serialized = serialized or {}
+        return kwargs.get("name") or serialized.get("name") or (serialized.get("id") or ["unknown"])[-1]
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        prompt_tokens = sum(estimate_tokens(p) for p in prompts)
+        self._runs[run_id] = (self._label(serialized, kwargs), time.perf_counter(), prompt_tokens)
+        self._start_span("llm", run_id, parent_run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id in self._first_token or run_id not in self._runs:
+            return
+        self._first_token.add(run_id)
+        label, start, _ = self._runs[run_id]
+        self.registry.observe("llm_time_to_first_token_seconds", time.perf_counter() - start,
+                              help="Time to the first streamed token", llm=label)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        self._first_token.discard(run_id)
+        self._end_span(run_id)
+        if run is None:
+            return
+        label, start, prompt_tokens = run
+        self.registry.observe("llm_latency_seconds", time.perf_counter() - start,
+                              help="LLM call latency", llm=label)
+
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        completion_tokens = usage.get("completion_tokens")
+        if completion_tokens is None:
+            completion_tokens = sum(estimate_tokens(g.text) for gens in response.generations for g in gens)
+        self.registry.observe("llm_prompt_tokens", usage.get("prompt_tokens", prompt_tokens), TOKEN_BUCKETS,
+                              help="Prompt tokens per call", llm=label)
+        self.registry.observe("llm_completion_tokens", completion_tokens, TOKEN_BUCKETS,
+                              help="Completion tokens per call", llm=label)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        self._first_token.discard(run_id)
+        self._end_span(run_id, error)
+        self.registry.inc("llm_errors_total", help="Failed LLM calls",
+                          llm=run[0] if run else "llm", error=type(error).__name__)
+
+    # ------------------------------------------------------------- chains
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._runs[run_id] = (self._label(serialized, kwargs), time.perf_counter(), 0)
+        self._start_span("chain", run_id, parent_run_id)
+
+    def on_chain_end(self, outputs: Dict[str, Any], *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        self._end_span(run_id)
+        if run is not None:
+            self.registry.observe("chain_latency_seconds", time.perf_counter() - run[1],
+                                  help="Chain run latency", chain=run[0])
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        self._end_span(run_id, error)
+        self.registry.inc("chain_errors_total", help="Failed chain runs",
+                          chain=run[0] if run else "chain", error=type(error).__name__)
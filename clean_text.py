@@ -1,12 +1,10 @@
 import pandas as pd
 import re
+from functools import lru_cache
 
-# Charger les articles collectés
-df = pd.read_csv("articles_maladies_renales.csv")
+# Fichier des articles collectés
+CORPUS_PATH = "articles_maladies_renales.csv"
 
-# Vérifier les premières lignes
-print(df.head())
-# print("🔍 Nombre total d'articles :", len(df))
 
 def clean_text(text):
     """Nettoie le texte en supprimant les caractères spéciaux et les espaces inutiles."""
@@ -16,13 +14,35 @@ def clean_text(text):
     text = text.strip().lower()
     return text
 
-# Appliquer le nettoyage sur les abstracts en français
-df["abstract_fr_clean"] = df["abstract_fr"].apply(clean_text)
 
-# Supprimer les lignes avec abstracts vides
-df = df[df["abstract_fr_clean"] != ""]
+@lru_cache(maxsize=None)
+def load_clean_articles(path=CORPUS_PATH):
+    """
+    Charge les articles collectés et nettoie les abstracts en français.
+    Le résultat est mis en cache : le CSV n'est lu qu'une seule fois par processus.
+    """
+    df = pd.read_csv(path)
 
-# Créer la liste des abstracts propres
-list_abstract_fr_clean = df["abstract_fr_clean"].tolist()
+    # Appliquer le nettoyage sur les abstracts en français
+    df["abstract_fr_clean"] = df["abstract_fr"].apply(clean_text)
 
-# print(f"✅ Données nettoyées ! Nombre d'abstracts : {len(list_abstract_fr_clean)}")
\ No newline at end of file
+    # Supprimer les lignes avec abstracts vides
+    return df[df["abstract_fr_clean"] != ""]
+
+
+def __getattr__(name):
+    # `df` et `list_abstract_fr_clean` sont chargés à la demande pour que
+    # l'import de `clean_text` ne lise pas le CSV (ex. depuis retrieval.py).
+    if name == "df":
+        return load_clean_articles()
+    if name == "list_abstract_fr_clean":
+        # Créer la liste des abstracts propres
+        return load_clean_articles()["abstract_fr_clean"].tolist()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    df = load_clean_articles()
+    # Vérifier les premières lignes
+    print(df.head())
+    print(f"✅ Données nettoyées ! Nombre d'abstracts : {len(df)}")
@@ -0,0 +1,313 @@
+"""Inférence sur CPU : modèles quantifiés pour `QaLlm` et banc de comparaison.
+
+Backends (paramètre `backend` de `QaLlm`, derrière le même `get_llm()`) :
+- "torch" : PyTorch eager, le chemin par défaut (`device_map="auto"`) ;
+- "int8" : PyTorch eager, couches linéaires quantifiées en int8 dynamique
+  (poids int8, activations quantifiées à la volée) ; aucune dépendance en plus ;
+- "onnx" : ONNX Runtime (`optimum[onnxruntime]`) sur un export quantifié int8,
+  produit par `--export onnx` ; `model_name` est alors le dossier de l'export ;
+- "gguf" : llama.cpp (`llama-cpp-python`) sur un fichier GGUF quantifié int4
+  (Q4_K_M par défaut), produit par `--export gguf` ; `model_name` est le fichier.
+
+Les adaptateurs LoRA et le décodage spéculatif restent réservés au backend
+"torch" (fusionner l'adaptateur avant l'export) ; le cache du préambule sert
+aussi en "int8".
+
+Le banc charge chaque backend dans un sous-processus (mémoire mesurée sans
+interférence), génère en glouton sur un échantillon de prompts de la chaîne QCM
+et compare débit (tokens générés/s, comptés par le tokenizer du backend),
+latence, mémoire résidente (RSS) et accord des sorties avec PyTorch eager.
+
+Exemples :
+    python cpu_inference.py --export onnx --output ./llama2_onnx_int8
+    python cpu_inference.py --export gguf --output llama2-q4_k_m.gguf --llama-cpp ~/llama.cpp
+    python cpu_inference.py --backends torch int8 onnx gguf --onnx ./llama2_onnx_int8 --gguf llama2-q4_k_m.gguf
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer
+
+BACKENDS = ("torch", "int8", "onnx", "gguf")
+GGUF_QUANT = "Q4_K_M"
+SAMPLE_PATH = os.path.join("Collect_Dataset_Kidney_Disease", "articles_maladies_renales.csv")
+
+
+def has_vnni():
+    """Le CPU a-t-il les instructions AVX512-VNNI (produits scalaires int8) ?"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            return "avx512_vnni" in f.read()
+    except OSError:
+        return False
+
+
+def available_memory():
+    """Mémoire disponible (octets) selon /proc/meminfo, None si elle est inconnue."""
+    try:
+        with open("/proc/meminfo") as f:
+            return next(int(line.split()[1]) * 1024 for line in f if line.startswith("MemAvailable:"))
+    except (OSError, StopIteration):
+        return None
+
+
+def int8_peak_memory(model_name):
+    """
+    Pic de mémoire estimé de `load_int8` (octets) : les poids dans le type du
+    checkpoint (fp16 pour LLaMA 2, soit ~13,5 Go pour 7B), plus la plus grande
+    couche linéaire en fp32 et sa version int8. Calculé sans charger les poids.
+    """
+    config = AutoConfig.from_pretrained(model_name)
+    with torch.device("meta"):
+        skeleton = AutoModelForCausalLM.from_config(config)
+    dtype = getattr(config, "dtype", None) or getattr(config, "torch_dtype", None) or torch.float32
+    itemsize = (getattr(torch, dtype) if isinstance(dtype, str) else dtype).itemsize
+    largest = max(m.weight.numel() for m in skeleton.modules() if isinstance(m, torch.nn.Linear))
+    return sum(p.numel() for p in skeleton.parameters()) * itemsize + largest * 5
+
+
+def load_int8(model_name):
+    """
+    Modèle sur CPU dont les `nn.Linear` sont quantifiées en int8 dynamique.
+    Les poids sont chargés dans le type du checkpoint (et non en fp32), puis
+    chaque couche linéaire est passée en fp32 et quantifiée à son tour : le pic
+    reste celui du checkpoint (`int8_peak_memory`, ~2 octets par paramètre en
+    fp16 au lieu de 4). Le chargement s'arrête s'il ne tient pas en mémoire.
+    """
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicLinear
+    from torch.ao.quantization import default_dynamic_qconfig
+
+    needed, available = int8_peak_memory(model_name), available_memory()
+    if available is not None and needed > available:
+        raise MemoryError(f"Quantification int8 de {model_name} : ~{needed / 2**30:.1f} Go nécessaires, "
+                          f"{available / 2**30:.1f} Go disponibles")
+
+    model = AutoModelForCausalLM.from_pretrained(model_name, dtype="auto", low_cpu_mem_usage=True)
+    model.eval()
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if isinstance(child, torch.nn.Linear):
+                child.qconfig = default_dynamic_qconfig
+                setattr(module, name, DynamicLinear.from_float(child.float()))
+                del child
+    # Le reste (embeddings, normes) en fp32 : les couches int8 dynamiques attendent du fp32
+    for param in model.parameters():
+        param.data = param.data.float()
+    return model
+
+
+def load_onnx(export_dir):
+    """Modèle ONNX Runtime exporté par `export_onnx` (fichier quantifié si présent)."""
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    quantized = sorted(glob.glob(os.path.join(export_dir, "*_quantized.onnx")))
+    file_name = os.path.basename(quantized[0]) if quantized else None
+    return ORTModelForCausalLM.from_pretrained(export_dir, file_name=file_name, provider="CPUExecutionProvider")
+
+
+def gguf_llm(model_path, max_new_tokens, callback_manager=None, n_ctx=4096):
+    """LLM LangChain llama.cpp sur un fichier GGUF, avec tous les cœurs du CPU."""
+    from langchain_community.llms import LlamaCpp
+
+    return LlamaCpp(model_path=model_path, n_ctx=n_ctx, max_tokens=max_new_tokens, n_threads=os.cpu_count(),
+                    callback_manager=callback_manager, verbose=False)
+
+
+# ------------------------------------------------------------------ exports
+def export_onnx(model_name, output_dir, quantize=True):
+    """
+    Exporte `model_name` en ONNX (avec cache KV) dans `output_dir`, puis
+    quantifie ses poids en int8 dynamique (AVX512-VNNI si le CPU le permet,
+    AVX2 sinon). Le tokenizer est copié à côté.
+    """
+    from optimum.onnxruntime import ORTModelForCausalLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    with tempfile.TemporaryDirectory() as fp32_dir:
+        ORTModelForCausalLM.from_pretrained(model_name, export=True, use_cache=True).save_pretrained(fp32_dir)
+        if not quantize:
+            shutil.copytree(fp32_dir, output_dir, dirs_exist_ok=True)
+        else:
+            config = (AutoQuantizationConfig.avx512_vnni if has_vnni() else AutoQuantizationConfig.avx2)(
+                is_static=False, per_channel=True)
+            ORTQuantizer.from_pretrained(fp32_dir).quantize(save_dir=output_dir, quantization_config=config)
+            for name in os.listdir(fp32_dir):
+                if name.endswith(".json"):
+                    shutil.copy(os.path.join(fp32_dir, name), output_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+    print(f"✅ Export ONNX{' int8' if quantize else ''} écrit dans {output_dir}")
+
+
+def export_gguf(model_name, output, llama_cpp_dir, quant=GGUF_QUANT):
+    """
+    Convertit `model_name` (dossier Hugging Face local) en GGUF avec les outils
+    d'un dépôt llama.cpp compilé (`convert_hf_to_gguf.py`, `llama-quantize`),
+    puis le quantifie (`quant`, Q4_K_M par défaut : ~4,8 bits par poids).
+    """
+    quantize_bin = shutil.which("llama-quantize") or next(
+        iter(glob.glob(os.path.join(llama_cpp_dir, "**", "llama-quantize"), recursive=True)), None)
+    if quantize_bin is None:
+        raise FileNotFoundError(f"llama-quantize introuvable (compiler llama.cpp dans {llama_cpp_dir})")
+    with tempfile.TemporaryDirectory() as tmp:
+        f16 = os.path.join(tmp, "model-f16.gguf")
+        subprocess.run([sys.executable, os.path.join(llama_cpp_dir, "convert_hf_to_gguf.py"), model_name,
+                        "--outfile", f16, "--outtype", "f16"], check=True)
+        subprocess.run([quantize_bin, f16, output, quant], check=True)
+    print(f"✅ Export GGUF {quant} écrit dans {output}")
+
+
+# ---------------------------------------------------------------------- banc
+def rss_mb():
+    """Mémoire résidente actuelle du processus (Mo), 0 si /proc est absent."""
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024
+    except (OSError, StopIteration):
+        return 0.0
+
+
+def set_greedy(llm, max_new_tokens):
+    """Décodage glouton, identique pour tous les backends."""
+    if hasattr(llm, "pipeline"):
+        llm.pipeline_kwargs = {"do_sample": False, "max_new_tokens": max_new_tokens, "return_full_text": False}
+    else:
+        llm.temperature, llm.top_k, llm.repeat_penalty, llm.max_tokens = 0.0, 1, 1.0, max_new_tokens
+
+
+def token_counter(llm):
+    """Nombre de tokens d'un texte généré, selon le tokenizer du backend (HF ou llama.cpp)."""
+    if hasattr(llm, "pipeline"):
+        tokenizer = llm.pipeline.tokenizer
+        return lambda text: len(tokenizer(text, add_special_tokens=False)["input_ids"])
+    return llm.get_num_tokens  # `LlamaCpp` utilise le tokenizer du fichier GGUF
+
+
+def bench_one(backend, model_name, prompts, max_new_tokens, threads):
+    """Mesures d'un backend, dans le processus courant."""
+    from qa_llm import QaLlm
+
+    torch.set_num_threads(threads)
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    llm = QaLlm(model_name, backend=backend).get_llm()
+    load_s = time.perf_counter() - start
+    set_greedy(llm, max_new_tokens)
+
+    llm.invoke(prompts[0][:200])  # Échauffement (allocations, graphes ONNX)
+    outputs, latencies = [], []
+    for prompt in prompts:
+        start = time.perf_counter()
+        outputs.append(llm.invoke(prompt))
+        latencies.append(time.perf_counter() - start)
+    count = token_counter(llm)
+    return {
+        "backend": backend,
+        "chargement_s": load_s,
+        "tokens_s": sum(count(text) for text in outputs) / sum(latencies),
+        "caracteres_s": sum(len(text) for text in outputs) / sum(latencies),
+        "latence_moyenne_s": sum(latencies) / len(latencies),
+        "rss_charge_mo": rss_mb() - base_rss,
+        "rss_pic_mo": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "sorties": outputs,
+    }
+
+
+def run_isolated(backend, model_name, args):
+    """`bench_one` dans un sous-processus : le pic de mémoire ne mesure que ce backend."""
+    command = [sys.executable, os.path.abspath(__file__), "--child", backend, "--model", model_name,
+               "--data", args.data, "--sample", str(args.sample), "--seed", str(args.seed),
+               "--max-new-tokens", str(args.max_new_tokens), "--threads", str(args.threads)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"❌ {backend} : {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else result.returncode}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def sample_prompts(path, sample, seed):
+    """Prompts de la chaîne QCM sur un échantillon fixe d'abstracts."""
+    from clean_text import load_clean_articles
+    from qcm_chain import PROMPT
+
+    articles = load_clean_articles(path)
+    abstracts = articles["abstract_fr_clean"].sample(min(sample, len(articles)), random_state=seed)
+    return [PROMPT.format(text=abstract) for abstract in abstracts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export", choices=("onnx", "gguf"), help="Produire un export quantifié puis quitter")
+    parser.add_argument("--output", help="Dossier (onnx) ou fichier (gguf) de l'export")
+    parser.add_argument("--no-quantize", action="store_true", help="Export ONNX sans quantification int8")
+    parser.add_argument("--llama-cpp", default="llama.cpp", help="Dépôt llama.cpp compilé (export gguf)")
+    parser.add_argument("--quant", default=GGUF_QUANT, help="Type de quantification GGUF")
+    parser.add_argument("--model", default=None, help="Modèle Hugging Face (défaut : qa_llm.MODEL_NAME)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["torch", "int8"])
+    parser.add_argument("--onnx", help="Dossier de l'export ONNX (backend onnx)")
+    parser.add_argument("--gguf", help="Fichier GGUF (backend gguf)")
+    parser.add_argument("--data", default=SAMPLE_PATH, help="CSV des articles (colonne abstract_fr)")
+    parser.add_argument("--sample", type=int, default=5, help="Nombre d'abstracts de l'échantillon")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--json", help="Écrire le rapport dans ce fichier")
+    parser.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.model is None:
+        from qa_llm import MODEL_NAME
+        args.model = MODEL_NAME
+
+    if args.child:
+        prompts = sample_prompts(args.data, args.sample, args.seed)
+        print(json.dumps(bench_one(args.child, args.model, prompts, args.max_new_tokens, args.threads),
+                         ensure_ascii=False))
+        return
+
+    if args.export:
+        if not args.output:
+            parser.error("--export demande --output")
+        if args.export == "onnx":
+            export_onnx(args.model, args.output, quantize=not args.no_quantize)
+        else:
+            export_gguf(args.model, args.output, args.llama_cpp, args.quant)
+        return
+
+    paths = {"torch": args.model, "int8": args.model, "onnx": args.onnx, "gguf": args.gguf}
+    report = []
+    for backend in args.backends:
+        if not paths[backend]:
+            print(f"⚠️ {backend} ignoré : indiquer --{backend}")
+            continue
+        print(f"⏳ {backend}…")
+        row = run_isolated(backend, paths[backend], args)
+        if row:
+            report.append(row)
+
+    reference = next((row["sorties"] for row in report if row["backend"] == "torch"), None)
+    print(f"{'Backend':<9}{'Tokens/s':>10}{'Latence s':>11}{'Charg. s':>10}{'RSS Mo':>9}{'Pic Mo':>9}{'= torch':>9}")
+    for row in report:
+        if reference is not None:
+            row["accord_torch"] = sum(a == b for a, b in zip(row["sorties"], reference)) / len(reference)
+        agreement = f"{row['accord_torch']:>9.0%}" if "accord_torch" in row else f"{'-':>9}"
+        print(f"{row['backend']:<9}{row['tokens_s']:>10.1f}{row['latence_moyenne_s']:>11.2f}{row['chargement_s']:>10.1f}"
+              f"{row['rss_charge_mo']:>9.0f}{row['rss_pic_mo']:>9.0f}{agreement}")
+    print("(tokens : tokenizer de chaque backend ; = torch : sorties gloutonnes identiques)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parametres": vars(args), "resultats": report}, f, ensure_ascii=False, indent=2)
+        print(f"✅ Rapport écrit dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
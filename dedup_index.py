@@ -0,0 +1,177 @@
+"""Index de déduplication des questions (SimHash 64 bits + bandes LSH).
+
+Chaque question est réduite à deux empreintes de 64 bits :
+- `stem` : SimHash de son énoncé normalisé (sans casse, accents ni
+  ponctuation), calculé sur les trigrammes de caractères, les textes étant
+  courts ;
+- `key` : hachage exact du texte normalisé de la bonne réponse et des mots
+  pleins de l'énoncé (sans mots outils, au singulier et au masculin, nombres
+  et négations compris).
+Deux questions sont des quasi-doublons si leurs clés sont identiques et si
+leurs énoncés diffèrent d'au plus `max_distance` bits. Le SimHash seul ne
+suffit pas : « DFG < 15 mL/min » et « DFG < 30 mL/min » sont à 5 bits, et
+remplacer un mot d'un énoncé court (« chez le diabétique » / « chez
+l'enfant ») l'écarte d'autant qu'une reformulation. Seules les reformulations
+qui ne changent que les mots outils, la ponctuation, les accents, l'accord ou
+l'ordre des mots sont donc fusionnées ; un synonyme suffit à garder les deux
+questions.
+
+Les 64 bits de `stem` sont découpés en `bands` bandes (`bands > max_distance`) :
+deux quasi-doublons ont forcément une bande identique, et chaque table de
+bandes est indexée par (valeur de la bande, clé). Une insertion ne compare donc
+son énoncé qu'aux questions de même clé partageant une de ses bandes
+(recherche sous-linéaire, sans parcours O(n²) de la banque).
+
+`DedupIndex.rebuild` reconstruit l'index en bloc à partir d'un tableau
+d'empreintes (calculées par lot avec `fingerprints`).
+"""
+import hashlib
+import re
+import unicodedata
+
+import numpy as np
+
+from quiz_validation import answer_key
+
+BITS = 64
+# Empreintes d'une question : SimHash de l'énoncé, hachage exact de la réponse et des mots pleins
+FINGERPRINT_DTYPE = np.dtype([("stem", "<u8"), ("key", "<u8")])
+# Mélange d'une bande et d'une clé en un seul numéro de compartiment
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+# Mots outils ignorés dans la clé (les négations « ne », « pas », « sans » restent)
+STOPWORDS = frozenset("""
+a au aux avec c ce ces cet cette d dans de des du elle elles en est et il ils l la le les leur leurs lui
+on ou par pour qu que quel quelle quelles quels qui s sa se ses son sont sur t un une y
+""".split())
+
+
+def normalize(text):
+    """Texte sans casse, accents, ponctuation ni espaces superflus."""
+    text = unicodedata.normalize("NFKD", str(text).casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", text))
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def terms(text):
+    """Mots pleins distincts d'un texte normalisé, sans marque du pluriel ni du féminin, triés."""
+    words = set()
+    for word in text.split():
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word[-1] in "sx":
+            word = word[:-1]
+        if len(word) > 3 and word.endswith("e"):
+            word = word[:-1]
+        words.add(word)
+    return sorted(words)
+
+
+def fingerprint(record):
+    """(stem, key) d'une question au format commun (voir plus haut)."""
+    stem = normalize(record.get("question", ""))
+    answer = record.get("options", {}).get(answer_key({"answer": str(record.get("answer", ""))}), "")
+    return simhash(stem), _hash64(f"{normalize(answer)}|{' '.join(terms(stem))}")
+
+
+def _feature_hashes(text, n=3):
+    """Empreintes 64 bits des trigrammes de caractères (robustes aux petites reformulations)."""
+    text = f" {text} "
+    return np.array([_hash64(text[i:i + n]) for i in range(len(text) - n + 1)], dtype=np.uint64)
+
+
+def simhash(text):
+    """Empreinte SimHash 64 bits d'un texte déjà normalisé."""
+    hashes = _feature_hashes(text)
+    if not len(hashes):
+        return 0
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = (2 * bits.astype(np.int32) - 1).sum(axis=0)
+    return int(np.packbits(votes > 0, bitorder="little").view("<u8")[0])
+
+
+def fingerprints(records):
+    """Empreintes d'un lot de questions au format commun, en tableau `FINGERPRINT_DTYPE`."""
+    return np.array([fingerprint(record) for record in records], dtype=FINGERPRINT_DTYPE)
+
+
+def hamming(fingerprints, fingerprint):
+    """Distances de Hamming entre un tableau d'empreintes et une empreinte."""
+    xor = np.asarray(fingerprints, dtype=np.uint64) ^ np.uint64(fingerprint)
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class DedupIndex:
+    """
+    Empreintes des questions de la banque, par identifiant, avec leurs tables de
+    bandes. Avec les réglages par défaut (9 bits d'écart, 10 bandes de 6 ou 7
+    bits), seules les questions de même clé sont comparées.
+    """
+
+    def __init__(self, max_distance=9, bands=10):
+        if bands <= max_distance or bands > BITS:
+            raise ValueError("Il faut max_distance < bands <= 64")
+        self.max_distance = max_distance
+        self.bands = bands
+        bounds = np.linspace(0, BITS, bands + 1).astype(int)
+        self.slices = [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self.rebuild(np.zeros(0, dtype=FINGERPRINT_DTYPE))
+
+    def __len__(self):
+        return self.size
+
+    def _buckets(self, stems, keys):
+        """Compartiment de chaque bande : valeur de la bande mélangée à la clé."""
+        stems, keys = np.asarray(stems, dtype=np.uint64), np.asarray(keys, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return [((stems >> np.uint64(shift)) & np.uint64(mask)) ^ (keys * _MIX) for shift, mask in self.slices]
+
+    def query(self, stem, key):
+        """Identifiant de la question indexée la plus proche (même clé, au plus `max_distance` bits), ou None."""
+        buckets = [int(b) for b in self._buckets(np.uint64(stem), np.uint64(key))]
+        candidates = [table[b] for table, b in zip(self.tables, buckets) if b in table]
+        if not candidates:
+            return None
+        candidates = np.unique(np.concatenate(candidates))
+        candidates = candidates[self.fingerprints["key"][candidates] == np.uint64(key)]  # Collisions de compartiment
+        if not len(candidates):
+            return None
+        distances = hamming(self.fingerprints["stem"][candidates], stem)
+        best = int(distances.argmin())
+        return int(candidates[best]) if distances[best] <= self.max_distance else None
+
+    def add(self, stem, key):
+        """Indexe une question ; renvoie son identifiant (position dans l'index)."""
+        if self.size == len(self.fingerprints):
+            grown = np.zeros(max(self.size, 1024), dtype=FINGERPRINT_DTYPE)
+            self.fingerprints = np.concatenate([self.fingerprints, grown])
+        i = self.size
+        self.fingerprints[i] = (stem, key)
+        self.size += 1
+        for table, b in zip(self.tables, self._buckets(np.uint64(stem), np.uint64(key))):
+            table.setdefault(int(b), []).append(i)
+        return i
+
+    def insert(self, stem, key):
+        """(identifiant, nouvelle ?) : un quasi-doublon renvoie l'identifiant de la question existante."""
+        existing = self.query(stem, key)
+        if existing is not None:
+            return existing, False
+        return self.add(stem, key), True
+
+    def rebuild(self, fingerprints):
+        """Reconstruit l'index en bloc (identifiants = positions dans `fingerprints`)."""
+        fingerprints = np.asarray(fingerprints, dtype=FINGERPRINT_DTYPE)
+        self.fingerprints = fingerprints.copy()
+        self.size = len(fingerprints)
+        self.tables = []
+        for buckets in self._buckets(fingerprints["stem"], fingerprints["key"]):
+            order = np.argsort(buckets, kind="stable")
+            distinct, starts = np.unique(buckets[order], return_index=True)
+            self.tables.append({
+                b: ids.tolist() for b, ids in zip(distinct.tolist(), np.split(order, starts[1:]))
+            })
+        return self
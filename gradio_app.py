@@ -0,0 +1,141 @@
+import argparse
+import math
+import os
+from functools import partial
+
+import gradio as gr
+from answer_key import AnswerKey
+
+BANK_PATH = "./Collect_Dataset_Kidney_Disease/CKD.csv"
+PAGE_SIZE = 10
+
+def load_key(path=BANK_PATH):
+    """Parse a CSV bank, or map a directory written by `AnswerKey.save` read-only."""
+    return AnswerKey.load(path) if os.path.isdir(path) else AnswerKey.from_csv(path)
+
+# Function to evaluate the quiz
+def evaluate_quiz(key, *responses):
+    score = key.score(responses)
+    return f"Your score is {score}/{len(key)}"
+
+# Create Gradio interface
+def create_quiz_interface(key):
+    question_elements = []
+    for idx, question in enumerate(key.questions):
+        # Options are shown by text, the selected value is the option key ('a', 'b', ...)
+        question_elements.append(gr.Radio(label=question, choices=key.choices(idx)))
+
+    quiz_interface = gr.Interface(
+        fn=partial(evaluate_quiz, key),
+        inputs=question_elements,
+        outputs="text",
+        title="QuizCrafter",
+        description="Select the correct answers and submit to see your score."
+    )
+    return quiz_interface
+
+# Session mode: N sampled questions per learner, rendered page by page
+def render_page(key, session):
+    """Updates for the page's Radio slots and the page indicator; only this page is sent to the browser."""
+    ids = session["ids"]
+    start = session["page"] * PAGE_SIZE
+    page_ids = ids[start:start + PAGE_SIZE]
+
+    updates = []
+    for slot in range(PAGE_SIZE):
+        if slot < len(page_ids):
+            idx = page_ids[slot]
+            updates.append(gr.update(
+                visible=True,
+                label=f"{start + slot + 1}. {key.questions[idx]}",
+                choices=key.choices(idx),
+                value=session["answers"].get(idx),
+            ))
+        else:
+            updates.append(gr.update(visible=False, choices=[], value=None))
+
+    n_pages = max(1, math.ceil(len(ids) / PAGE_SIZE))
+    return [*updates, f"Page {session['page'] + 1}/{n_pages}"]
+
+def save_page(session, responses):
+    """Store the answers of the current page in the session state."""
+    start = session["page"] * PAGE_SIZE
+    for idx, response in zip(session["ids"][start:start + PAGE_SIZE], responses):
+        if response is not None:
+            session["answers"][idx] = response
+
+def start_session(key, n, stratify_by):
+    ids = key.sample(int(n), None if stratify_by == "None" else stratify_by)
+    session = {"ids": [int(idx) for idx in ids], "page": 0, "answers": {}}
+    return [session, *render_page(key, session), ""]
+
+def change_page(key, step, session, *responses):
+    if not session:
+        return [session, *[gr.update() for _ in range(PAGE_SIZE)], "Start a session first.", ""]
+    save_page(session, responses)
+    last_page = max(0, math.ceil(len(session["ids"]) / PAGE_SIZE) - 1)
+    session["page"] = min(max(session["page"] + step, 0), last_page)
+    return [session, *render_page(key, session), ""]
+
+def submit_session(key, session, *responses):
+    if not session:
+        return "Start a session first."
+    save_page(session, responses)
+    ids = session["ids"]
+    score = key.score([session["answers"].get(idx) for idx in ids], ids)
+    return f"Your score is {score}/{len(ids)} ({len(session['answers'])} answered)"
+
+def create_session_interface(key, default_size=20):
+    with gr.Blocks(title="QuizCrafter") as demo:
+        gr.Markdown("# QuizCrafter\nStart a session to get a sample of questions from the bank.")
+        session = gr.State(None)
+        with gr.Row():
+            size = gr.Number(value=default_size, minimum=1, precision=0, label="Questions per session")
+            stratify_by = gr.Dropdown(["None", *key.strata], value="None", label="Stratify by")
+            start = gr.Button("Start session", variant="primary")
+
+        radios = [gr.Radio(visible=False) for _ in range(PAGE_SIZE)]
+        page_label = gr.Markdown()
+        with gr.Row():
+            previous_page = gr.Button("Previous")
+            next_page = gr.Button("Next")
+            submit = gr.Button("Submit", variant="primary")
+        result = gr.Textbox(label="Result")
+
+        # Named endpoints, so that load_test.py can drive a session through gradio_client
+        page_outputs = [session, *radios, page_label, result]
+        start.click(partial(start_session, key), [size, stratify_by], page_outputs, api_name="start_session")
+        previous_page.click(partial(change_page, key, -1), [session, *radios], page_outputs, api_name="previous_page")
+        next_page.click(partial(change_page, key, 1), [session, *radios], page_outputs, api_name="next_page")
+        submit.click(partial(submit_session, key), [session, *radios], result, api_name="submit_session")
+    return demo
+
+def build_app(key, mode="session", concurrency=8, max_queue=256):
+    """
+    The interface with its request queue: at most `concurrency` events run at
+    once, and at most `max_queue` wait before new requests are rejected.
+    """
+    if mode == "full":
+        demo = create_quiz_interface(key)
+    else:
+        # Build the strata indexes at startup rather than on the first session
+        for column in key.strata:
+            key.sample(1, column)
+        demo = create_session_interface(key)
+    return demo.queue(default_concurrency_limit=concurrency, max_size=max_queue)
+
+# Initialize and launch the Gradio app
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="QuizCrafter Gradio app")
+    parser.add_argument("--mode", choices=["session", "full"], default="session",
+                        help="'session': sampled, paginated quiz per learner; 'full': every question of the bank on one page")
+    parser.add_argument("--bank", default=BANK_PATH,
+                        help="CSV bank, or a directory written by AnswerKey.save (memory-mapped)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Events processed concurrently")
+    parser.add_argument("--max-queue", type=int, default=256, help="Waiting requests before new ones are rejected")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    quiz_interface = build_app(load_key(args.bank), args.mode, args.concurrency, args.max_queue)
+    quiz_interface.launch(server_name=args.host, server_port=args.port)
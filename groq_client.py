@@ -0,0 +1,110 @@
+"""Client de l'API Groq et extraction du JSON renvoyé par le modèle."""
+import json
+import os
+import re
+import time
+
+import requests
+import streamlit as st
+
+# ✅ Configuration de l'API Groq
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+
+def groq_headers():
+    """En-têtes des requêtes Groq ; la clé est lue uniquement dans la variable d'environnement GROQ_API_KEY."""
+    api_key = os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY n'est pas définie : exportez votre clé de l'API Groq "
+                           "(https://console.groq.com/keys) avant d'appeler Groq")
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+
+def query_groq(prompt, model="mistral-saba-24b", max_retries=3, wait_time=5):
+    """
+    Envoie une requête à l'API Groq et gère les erreurs.
+    """
+    headers = groq_headers()
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.7,
+        "max_tokens": 1024  # Augmentez cette valeur
+    }
+
+    for attempt in range(max_retries):
+        try:
+            response = requests.post(GROQ_URL, headers=headers, json=payload, timeout=30)
+
+            if response.status_code == 404:
+                st.error("❌ Erreur 404 : Vérifiez l'URL de l'API Groq")
+                return None
+
+            if response.status_code == 401:
+                st.error("❌ Erreur 401 : Vérifiez votre clé API Groq")
+                return None
+
+            if response.status_code == 503:
+                st.warning(f"🔄 Serveur occupé, attente de {wait_time} secondes...")
+                time.sleep(wait_time)
+                continue
+
+            response.raise_for_status()
+
+            response_json = response.json()
+            if "choices" in response_json:
+                return response_json["choices"][0]["message"]["content"]
+            else:
+                st.error(f"⚠️ Réponse inattendue de Groq : {response_json}")
+                return None
+
+        except requests.exceptions.RequestException as e:
+            st.error(f"❌ Tentative {attempt+1}/{max_retries} échouée : {e}")
+            time.sleep(wait_time)
+
+    return None
+
+def extract_json_from_text(text, debug=False):
+    """
+    Extrait proprement le JSON de la réponse du modèle.
+    Avec `debug=True`, le texte brut est affiché dans l'interface.
+    """
+    if not text:
+        return {"error": "Aucune réponse obtenue du modèle"}
+
+    # Afficher le texte brut pour débogage
+    if debug:
+        st.code(text, language="json")
+
+    # Tentative d'extraction et nettoyage du JSON
+    try:
+        # Essayer d'abord de charger le texte directement
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # Si échec, tenter d'extraire avec regex et nettoyer
+        json_match = re.search(r"\{.*\}", text, re.DOTALL)
+
+        if json_match:
+            json_text = json_match.group(0)
+
+            # Nettoyage supplémentaire du JSON
+            try:
+                # Remplacer les sauts de ligne non échappés dans les chaînes
+                cleaned_json = re.sub(r'(?<!\\)\\n', '\\\\n', json_text)
+                # Corriger les virgules en trop avant les accolades fermantes
+                cleaned_json = re.sub(r',(\s*})', r'\1', cleaned_json)
+                # Ajouter les accolades manquantes si nécessaire
+                if cleaned_json.count('{') > cleaned_json.count('}'):
+                    cleaned_json += "}" * (cleaned_json.count('{') - cleaned_json.count('}'))
+
+                return json.loads(cleaned_json)
+            except json.JSONDecodeError as e:
+                st.error(f"🚨 Erreur JSON après nettoyage : {e}")
+                if debug:
+                    st.code(cleaned_json, language="json")
+                return {"error": f"JSON invalide : {e}"}
+        else:
+            return {"error": "Aucun JSON détecté dans la réponse"}
@@ -0,0 +1,234 @@
+"""Persistance des apprenants, tentatives et réponses dans SQLite.
+
+La base est ouverte en mode WAL : plusieurs processus Streamlit du même hôte
+lisent pendant qu'un autre écrit. Les agrégats par apprenant (nombre de quiz,
+de questions et de bonnes réponses) sont mis à jour dans la même transaction que
+la tentative, si bien que `get_stats` est une simple lecture par clé primaire.
+Les brouillons (quiz en cours et réponses cochées) sont regroupés en mémoire et
+écrits par lots, au plus tard `flush_interval` secondes après leur mise en
+attente (minuterie) : le dernier brouillon d'une session inactive devient lui
+aussi visible des autres processus.
+"""
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+DB_PATH = "quiz_learners.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS learners (
+    learner_id TEXT PRIMARY KEY,
+    quiz_count INTEGER NOT NULL DEFAULT 0,
+    questions INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    current_difficulty TEXT NOT NULL DEFAULT 'Moyen',
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    question_id TEXT PRIMARY KEY,
+    topic TEXT,
+    difficulty TEXT,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    attempt_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    learner_id TEXT NOT NULL,
+    topic TEXT,
+    difficulty TEXT,
+    questions INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS answers (
+    attempt_id INTEGER NOT NULL,
+    learner_id TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    selected TEXT,
+    is_correct INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_learner ON answers (learner_id);
+CREATE TABLE IF NOT EXISTS drafts (
+    learner_id TEXT PRIMARY KEY,
+    topic TEXT,
+    quiz TEXT,
+    answers TEXT,
+    submitted INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL
+);
+"""
+
+EMPTY_STATS = {"quiz_count": 0, "questions": 0, "correct": 0, "current_difficulty": "Moyen"}
+
+
+def question_id(q_data):
+    """Identifiant stable d'une question : empreinte de son énoncé et de ses options."""
+    key = json.dumps(
+        [q_data.get("question", q_data.get("mcq", "")), q_data.get("options", {})],
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class LearnerStore:
+    """Accès partagé (thread-safe) à la base des apprenants."""
+
+    def __init__(self, path=DB_PATH, batch_size=32, flush_interval=2.0):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SCHEMA)
+
+        self.lock = threading.Lock()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending_drafts = {}  # learner_id -> ligne du brouillon (les écritures successives fusionnent)
+        self._last_flush = time.monotonic()
+        self._timer = None  # Écriture différée des brouillons en attente
+        atexit.register(self.flush)
+
+    # ---------------------------------------------------------------- agrégats
+    def get_stats(self, learner_id):
+        """
+        Agrégats de l'apprenant, lus par clé primaire à chaque appel : pas de cache
+        en mémoire, qui resterait périmé quand un autre processus écrit dans la base.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT quiz_count, questions, correct, current_difficulty FROM learners WHERE learner_id = ?",
+                (learner_id,),
+            ).fetchone()
+        return dict(zip(EMPTY_STATS, row)) if row else dict(EMPTY_STATS)
+
+    def set_difficulty(self, learner_id, difficulty):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO learners (learner_id, current_difficulty, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(learner_id) DO UPDATE SET current_difficulty = excluded.current_difficulty, "
+                "updated_at = excluded.updated_at",
+                (learner_id, difficulty, time.time()),
+            )
+
+    def get_responses(self, learner_id):
+        """Réponses de l'apprenant : [(question_id, niveau de la question, correct)]."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT a.question_id, q.difficulty, a.is_correct FROM answers a "
+                "LEFT JOIN questions q ON q.question_id = a.question_id WHERE a.learner_id = ?",
+                (learner_id,),
+            ).fetchall()
+
+    def bank_size(self):
+        """Nombre (approximatif, O(log n)) de questions dans la banque."""
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM questions").fetchone()[0]
+
+    def get_questions(self, question_ids):
+        """Questions de la banque, dans l'ordre de `question_ids`."""
+        if not question_ids:
+            return []
+        with self.lock:
+            rows = dict(self.conn.execute(
+                f"SELECT question_id, payload FROM questions WHERE question_id IN ({','.join('?' * len(question_ids))})",
+                list(question_ids),
+            ).fetchall())
+        return [json.loads(rows[q_id]) for q_id in question_ids if q_id in rows]
+
+    # --------------------------------------------------------------- tentatives
+    def record_attempt(self, learner_id, quiz_data, user_answers, topic="", difficulty="Moyen"):
+        """
+        Enregistre une tentative et ses réponses en une seule transaction et met
+        à jour les agrégats de l'apprenant. Renvoie le nombre de bonnes réponses.
+        """
+        now = time.time()
+        questions, answers = [], []
+        for q_num, q_data in quiz_data.items():
+            q_id = question_id(q_data)
+            selected = user_answers.get(q_num, "")
+            questions.append((q_id, topic, difficulty, json.dumps(q_data, ensure_ascii=False)))
+            answers.append((q_id, selected, int(selected == q_data.get("correct", ""))))
+        correct = sum(is_correct for _, _, is_correct in answers)
+
+        with self.lock:
+            self._flush_drafts()
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                cursor = self.conn.execute(
+                    "INSERT INTO attempts (learner_id, topic, difficulty, questions, correct, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (learner_id, topic, difficulty, len(answers), correct, now),
+                )
+                attempt_id = cursor.lastrowid
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO questions (question_id, topic, difficulty, payload) VALUES (?, ?, ?, ?)",
+                    questions,
+                )
+                self.conn.executemany(
+                    "INSERT INTO answers (attempt_id, learner_id, question_id, selected, is_correct) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(attempt_id, learner_id, *answer) for answer in answers],
+                )
+                self.conn.execute(
+                    "INSERT INTO learners (learner_id, quiz_count, questions, correct, current_difficulty, updated_at) "
+                    "VALUES (?, 1, ?, ?, ?, ?) "
+                    "ON CONFLICT(learner_id) DO UPDATE SET quiz_count = quiz_count + 1, "
+                    "questions = questions + excluded.questions, correct = correct + excluded.correct, "
+                    "updated_at = excluded.updated_at",
+                    (learner_id, len(answers), correct, difficulty, now),
+                )
+                self.conn.execute("UPDATE drafts SET submitted = 1 WHERE learner_id = ?", (learner_id,))
+        return correct
+
+    # -------------------------------------------------------------- brouillons
+    def save_draft(self, learner_id, quiz_data, user_answers, topic="", submitted=False):
+        """Mémorise le quiz en cours ; l'écriture est différée et regroupée."""
+        with self.lock:
+            self._pending_drafts[learner_id] = (
+                learner_id, topic, json.dumps(quiz_data, ensure_ascii=False),
+                json.dumps(user_answers), int(submitted), time.time(),
+            )
+            if (len(self._pending_drafts) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_drafts()
+            elif self._timer is None:
+                # Sans nouvel enregistrement, la minuterie écrit le lot en attente
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def load_draft(self, learner_id):
+        """Renvoie (quiz, réponses, sujet, soumis) du dernier brouillon, ou None."""
+        with self.lock:
+            row = self._pending_drafts.get(learner_id)
+            if row is None:
+                row = self.conn.execute(
+                    "SELECT learner_id, topic, quiz, answers, submitted, updated_at FROM drafts WHERE learner_id = ?",
+                    (learner_id,),
+                ).fetchone()
+        if row is None or row[2] is None:
+            return None
+        _, topic, quiz, answers, submitted, _ = row
+        return json.loads(quiz), json.loads(answers), topic, bool(submitted)
+
+    def flush(self):
+        with self.lock:
+            self._flush_drafts()
+
+    def _flush_drafts(self):
+        # Appelé avec `self.lock` acquis
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending_drafts:
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO drafts (learner_id, topic, quiz, answers, submitted, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    list(self._pending_drafts.values()),
+                )
+            self._pending_drafts.clear()
+        self._last_flush = time.monotonic()
@@ -0,0 +1,418 @@
+"""Routeur asynchrone entre les backends LLM (Groq, Ollama, LLaMA 2 local).
+
+Tous les backends exposent `async complete(prompt) -> str`. Le routeur suit pour
+chacun, sur une fenêtre glissante, la latence (moyenne exponentielle et p95),
+le taux d'erreur, les requêtes en cours et la marge de quota annoncée par l'API
+(en-têtes de rate limit de Groq). Chaque requête part vers le backend sain le
+mieux classé (latence attendue, charge, erreurs, quota, coût) :
+- requête couverte (« hedged ») : si la réponse tarde au-delà du p95 habituel du
+  backend, la même requête part aussi vers le suivant, et la première réponse
+  gagne (l'autre est annulée) ; seuls les backends dont l'appel s'arrête à
+  l'annulation servent de couverture (pas Groq, limité en quota et facturé, ni
+  le modèle local, qui tourne dans un thread) ;
+- bascule : une erreur fait passer au backend suivant ; une réponse 429 met le
+  backend en pause jusqu'à la fin de la fenêtre de quota, un taux d'erreur
+  excessif le coupe pendant `cooldown` secondes (disjoncteur) ;
+- nouvel essai : quand il ne reste aucun autre backend (par exemple Groq seul),
+  le même est réessayé après une attente exponentielle (`retry_wait`, doublée à
+  chaque essai) ou la fin de sa pause, si elle survient avant `max_wait`.
+Les mesures sont exportées par `callback.REGISTRY` (router_latency_seconds,
+router_errors_total, router_hedges_total).
+
+Les `FakeBackend` (latence, erreurs et quota simulés) permettent d'essayer le
+routage hors ligne :
+    python llm_router.py --fake --requests 300 --concurrency 16
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import deque
+
+import aiohttp
+import numpy as np
+
+from callback import REGISTRY
+
+OLLAMA_URL = "http://localhost:11434/api/generate"
+
+
+class BackendError(RuntimeError):
+    pass
+
+
+class RateLimited(BackendError):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ------------------------------------------------------------------ backends
+class Backend:
+    """
+    Backend minimal : un nom, un coût relatif par requête et une concurrence
+    maximale. `hedge_target` : peut recevoir les requêtes de couverture (il faut
+    que leur annulation arrête vraiment l'appel).
+    """
+
+    hedge_target = True
+
+    def __init__(self, name, cost=0.0, max_concurrency=8, expected_latency=1.0):
+        self.name = name
+        self.cost = cost
+        self.max_concurrency = max_concurrency
+        self.expected_latency = expected_latency  # a priori, avant les premières mesures
+        self.rate_limit = None  # (requêtes restantes, limite) annoncées par l'API
+
+    async def complete(self, prompt):
+        raise NotImplementedError
+
+
+class GroqBackend(Backend):
+    # Quota limité et requêtes facturées : une requête de couverture annulée aurait
+    # déjà été envoyée, donc Groq ne sert jamais de couverture
+    hedge_target = False
+
+    def __init__(self, model="mistral-saba-24b", cost=1.0, max_concurrency=8, timeout=30, **kwargs):
+        super().__init__(f"groq:{model}", cost, max_concurrency, **kwargs)
+        self.model = model
+        self.timeout = timeout
+
+    async def complete(self, prompt):
+        from groq_client import GROQ_URL, groq_headers
+
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.7,
+            "max_tokens": 1024,
+        }
+        # Client asynchrone : annuler la tâche ferme réellement la connexion
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                async with session.post(GROQ_URL, headers=groq_headers(), json=payload) as response:
+                    headers = response.headers
+                    if "x-ratelimit-remaining-requests" in headers and "x-ratelimit-limit-requests" in headers:
+                        self.rate_limit = (int(headers["x-ratelimit-remaining-requests"]),
+                                           int(headers["x-ratelimit-limit-requests"]))
+                    if response.status == 429:
+                        retry_after = headers.get("retry-after")
+                        raise RateLimited("Quota Groq atteint", float(retry_after) if retry_after else None)
+                    if response.status >= 400:
+                        raise BackendError(f"Groq HTTP {response.status}")
+                    body = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise BackendError(f"Groq : {e!r}") from e
+        if "choices" not in body:
+            raise BackendError(f"Réponse inattendue de Groq : {body}")
+        return body["choices"][0]["message"]["content"]
+
+
+class OllamaBackend(Backend):
+    def __init__(self, model="mistral", url=OLLAMA_URL, cost=0.0, max_concurrency=2, timeout=120, **kwargs):
+        super().__init__(f"ollama:{model}", cost, max_concurrency, **kwargs)
+        self.model = model
+        self.url = url
+        self.timeout = timeout
+
+    async def complete(self, prompt):
+        payload = {"model": self.model, "prompt": prompt, "stream": False,
+                   "options": {"temperature": 0.1, "top_p": 0.95}}
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                async with session.post(self.url, json=payload) as response:
+                    if response.status >= 400:
+                        raise BackendError(f"Ollama HTTP {response.status}")
+                    body = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise BackendError(f"Ollama : {e!r}") from e
+        return body.get("response", "")
+
+
+class LocalBackend(Backend):
+    """LLM LangChain local, par exemple `QaLlm().get_llm()` (un seul appel à la fois)."""
+
+    # La génération tourne dans un thread que l'annulation n'arrête pas
+    hedge_target = False
+
+    def __init__(self, llm, name="local:llama2", cost=0.0, max_concurrency=1, **kwargs):
+        super().__init__(name, cost, max_concurrency, **kwargs)
+        self.llm = llm
+
+    async def complete(self, prompt):
+        return await self.llm.ainvoke(prompt)
+
+
+class FakeBackend(Backend):
+    """
+    Backend simulé : latence log-normale autour de `latency`, erreurs avec la
+    probabilité `error_rate` et quota de `rate_limit` requêtes par `window` secondes.
+    """
+
+    def __init__(self, name, latency=0.1, jitter=0.5, error_rate=0.0, rate_limit=None, window=1.0,
+                 cost=0.0, max_concurrency=8, response="{}", seed=None):
+        super().__init__(name, cost, max_concurrency, expected_latency=latency)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota = rate_limit
+        self.window = window
+        self.response = response
+        self.random = random.Random(seed)
+        self.calls = deque()
+
+    async def complete(self, prompt):
+        now = time.monotonic()
+        if self.quota is not None:
+            while self.calls and self.calls[0] <= now - self.window:
+                self.calls.popleft()
+            self.rate_limit = (max(self.quota - len(self.calls), 0), self.quota)
+            if len(self.calls) >= self.quota:
+                raise RateLimited(f"{self.name} : quota atteint", self.calls[0] + self.window - now)
+            self.calls.append(now)
+        await asyncio.sleep(self.latency * self.random.lognormvariate(0, self.jitter))
+        if self.random.random() < self.error_rate:
+            raise BackendError(f"{self.name} : erreur simulée")
+        return self.response
+
+
+# ----------------------------------------------------------------- statistiques
+class BackendStats:
+    """Mesures glissantes d'un backend."""
+
+    def __init__(self, backend, window=50, alpha=0.2):
+        self.latencies = deque(maxlen=window)  # requêtes réussies
+        self.outcomes = deque(maxlen=window)   # True si réussie
+        self.alpha = alpha
+        self.ewma = backend.expected_latency
+        self.inflight = 0
+        self.paused_until = 0.0
+
+    def record(self, ok, latency):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+            self.ewma += self.alpha * (latency - self.ewma)
+
+    @property
+    def error_rate(self):
+        return 1 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def p95(self):
+        return float(np.percentile(self.latencies, 95)) if self.latencies else None
+
+
+class Router:
+    """
+    Répartit les requêtes entre `backends`. `hedge_after` fixe le délai avant
+    la requête de couverture (par défaut, le p95 du backend choisi) ; `hedge=False`
+    la désactive. `cost_weight` convertit le coût d'un backend en secondes.
+    `retry_wait` et `max_wait` bornent les nouveaux essais d'un backend seul.
+    """
+
+    def __init__(self, backends, hedge=True, hedge_after=None, max_attempts=3, cost_weight=0.0,
+                 max_error_rate=0.5, min_samples=10, cooldown=30.0, retry_wait=1.0, max_wait=30.0,
+                 registry=REGISTRY):
+        self.backends = list(backends)
+        self.stats = {b.name: BackendStats(b) for b in self.backends}
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.max_attempts = max_attempts
+        self.cost_weight = cost_weight
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.retry_wait = retry_wait
+        self.max_wait = max_wait
+        self.registry = registry
+
+    # ------------------------------------------------------------ classement
+    def healthy(self, backend, now=None):
+        stats = self.stats[backend.name]
+        return (now or time.monotonic()) >= stats.paused_until
+
+    def score(self, backend):
+        """Coût attendu d'une requête, en secondes (plus bas = meilleur)."""
+        stats = self.stats[backend.name]
+        load = 1 + stats.inflight / backend.max_concurrency
+        headroom = 1.0
+        if backend.rate_limit and backend.rate_limit[1]:
+            headroom = max(backend.rate_limit[0] / backend.rate_limit[1], 0.05)
+        return stats.ewma * load * (1 + 4 * stats.error_rate) / headroom + self.cost_weight * backend.cost
+
+    def rank(self, exclude=()):
+        """Backends sains, du meilleur au moins bon ; ceux qui sont saturés passent en dernier."""
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b.name not in exclude and self.healthy(b, now)]
+        return sorted(candidates, key=lambda b: (self.stats[b.name].inflight >= b.max_concurrency, self.score(b)))
+
+    def _hedge_delay(self, backend):
+        if self.hedge_after is not None:
+            return self.hedge_after
+        stats = self.stats[backend.name]
+        return stats.p95() if len(stats.latencies) >= self.min_samples else 2 * stats.ewma
+
+    # --------------------------------------------------------------- appels
+    async def _call(self, backend, prompt):
+        stats = self.stats[backend.name]
+        stats.inflight += 1
+        start = time.monotonic()
+        try:
+            text = await backend.complete(prompt)
+        except asyncio.CancelledError:
+            raise  # Requête de couverture perdante : ni succès ni erreur
+        except Exception as e:
+            stats.record(False, time.monotonic() - start)
+            self.registry.inc("router_errors_total", help="Appels en échec par backend", backend=backend.name)
+            if isinstance(e, RateLimited):
+                stats.paused_until = time.monotonic() + (e.retry_after or self.retry_wait)
+            elif len(stats.outcomes) >= self.min_samples and stats.error_rate > self.max_error_rate:
+                stats.paused_until = time.monotonic() + self.cooldown
+                stats.outcomes.clear()  # Nouvel essai à la réouverture
+            raise
+        finally:
+            stats.inflight -= 1
+        latency = time.monotonic() - start
+        stats.record(True, latency)
+        self.registry.observe("router_latency_seconds", latency, help="Latence des appels par backend",
+                              backend=backend.name)
+        return text
+
+    async def _race(self, prompt, primary, secondary, failed):
+        """
+        Appelle `primary`, puis aussi `secondary` s'il tarde ; renvoie le texte de
+        la première réussite. Les backends en échec sont ajoutés à `failed`.
+        """
+        tasks = {asyncio.ensure_future(self._call(primary, prompt)): primary}
+        done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(primary) if secondary else None)
+        if not done and secondary is not None:
+            self.registry.inc("router_hedges_total", help="Requêtes de couverture envoyées", backend=secondary.name)
+            tasks[asyncio.ensure_future(self._call(secondary, prompt))] = secondary
+
+        error = None
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    failed.add(tasks[task].name)
+        finally:
+            for task in pending:
+                task.cancel()
+            # Attendre l'annulation : connexion fermée et `inflight` à jour au retour
+            await asyncio.gather(*pending, return_exceptions=True)
+        raise error
+
+    async def generate(self, prompt):
+        """Texte généré par le meilleur backend disponible (avec couverture et bascule)."""
+        tried, errors, retries = set(), [], 0
+        for _ in range(self.max_attempts):
+            ranked = self.rank(exclude=tried)
+            if not ranked:
+                # Plus aucun autre backend : on réessaie celui dont la pause finit le plus tôt
+                primary = min(self.backends, key=lambda b: self.stats[b.name].paused_until)
+                pause = self.stats[primary.name].paused_until - time.monotonic()
+                wait = max(pause, self.retry_wait * 2 ** retries)
+                if wait > self.max_wait:
+                    errors.append(f"{primary.name} : en pause encore {pause:.0f} s")
+                    break
+                await asyncio.sleep(wait)
+                retries += 1
+                ranked = [primary]
+            primary = ranked[0]
+            secondary = next((b for b in ranked[1:] if b.hedge_target), None) if self.hedge else None
+            failed = set()
+            try:
+                return await self._race(prompt, primary, secondary, failed)
+            except Exception as e:
+                errors.append(f"{' / '.join(sorted(failed))} : {e}")
+                tried |= failed
+        raise BackendError("Aucun backend n'a répondu (" + " ; ".join(errors or ["aucun backend sain"]) + ")")
+
+    def generate_sync(self, prompt):
+        """`generate` depuis du code synchrone (Streamlit) ; lève `BackendError` si tous les essais ont échoué."""
+        return asyncio.run(self.generate(prompt))
+
+    def snapshot(self):
+        """État de chaque backend : latence, p95, taux d'erreur, requêtes en cours, pause, quota."""
+        now = time.monotonic()
+        return {
+            b.name: {
+                "latence_s": round(s.ewma, 3),
+                "p95_s": None if s.p95() is None else round(s.p95(), 3),
+                "erreurs": round(s.error_rate, 3),
+                "en_cours": s.inflight,
+                "pause_s": round(max(s.paused_until - now, 0.0), 1),
+                "quota": b.rate_limit,
+            }
+            for b in self.backends for s in [self.stats[b.name]]
+        }
+
+
+def build_router(groq_model="mistral-saba-24b", ollama_model=None, local_llm=None, **kwargs):
+    """Routeur Groq, plus Ollama et le modèle local s'ils sont fournis."""
+    backends = [GroqBackend(groq_model)]
+    if ollama_model:
+        backends.append(OllamaBackend(ollama_model, expected_latency=5.0))
+    if local_llm is not None:
+        backends.append(LocalBackend(local_llm, expected_latency=30.0))
+    return Router(backends, **kwargs)
+
+
+async def _simulate(router, n_requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one(i):
+        nonlocal failures
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                await router.generate(f"prompt {i}")
+                latencies.append(time.monotonic() - start)
+            except BackendError:
+                failures += 1
+
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake", action="store_true", help="Backends simulés (seul mode hors ligne)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--no-hedge", action="store_true")
+    parser.add_argument("--groq-model", default="mistral-saba-24b")
+    parser.add_argument("--ollama-model")
+    args = parser.parse_args()
+
+    if args.fake:
+        backends = [
+            FakeBackend("rapide-quota", latency=0.05, rate_limit=20, window=1.0, cost=1.0, seed=1),
+            FakeBackend("instable", latency=0.08, jitter=1.0, error_rate=0.3, seed=2),
+            FakeBackend("lent", latency=0.3, jitter=0.2, max_concurrency=4, seed=3),
+        ]
+        router = Router(backends, hedge=not args.no_hedge, cooldown=2.0)
+    else:
+        router = build_router(args.groq_model, args.ollama_model, hedge=not args.no_hedge)
+
+    start = time.monotonic()
+    latencies, failures = asyncio.run(_simulate(router, args.requests, args.concurrency))
+    elapsed = time.monotonic() - start
+    if latencies:
+        print(f"✅ {len(latencies)}/{args.requests} réussies en {elapsed:.1f} s, "
+              f"p50 {np.percentile(latencies, 50):.3f} s, p95 {np.percentile(latencies, 95):.3f} s, "
+              f"p99 {np.percentile(latencies, 99):.3f} s, {failures} échecs")
+    for name, state in router.snapshot().items():
+        print(f"  {name:<14} {state}")
+    for counter in REGISTRY.to_dict()["counters"]:
+        if counter["name"].startswith("router_"):
+            print(f"  {counter['name']}{{backend={counter['labels']['backend']}}} {counter['value']:g}")
+
+
+if __name__ == "__main__":
+    main()
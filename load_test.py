@@ -0,0 +1,98 @@
+"""Load test of the Gradio quiz in session mode.
+
+Each simulated user opens its own client (hence its own server session),
+starts a session, goes through its pages and submits. Users are spread over
+the worker ports round-robin, as a sticky load balancer would. Latencies are
+reported per endpoint as percentiles.
+
+Example:
+    python serve_gradio.py --workers 4 &
+    python load_test.py --users 100 250 500 1000 --ports 7860 7861 7862 7863 --json load_test.json
+"""
+import argparse
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from gradio_client import Client
+
+from gradio_app import PAGE_SIZE
+
+
+def run_user(url, n_questions, stratify_by):
+    """One learner's session; returns [(endpoint, latency in s)] and raises on errors."""
+    client = Client(url, verbose=False)
+    timings = []
+
+    def call(api_name, *args):
+        start = time.perf_counter()
+        result = client.predict(*args, api_name=api_name)
+        timings.append((api_name, time.perf_counter() - start))
+        return result
+
+    call("/start_session", n_questions, stratify_by)
+    answers = [None] * PAGE_SIZE
+    for _ in range(math.ceil(n_questions / PAGE_SIZE) - 1):
+        call("/next_page", *answers)
+    call("/submit_session", *answers)
+    return timings
+
+
+def run_level(urls, users, n_questions, stratify_by, ramp_up):
+    """Run `users` concurrent users; returns the report row for this level."""
+    timings, errors = [], 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        futures = []
+        for i in range(users):
+            futures.append(pool.submit(run_user, urls[i % len(urls)], n_questions, stratify_by))
+            time.sleep(ramp_up / users)
+        for future in futures:
+            try:
+                timings.extend(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+
+    row = {"users": users, "requests": len(timings), "errors": errors, "duration_s": elapsed,
+           "throughput_rps": len(timings) / elapsed}
+    for endpoint in ("all", *sorted({name for name, _ in timings})):
+        latencies = np.array([t for name, t in timings if endpoint in ("all", name)])
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1e3
+            row[endpoint] = {"p50_ms": p50, "p90_ms": p90, "p99_ms": p99, "max_ms": latencies.max() * 1e3}
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ports", type=int, nargs="+", default=[7860])
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 250, 500, 1000],
+                        help="Concurrent users, one run per value")
+    parser.add_argument("--questions", type=int, default=20, help="Questions per session")
+    parser.add_argument("--stratify-by", default="None")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds to start all users of a run")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    urls = [f"http://{args.host}:{port}/" for port in args.ports]
+    report = []
+    print(f"{'Users':>6}{'Requests':>10}{'Errors':>8}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}")
+    for users in args.users:
+        row = run_level(urls, users, args.questions, args.stratify_by, args.ramp_up)
+        report.append(row)
+        stats = row.get("all", {})
+        print(f"{users:>6}{row['requests']:>10}{row['errors']:>8}{row['throughput_rps']:>9.1f}"
+              + "".join(f"{stats.get(k, float('nan')):>9.1f}" for k in ("p50_ms", "p90_ms", "p99_ms")))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parameters": vars(args), "results": report}, f, indent=2)
+        print(f"✅ Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
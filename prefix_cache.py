@@ -0,0 +1,92 @@
+"""Réutilisation du cache clé/valeur (KV) du préambule fixe des prompts.
+
+Tous les prompts de `QCMGenerateChain` commencent par le même long préambule
+(`qcm_chain.template` jusqu'à `{text}`). `PrefixCache` calcule une fois, après
+le chargement du modèle, le cache KV de ce préambule ; pour chaque prompt, une
+copie de ce cache est passée à `generate`, qui ne calcule plus que l'abstract
+et la génération.
+
+Le préfixe commun est mesuré en tokens (plus long préfixe commun entre le
+prompt et le préambule) : si la tokenisation diffère à la jonction, le cache
+est simplement tronqué à la partie commune. `CachedPrefixPipeline` applique ce
+cache dans le pipeline "text-generation" : `HuggingFacePipeline` et la chaîne
+l'utilisent sans modification. Le cache dépend des poids : `QaLlm` en garde
+un par adaptateur LoRA (`invalidate` force son recalcul).
+
+Il n'est pas utilisé avec le décodage spéculatif : le modèle brouillon
+recalculerait le préambule de son côté, sans ce cache, et proposerait ses
+candidats sur un autre contexte (sortie gloutonne modifiée, aucune acceptation).
+"""
+import copy
+import threading
+
+import torch
+from transformers import TextGenerationPipeline
+
+from callback import REGISTRY
+
+# En dessous, copier le cache coûte plus que le calcul qu'il évite
+MIN_CACHED_TOKENS = 16
+
+
+class PrefixCache:
+    def __init__(self, model, tokenizer, prefix, registry=REGISTRY):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix = prefix
+        self.registry = registry
+        self.lock = threading.Lock()
+        self.prefix_ids = None
+        self.cache = None
+
+    def invalidate(self):
+        with self.lock:
+            self.cache = None
+
+    def _build(self):
+        ids = self.tokenizer(self.prefix, return_tensors="pt")["input_ids"].to(self.model.device)
+        with torch.inference_mode():
+            cache = self.model(input_ids=ids, use_cache=True).past_key_values
+        self.prefix_ids = ids[0]
+        self.cache = cache
+
+    def for_input(self, input_ids):
+        """
+        Copie du cache du préambule, tronquée au préfixe commun avec `input_ids`
+        (un seul prompt), ou None si le prompt ne commence pas par le préambule.
+        """
+        if input_ids is None or input_ids.shape[0] != 1:
+            return None
+        with self.lock:
+            if self.cache is None:
+                self._build()
+            prefix_ids, cache = self.prefix_ids, self.cache
+            n = min(len(prefix_ids), input_ids.shape[1] - 1)  # au moins un token reste à calculer
+            mismatch = (input_ids[0, :n] != prefix_ids[:n]).nonzero()
+            common = int(mismatch[0]) if len(mismatch) else n
+            if common < MIN_CACHED_TOKENS:
+                self.registry.inc("prefix_cache_misses_total", help="Prompts sans le préambule en cache")
+                return None
+            cache = copy.deepcopy(cache)
+        if common < len(prefix_ids):
+            cache.crop(common)
+        self.registry.inc("prefix_cache_hits_total", help="Prompts servis avec le cache du préambule")
+        self.registry.inc("prefix_cache_reused_tokens_total", common, help="Tokens de préambule non recalculés")
+        return cache
+
+
+class CachedPrefixPipeline(TextGenerationPipeline):
+    """
+    Pipeline "text-generation" qui démarre chaque génération sur le cache du
+    préambule (sauf avec un modèle brouillon, voir plus haut).
+    """
+
+    prefix_cache = None
+
+    def _forward(self, model_inputs, **generate_kwargs):
+        if (self.prefix_cache is not None and "past_key_values" not in generate_kwargs
+                and generate_kwargs.get("assistant_model") is None):
+            cache = self.prefix_cache.for_input(model_inputs["input_ids"])
+            if cache is not None:
+                generate_kwargs["past_key_values"] = cache
+        return super()._forward(model_inputs, **generate_kwargs)
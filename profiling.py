@@ -0,0 +1,139 @@
+"""Profilage optionnel de la chaîne texte → quiz.
+
+`PipelineProfiler` chronomètre les étapes (nettoyage, prompt, génération,
+parsing, transformation) de chaque lot. Un lot sur `sample_every` est en plus
+profilé côté Python (cProfile, ou pyinstrument s'il est installé), et l'étape
+de génération peut être tracée par `torch.profiler` (trace Chrome lisible dans
+chrome://tracing ou Perfetto). `summary()` donne le tableau récapitulatif
+écrit en fin de traitement.
+
+Sans profilage, `NULL_PROFILER` rend chaque étape gratuite.
+"""
+import cProfile
+import io
+import os
+import pstats
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+class NullProfiler:
+    """Profileur inactif : étapes et lots sans aucun coût."""
+
+    inline = False
+
+    def stage(self, name, trace=False):
+        return nullcontext()
+
+    def batch(self):
+        return nullcontext()
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class PipelineProfiler:
+    # La génération doit tourner dans le thread profilé
+    inline = True
+
+    def __init__(self, output_dir=".profile", sample_every=1, profiler="cprofile", torch_trace=False):
+        self.output_dir = output_dir
+        self.sample_every = max(1, sample_every)
+        self.profiler = profiler
+        self.torch_trace = torch_trace
+        self.durations = defaultdict(list)  # étape -> durées (s)
+        self.batches = 0
+        self._sampled = False
+        os.makedirs(output_dir, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name, trace=False):
+        """Chronomètre l'étape `name` ; avec `trace=True`, la trace torch du lot échantillonné est exportée."""
+        tracer = self._torch_profiler() if trace and self.torch_trace and self._sampled else None
+        if tracer is not None:
+            tracer.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # La durée est relevée avant l'arrêt du profileur torch, qui peut être long
+            self.durations[name].append(time.perf_counter() - start)
+            if tracer is not None:
+                tracer.stop()
+                tracer.export_chrome_trace(os.path.join(self.output_dir, f"torch_{name}_lot{self.batches}.json"))
+
+    @contextmanager
+    def batch(self):
+        """Un lot de la chaîne ; un lot sur `sample_every` est profilé côté Python."""
+        self._sampled = self.batches % self.sample_every == 0
+        python_profiler = self._python_profiler() if self._sampled else None
+        start = time.perf_counter()
+        try:
+            if python_profiler is None:
+                yield
+            else:
+                with python_profiler:
+                    yield
+        finally:
+            self.durations["total"].append(time.perf_counter() - start)
+            self.batches += 1
+
+    def _torch_profiler(self):
+        import torch
+        from torch.profiler import ProfilerActivity, profile
+
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        return profile(activities=activities, record_shapes=True, with_stack=False)
+
+    @contextmanager
+    def _python_profiler(self):
+        path = os.path.join(self.output_dir, f"python_lot{self.batches}")
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{path}.html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(f"{path}.prof")
+                # Les fonctions les plus coûteuses, lisibles sans outil
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(25)
+                with open(f"{path}.txt", "w", encoding="utf-8") as f:
+                    f.write(out.getvalue())
+
+    def summary(self):
+        """Tableau récapitulatif par étape : appels, total, moyenne, p50, p95 et part du temps total."""
+        total = sum(self.durations.get("total", [])) or sum(sum(d) for d in self.durations.values()) or 1.0
+        lines = [f"{'Étape':<12}{'Appels':>8}{'Total s':>10}{'Moy. ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'Part':>8}"]
+        for name, durations in self.durations.items():
+            d = np.asarray(durations)
+            lines.append(
+                f"{name:<12}{len(d):>8}{d.sum():>10.3f}{d.mean() * 1e3:>10.1f}"
+                f"{np.percentile(d, 50) * 1e3:>10.1f}{np.percentile(d, 95) * 1e3:>10.1f}{d.sum() / total:>8.1%}"
+            )
+        return "\n".join(lines)
+
+    def write_summary(self):
+        path = os.path.join(self.output_dir, "summary.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.summary() + "\n")
+        return path
@@ -0,0 +1,61 @@
+"""Prompts de génération de QCM envoyés à Groq.
+
+Les templates sont compilés une seule fois à l'import du module. Deux variantes :
+- "complet" : l'exemple JSON détaillé historique (sans l'indentation superflue) ;
+- "compact" : une description du schéma sur une ligne, bien moins coûteuse en tokens.
+"""
+from langchain.prompts import PromptTemplate
+
+FULL_TEMPLATE = """Vous êtes un expert médical en néphrologie.
+Générez EXACTEMENT {number} questions (ni plus, ni moins) de niveau {difficulty} sur le sujet suivant : "{topic}".
+
+**TRÈS IMPORTANT**:
+1. Votre réponse doit contenir EXACTEMENT {number} questions numérotées de 1 à {number}.
+2. Votre réponse doit être UNIQUEMENT un objet JSON valide, sans aucun texte avant ou après.
+3. Ne commencez pas par ```json ou ``` et ne terminez pas par ```.
+{context}
+Format exact attendu avec {number} questions:
+
+{{
+ "1": {{
+  "question": "Question 1 ?",
+  "options": {{"a": "Option A", "b": "Option B", "c": "Option C", "d": "Option D"}},
+  "correct": "a",
+  "explanation": "Explication détaillée."
+ }},
+ ... répétez pour toutes les {number} questions ...
+ "{number}": {{
+  "question": "Question {number} ?",
+  "options": {{"a": "Option A", "b": "Option B", "c": "Option C", "d": "Option D"}},
+  "correct": "c",
+  "explanation": "Explication détaillée."
+ }}
+}}"""
+
+COMPACT_TEMPLATE = """Expert en néphrologie : générez EXACTEMENT {number} QCM de niveau {difficulty} sur "{topic}".
+{context}Répondez UNIQUEMENT par un objet JSON valide (sans ``` ni texte autour), clés "1" à "{number}", chaque valeur :
+{{"question":str,"options":{{"a":str,"b":str,"c":str,"d":str}},"correct":"a"|"b"|"c"|"d","explanation":str}}"""
+
+CONTEXT_INSTRUCTIONS = (
+    "Appuyez-vous sur les extraits PubMed ci-dessous (chacun commence par [PMID ...]). "
+    "Pour chaque question, ajoutez un champ \"sources\" listant les PMID utilisés "
+    "et citez-les dans l'explication (ex. \"PMID 12345678\").\n"
+    "Extraits :\n{context}\n"
+)
+
+PROMPT_TEMPLATES = {
+    "complet": PromptTemplate.from_template(FULL_TEMPLATE),
+    "compact": PromptTemplate.from_template(COMPACT_TEMPLATE),
+}
+DEFAULT_VARIANT = "compact"
+
+
+def create_prompt_with_langchain(topic, number, difficulty, context="", variant=DEFAULT_VARIANT):
+    """
+    Génère le prompt Groq à partir du template précompilé `variant`.
+    Si `context` est fourni (extraits PubMed), le modèle doit s'y appuyer et citer les PMID.
+    """
+    if context:
+        context = CONTEXT_INSTRUCTIONS.format(context=context)
+
+    return PROMPT_TEMPLATES[variant].format(topic=topic, number=number, difficulty=difficulty, context=context)
@@ -1,26 +1,231 @@
+import os
+import threading
+from functools import lru_cache
+
 from langchain_community.llms import HuggingFacePipeline  # Mise à jour de l'import
-from callback import MyCallbackHandler
+from callback import REGISTRY, MetricsCallbackHandler
+from cpu_inference import gguf_llm, load_int8, load_onnx
+from prefix_cache import CachedPrefixPipeline, PrefixCache
 from langchain.callbacks.base import BaseCallbackManager
 from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
 
-class QaLlm():
-    def __init__(self) -> None:
-        # Chargement du modèle LLaMA 2
-        model_name = "meta-llama/Llama-2-7b-chat-hf"
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
+MODEL_NAME = "meta-llama/Llama-2-7b-chat-hf"
+# Modèle brouillon du décodage spéculatif : même tokenizer que LLaMA 2
+DRAFT_MODEL = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+MAX_NEW_TOKENS = 256
+
+
+@lru_cache(maxsize=None)
+def load_base_model(model_name=MODEL_NAME, backend="torch"):
+    """
+    Modèle de base et tokenizer, chargés une fois par processus et partagés par
+    toutes les instances. `backend` : "torch", ou "int8" / "onnx" pour le CPU
+    (voir `cpu_inference`).
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    # Génération par lots : padding à gauche, LLaMA n'ayant pas de token de padding
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.unk_token or tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    if backend == "int8":
+        model = load_int8(model_name)
+    elif backend == "onnx":
+        model = load_onnx(model_name)
+    else:
         model = AutoModelForCausalLM.from_pretrained(model_name, device_map="auto", torch_dtype="auto")
+    return model, tokenizer
+
+
+@lru_cache(maxsize=None)
+def shared_prefix_cache(model_name, prefix, backend="torch", adapter=None):
+    """
+    Cache KV du préambule `prefix`, commun à toutes les instances sur le même
+    modèle de base et le même adaptateur (le cache dépend des poids).
+    """
+    return PrefixCache(*load_base_model(model_name, backend), prefix)
+
+
+def model_lock(model):
+    """Verrou du modèle de base partagé : une génération à la fois, avec son adaptateur."""
+    return model.__dict__.setdefault("_adapter_lock", threading.RLock())
+
+
+def activate_adapter(model, name):
+    """Active l'adaptateur `name` sur le modèle partagé (None : modèle de base)."""
+    if name is not None:
+        model.set_adapter(name)
+        model.enable_adapters()
+    elif getattr(model, "peft_config", None):
+        model.disable_adapters()
+
+
+class AdapterPipeline(CachedPrefixPipeline):
+    """
+    Pipeline d'une instance de `QaLlm` : le modèle de base est partagé par
+    toutes les instances, chacune réactive donc son adaptateur (`adapter`)
+    avant chaque génération, sous le verrou du modèle.
+    """
+
+    adapter = None
+
+    def _forward(self, model_inputs, **generate_kwargs):
+        with model_lock(self.model):
+            activate_adapter(self.model, self.adapter)
+            return super()._forward(model_inputs, **generate_kwargs)
+
+
+class SpeculationStats:
+    """
+    Mesures du décodage spéculatif : tokens proposés par le modèle brouillon,
+    tokens acceptés par le modèle cible et nombre d'étapes (un passage du modèle
+    cible par étape). Elles sont aussi exportées par `callback.REGISTRY`.
+    """
+
+    def __init__(self, registry=REGISTRY, model_name=""):
+        self.registry = registry
+        self.model_name = model_name
+        self.lock = threading.Lock()
+        self.drafted = self.accepted = self.steps = 0
+
+    def record(self, drafted, accepted):
+        with self.lock:
+            self.drafted += drafted
+            self.accepted += accepted
+            self.steps += 1
+        self.registry.inc("speculative_drafted_tokens_total", drafted, help="Tokens proposés par le brouillon",
+                          model=self.model_name)
+        self.registry.inc("speculative_accepted_tokens_total", accepted, help="Tokens du brouillon acceptés",
+                          model=self.model_name)
+        self.registry.inc("speculative_steps_total", help="Passages du modèle cible", model=self.model_name)
+
+    @property
+    def acceptance_rate(self):
+        return self.accepted / self.drafted if self.drafted else 0.0
 
-        # Création du pipeline pour l'inférence
-        llama_pipeline = pipeline("text-generation", model=model, tokenizer=tokenizer, max_length=500)
+    @property
+    def tokens_per_step(self):
+        """Tokens produits par passage du modèle cible (1 sans spéculation)."""
+        return (self.accepted + self.steps) / self.steps if self.steps else 0.0
 
-        # Intégration dans LangChain
-        manager = BaseCallbackManager([MyCallbackHandler()])
+    def to_dict(self):
+        return {"proposes": self.drafted, "acceptes": self.accepted, "etapes": self.steps,
+                "taux_acceptation": self.acceptance_rate, "tokens_par_etape": self.tokens_per_step}
+
+
+def track_speculation(model, draft, stats):
+    """
+    Relève, pour chaque génération de `model` assistée par `draft`, le nombre de
+    tokens proposés et acceptés à chaque étape. `generate` crée son générateur de
+    candidats à chaque appel : on enveloppe celui qui est construit pour `draft`.
+    """
+    trackers = model.__dict__.setdefault("_speculation_trackers", {})
+    if not trackers:
+        original = model._get_candidate_generator
+
+        def _get_candidate_generator(*args, **kwargs):
+            generator = original(*args, **kwargs)
+            tracked = trackers.get(id(kwargs.get("assistant_model")))
+            if tracked is not None:
+                get_candidates, update = generator.get_candidates, generator.update_candidate_strategy
+                drafted = [0]
+
+                def tracked_get_candidates(input_ids, *a, **kw):
+                    candidates = get_candidates(input_ids, *a, **kw)
+                    drafted[0] = candidates[0].shape[1] - input_ids.shape[1]
+                    return candidates
+
+                def tracked_update(input_ids, scores, num_matches):
+                    tracked.record(drafted[0], int(num_matches))
+                    return update(input_ids, scores, num_matches)
+
+                generator.get_candidates = tracked_get_candidates
+                generator.update_candidate_strategy = tracked_update
+            return generator
+
+        model._get_candidate_generator = _get_candidate_generator
+    trackers[id(draft)] = stats
+
+
+class QaLlm():
+    def __init__(self, model_name=MODEL_NAME, adapter=None, tracing=False, draft_model=None,
+                 num_assistant_tokens=5, prefix=None, backend="torch") -> None:
+        # Les backends CPU quantifiés (voir `cpu_inference`) servent le modèle tel quel
+        if backend != "torch" and (adapter or draft_model):
+            raise ValueError(f"Adaptateur LoRA et décodage spéculatif indisponibles avec le backend {backend}")
+        self.model_name = model_name
+        self.prefix = prefix
+        self.backend = backend
+        self.adapter = None
+        self.speculation = None
+        self.prefix_cache = None
+        self.metrics = MetricsCallbackHandler(tracing=tracing)
+        manager = BaseCallbackManager([self.metrics])
+        if backend == "gguf":
+            # llama.cpp : `model_name` est le fichier GGUF
+            self.model = None
+            self.llm = gguf_llm(model_name, MAX_NEW_TOKENS, callback_manager=manager)
+            return
+
+        # Chargement du modèle LLaMA 2 (partagé)
+        model, tokenizer = load_base_model(model_name, backend)
+        self.model = model
+
+        # Décodage spéculatif : le brouillon propose `num_assistant_tokens` tokens, vérifiés en
+        # un seul passage du modèle cible. La sortie suit la même loi que sans brouillon
+        # (identique en glouton, échantillonnage spéculatif sinon).
+        generate_kwargs = {}
+        if draft_model:
+            draft, draft_tokenizer = load_base_model(draft_model)
+            draft.to(model.device)
+            draft.generation_config.num_assistant_tokens = num_assistant_tokens
+            generate_kwargs = {"assistant_model": draft, "assistant_tokenizer": draft_tokenizer}
+            self.speculation = SpeculationStats(model_name=model_name)
+            track_speculation(model, draft, self.speculation)
+
+        # Création du pipeline pour l'inférence (`max_length` comptait aussi le prompt) ; avec
+        # `prefix` (préambule fixe des prompts), son cache KV est calculé une fois et réutilisé
+        llama_pipeline = pipeline("text-generation", model=model, tokenizer=tokenizer, max_new_tokens=MAX_NEW_TOKENS,
+                                  pipeline_class=AdapterPipeline, **generate_kwargs)
+        # (ONNX Runtime n'accepte pas de cache KV PyTorch en entrée ; avec un brouillon, celui-ci
+        # ne recevrait pas le cache et proposerait ses candidats sur un autre contexte)
+        self.pipeline = llama_pipeline
+        self.use_prefix_cache = bool(prefix) and backend != "onnx" and not draft_model
+        self._set_adapter(None)
+
+        # Intégration dans LangChain ; les mesures sont exportées par `callback.REGISTRY`
         self.llm = HuggingFacePipeline(pipeline=llama_pipeline, callback_manager=manager)
 
+        if adapter:
+            self.load_adapter(adapter)
+
+    def _set_adapter(self, name):
+        self.adapter = self.pipeline.adapter = name
+        if self.use_prefix_cache:
+            self.prefix_cache = shared_prefix_cache(self.model_name, self.prefix, self.backend, name)
+        self.pipeline.prefix_cache = self.prefix_cache
+
+    def load_adapter(self, path, name=None):
+        """
+        Active l'adaptateur LoRA sauvegardé dans `path` (par
+        `generate_qcm_with_llama2.py --lora`) pour cette instance seulement. Il
+        est chargé une fois sur le modèle de base partagé, puis réactivé avant
+        chaque génération de l'instance : les autres instances gardent leur
+        propre adaptateur, ou le modèle de base.
+        """
+        name = name or os.path.basename(os.path.normpath(path))
+        with model_lock(self.model):
+            if name not in (getattr(self.model, "peft_config", None) or {}):
+                self.model.load_adapter(path, adapter_name=name)
+        self._set_adapter(name)
+
+    def unload_adapter(self):
+        """Revient au modèle de base pour cette instance (les adaptateurs restent en mémoire)."""
+        self._set_adapter(None)
+
     def get_llm(self):
         return self.llm
 
 # # Test rapide
 # if __name__ == "__main__":
 #     qa_llm = QaLlm()
-#     print(qa_llm.get_llm()("Quels sont les symptômes de l'insuffisance rénale ?"))
\ No newline at end of file
+#     print(qa_llm.get_llm()("Quels sont les symptômes de l'insuffisance rénale ?"))
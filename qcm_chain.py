@@ -26,6 +26,9 @@ These questions should be detailed and solely based on the information provided
 {text}
 <End Text>"""
 
+# Préambule commun à tous les prompts (son cache KV est réutilisé, voir `prefix_cache`)
+PROMPT_PREFIX = template.split("{text}")[0]
+
 output_parser = RegexParser(
     regex=r"Question\s?\d?:\s+\n?(.*?)\nCHOICE_A(.*?)\nCHOICE_B(.*?)\nCHOICE_C(.*?)\nCHOICE_D(.*?)(?:\n)+Answer:\s?(.*)\n?\n?Question\s?\d?:\s+\n?(.*?)\nCHOICE_A(.*?)\nCHOICE_B(.*?)\nCHOICE_C(.*?)\nCHOICE_D(.*?)(?:\n)+Answer:\s?(.*)", 
     output_keys=["question1", "A_1", "B_1", "C_1", "D_1", "reponse1", "question2", "A_2", "B_2", "C_2", "D_2", "reponse2"]
@@ -0,0 +1,277 @@
+"""Contrôle qualité des QCM générés, en deux niveaux.
+
+1. Heuristiques vectorisées (`screen`), sur tout un lot de questions au format
+   commun de `quiz_validation` (sorties de `parse_blocks`, `parse_json_quiz`...) :
+   - structure : énoncé, au moins deux options, réponse parmi les options ;
+   - distance entre options : similarité cosinus de trigrammes de caractères,
+     calculée pour toutes les paires d'options du lot en une opération ;
+   - rapport de longueur entre la bonne réponse et les distracteurs (la plus
+     longue option est souvent la bonne) ;
+   - fuite de la réponse dans l'énoncé ;
+   - ancrage dans l'abstract source (similarité question + réponse / source).
+   Chaque question est acceptée, rejetée ou déclarée douteuse.
+2. Seules les questions douteuses sont soumises à un juge LLM (`LlmJudge`), par
+   lots de plusieurs questions par appel, avec un cache persistant : le coût de
+   vérification suit le nombre de questions suspectes, pas le volume total.
+"""
+import hashlib
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+from quiz_validation import answer_key, from_quiz_json, has_duplicate_options, is_well_formed
+
+NGRAM_DIM = 4096
+JUDGE_CACHE = ".judge_cache.jsonl"
+# Seuils : au-delà de `reject` la question est écartée, au-delà de `doubt` elle va au juge
+THRESHOLDS = {
+    "option_similarity": {"doubt": 0.75, "reject": 0.95},
+    "length_ratio": {"doubt": 2.5},
+    "answer_leak": {"doubt": 0.2},
+    "source_overlap": {"doubt": 0.15},  # en dessous
+}
+CATCH_ALL = re.compile(r"toutes? les (réponses|propositions)|aucune des|all of the above|none of the above", re.IGNORECASE)
+
+JUDGE_TEMPLATE = """Tu relis des QCM médicaux sur les maladies rénales. Pour chaque QCM numéroté ci-dessous, vérifie :
+la question est claire, une seule option est correcte et c'est bien la réponse indiquée, les distracteurs sont
+plausibles mais faux, et la question est fidèle au texte source quand il est fourni.
+
+{items}
+
+Réponds UNIQUEMENT en JSON, sans texte autour : {{"1": {{"valide": true, "raison": "..."}}, "2": {{...}}}}"""
+
+
+# ------------------------------------------------------------------ heuristiques
+def ngram_vectors(texts, n=3, dim=NGRAM_DIM):
+    """Vecteurs normalisés de trigrammes de caractères (hachés), une ligne par texte."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        text = f" {' '.join(str(text).casefold().split())} "
+        if len(text) > 2:
+            grams = [zlib.crc32(text[j:j + n].encode("utf-8")) % dim for j in range(len(text) - n + 1)]
+            np.add.at(vectors[i], grams, 1.0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def screen(questions, sources=None, thresholds=THRESHOLDS):
+    """
+    Évalue un lot de questions ; `sources` donne l'abstract de chaque question
+    (ou None). Renvoie une liste de {"status": "accept" | "doubt" | "reject",
+    "reasons": [...], "scores": {...}}.
+    """
+    n = len(questions)
+    if n == 0:
+        return []
+    sources = sources or [None] * n
+    k = max(len(q["options"]) for q in questions) or 1
+    keys = [list(q["options"]) for q in questions]
+    texts = np.full((n, k), "", dtype=object)
+    for i, q in enumerate(questions):
+        texts[i, :len(keys[i])] = [str(v).strip() for v in q["options"].values()]
+    present = texts != ""
+    correct = np.array([
+        keys[i].index(key) if key in keys[i] else -1
+        for i, key in enumerate(answer_key(q) for q in questions)
+    ])
+    rows = np.arange(n)
+
+    # Similarité de toutes les paires d'options, question par question : (n, k, k)
+    options = ngram_vectors(texts.ravel()).reshape(n, k, -1)
+    similarity = np.einsum("nid,njd->nij", options, options)
+    pair_mask = present[:, :, None] & present[:, None, :] & ~np.eye(k, dtype=bool)
+    max_similarity = np.where(pair_mask, similarity, 0.0).max(axis=(1, 2))
+
+    # Bonne réponse vs distracteurs : longueur et ressemblance avec l'énoncé
+    lengths = np.vectorize(len, otypes=[float])(texts)
+    stems = ngram_vectors([q["question"] for q in questions])
+    stem_similarity = np.einsum("nd,nkd->nk", stems, options)
+    has_correct = correct >= 0
+    safe_correct = np.where(has_correct, correct, 0)
+    distractors = present.copy()
+    distractors[rows, safe_correct] &= ~has_correct
+    n_distractors = np.maximum(distractors.sum(axis=1), 1)
+    length_ratio = lengths[rows, safe_correct] / np.maximum((lengths * distractors).sum(axis=1) / n_distractors, 1.0)
+    answer_leak = stem_similarity[rows, safe_correct] - np.where(distractors, stem_similarity, 0.0).max(axis=1)
+
+    # Ancrage : question + bonne réponse comparées à l'abstract source
+    grounded = np.array([s is not None for s in sources])
+    source_overlap = np.ones(n)
+    if grounded.any():
+        claims = ngram_vectors([
+            f"{q['question']} {texts[i, safe_correct[i]]}" for i, q in enumerate(questions)
+        ])
+        source_vectors = ngram_vectors([s or "" for s in sources])
+        source_overlap = np.where(grounded, np.einsum("nd,nd->n", claims, source_vectors), 1.0)
+
+    results = []
+    for i, q in enumerate(questions):
+        reasons, rejected = [], False
+        if not is_well_formed(q):
+            reasons.append("question ou options manquantes")
+            rejected = True
+        if not has_correct[i] or not present[i, safe_correct[i]]:
+            reasons.append("réponse absente des options")
+            rejected = True
+        if has_duplicate_options(q) or max_similarity[i] >= thresholds["option_similarity"]["reject"]:
+            reasons.append("options identiques")
+            rejected = True
+        elif max_similarity[i] >= thresholds["option_similarity"]["doubt"]:
+            reasons.append("options très proches")
+        if has_correct[i] and length_ratio[i] >= thresholds["length_ratio"]["doubt"]:
+            reasons.append("bonne réponse bien plus longue que les distracteurs")
+        if has_correct[i] and answer_leak[i] >= thresholds["answer_leak"]["doubt"]:
+            reasons.append("réponse suggérée par l'énoncé")
+        if grounded[i] and source_overlap[i] < thresholds["source_overlap"]["doubt"]:
+            reasons.append("peu ancrée dans l'abstract")
+        if any(CATCH_ALL.search(text) for text in texts[i] if text):
+            reasons.append("option « toutes / aucune »")
+        results.append({
+            "status": "reject" if rejected else "doubt" if reasons else "accept",
+            "reasons": reasons,
+            "scores": {
+                "option_similarity": round(float(max_similarity[i]), 3),
+                "length_ratio": round(float(length_ratio[i]), 3),
+                "answer_leak": round(float(answer_leak[i]), 3),
+                "source_overlap": round(float(source_overlap[i]), 3),
+            },
+        })
+    return results
+
+
+# -------------------------------------------------------------------- juge LLM
+class LlmJudge:
+    """
+    Juge LLM appelé par lots de `batch_size` questions. `complete(prompt) -> str`
+    est la fonction d'appel au modèle (voir `make_judge`). Les verdicts sont mis en
+    cache par empreinte de (question, source) dans `cache_path` (JSON lines).
+    """
+
+    def __init__(self, complete, batch_size=8, cache_path=JUDGE_CACHE, max_source_chars=1500):
+        self.complete = complete
+        self.batch_size = batch_size
+        self.cache_path = cache_path
+        self.max_source_chars = max_source_chars
+        self.cache = {}
+        self.calls = self.cache_hits = 0
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.cache[entry["key"]] = entry["verdict"]
+                    except (json.JSONDecodeError, KeyError):
+                        pass  # Ligne tronquée
+
+    def cache_key(self, question, source):
+        payload = json.dumps([question["question"], question["options"], question["answer"], source or ""],
+                             ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def format_item(self, n, question, source):
+        options = "\n".join(f"  {key}) {text}" for key, text in question["options"].items())
+        item = f"QCM {n} : {question['question']}\n{options}\n  Réponse indiquée : {question['answer']}"
+        if source:
+            item += f"\n  Texte source : {source[:self.max_source_chars]}"
+        return item
+
+    def __call__(self, questions, sources=None):
+        """Verdicts {"valide": bool, "raison": str} des questions, dans l'ordre."""
+        sources = sources or [None] * len(questions)
+        keys = [self.cache_key(q, s) for q, s in zip(questions, sources)]
+        verdicts = [self.cache.get(key) for key in keys]
+        self.cache_hits += sum(v is not None for v in verdicts)
+        todo = [i for i, verdict in enumerate(verdicts) if verdict is None]
+
+        for start in range(0, len(todo), self.batch_size):
+            batch = todo[start:start + self.batch_size]
+            prompt = JUDGE_TEMPLATE.format(items="\n\n".join(
+                self.format_item(n, questions[i], sources[i]) for n, i in enumerate(batch, start=1)
+            ))
+            self.calls += 1
+            answers = self._parse(self.complete(prompt))
+            new_entries = []
+            for n, i in enumerate(batch, start=1):
+                answer = answers.get(str(n))
+                if not isinstance(answer, dict) or "valide" not in answer:
+                    # Verdict illisible : question écartée, mais pas mise en cache
+                    verdicts[i] = {"valide": False, "raison": "verdict du juge illisible"}
+                    continue
+                verdicts[i] = {"valide": bool(answer["valide"]), "raison": str(answer.get("raison", ""))}
+                self.cache[keys[i]] = verdicts[i]
+                new_entries.append({"key": keys[i], "verdict": verdicts[i]})
+            self._persist(new_entries)
+        return verdicts
+
+    @staticmethod
+    def _parse(text):
+        match = re.search(r"\{.*\}", text or "", re.DOTALL)
+        try:
+            answers = json.loads(match.group(0)) if match else {}
+        except json.JSONDecodeError:
+            return {}
+        return answers if isinstance(answers, dict) else {}
+
+    def _persist(self, entries):
+        if self.cache_path and entries:
+            # Une seule écriture en mode ajout : les workers de batch_quiz peuvent partager le fichier
+            with open(self.cache_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+
+
+def make_judge(backend, model="mistral-saba-24b", **kwargs):
+    """Juge "groq" (API Groq), "stub" (toujours favorable, hors ligne) ou None pour "none"."""
+    if backend == "none":
+        return None
+    if backend == "groq":
+        from groq_client import query_groq
+        return LlmJudge(lambda prompt: query_groq(prompt, model), **kwargs)
+    if backend == "stub":
+        def complete(prompt):
+            n = len(re.findall(r"^QCM \d+ :", prompt, re.MULTILINE))
+            return json.dumps({str(i): {"valide": True, "raison": "stub"} for i in range(1, n + 1)})
+        return LlmJudge(complete, **kwargs)
+    raise ValueError(f"Juge inconnu : {backend}")
+
+
+# -------------------------------------------------------------------- pipeline
+class QualityFilter:
+    """
+    Heuristiques puis juge sur les seules questions douteuses. Sans juge, les
+    questions douteuses sont gardées si `keep_doubtful` est vrai.
+    """
+
+    def __init__(self, judge=None, thresholds=THRESHOLDS, keep_doubtful=False):
+        self.judge = judge
+        self.thresholds = thresholds
+        self.keep_doubtful = keep_doubtful
+        self.stats = {"accept": 0, "doubt": 0, "reject": 0, "judged_ok": 0}
+
+    def __call__(self, questions, sources=None):
+        """(indices des questions gardées, évaluations)."""
+        sources = sources or [None] * len(questions)
+        assessments = screen(questions, sources, self.thresholds)
+        doubtful = [i for i, a in enumerate(assessments) if a["status"] == "doubt"]
+        if doubtful and self.judge is not None:
+            verdicts = self.judge([questions[i] for i in doubtful], [sources[i] for i in doubtful])
+            for i, verdict in zip(doubtful, verdicts):
+                assessments[i]["judge"] = verdict
+        for a in assessments:
+            self.stats[a["status"]] += 1
+            self.stats["judged_ok"] += bool(a.get("judge", {}).get("valide"))
+
+        kept = [
+            i for i, a in enumerate(assessments)
+            if a["status"] == "accept"
+            or (a["status"] == "doubt" and (a["judge"]["valide"] if "judge" in a else self.keep_doubtful))
+        ]
+        return kept, assessments
+
+    def filter_quiz(self, quiz, source=None):
+        """Quiz JSON de `streamlit_app` réduit aux questions retenues (renumérotées à partir de "1")."""
+        entries = [q for q in quiz.values() if isinstance(q, dict)]
+        kept, _ = self([from_quiz_json(q) for q in entries], [source] * len(entries))
+        return {str(n): entries[i] for n, i in enumerate(kept, start=1)}
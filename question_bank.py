@@ -0,0 +1,234 @@
+"""Banque de questions compacte, en colonnes.
+
+Un QCM sous forme de dictionnaires (énoncé, options, réponse, explication...)
+coûte plusieurs centaines d'octets d'objets Python par question. Ici, toutes les
+chaînes (énoncés, options, explications, PMID, thèmes, difficultés) sont
+internées dans une seule `answer_key.StringArena` : une option répétée d'une
+question à l'autre ("Stade 5", "Créatinine"...) n'est stockée qu'une fois. Chaque
+question n'est plus qu'une ligne de tableaux NumPy de codes entiers.
+
+- `bank[i]` renvoie une `Question`, vue légère (`__slots__`) sur la ligne `i` ;
+- `QuestionBank.from_records` / `Question.to_record` passent du format commun de
+  `quiz_validation` ({"question", "options", "answer"}) à la banque et retour ;
+  `from_transformed` / `to_transformed` et `from_quiz_json` / `to_quiz_json`
+  font de même pour les formats de `text_to_quizz.transform` et de `streamlit_app` ;
+- `save` écrit les tableaux bruts (`.npy`), `load` les projette en mémoire
+  (mmap) sans copie ni décodage : plusieurs processus partagent la même banque.
+
+Exemple :
+    python question_bank.py quiz_output --output .question_bank
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from answer_key import StringArena
+from quiz_validation import answer_key, from_transformed, parse_json_quiz
+
+OPTION_KEYS = "abcdefgh"
+# Colonnes d'une chaîne par question (code dans l'arène, 0 = chaîne vide)
+TEXT_COLUMNS = ("question", "explanation", "pmid", "topic", "difficulty")
+
+
+class Question:
+    """Vue en lecture sur une question de la banque (aucune chaîne n'est copiée avant l'accès)."""
+
+    __slots__ = ("bank", "id")
+
+    def __init__(self, bank, id):
+        self.bank = bank
+        self.id = id
+
+    def __getattr__(self, column):
+        # question, explanation, pmid, topic, difficulty
+        if column in TEXT_COLUMNS:
+            return self.bank.text(column, self.id)
+        raise AttributeError(column)
+
+    @property
+    def options(self):
+        """{clé: texte} des options présentes."""
+        codes = self.bank.options[self.id]
+        return {key: self.bank.strings[code] for key, code in zip(OPTION_KEYS, codes) if code}
+
+    @property
+    def answer(self):
+        """Clé de la bonne réponse ("" si elle ne désigne aucune option)."""
+        j = int(self.bank.answer[self.id])
+        return OPTION_KEYS[j] if j >= 0 else ""
+
+    def to_record(self):
+        """Format commun de `quiz_validation`, plus les champs renseignés parmi explication, PMID, thème, difficulté."""
+        record = {"question": self.question, "options": self.options, "answer": self.answer}
+        for column in TEXT_COLUMNS[1:]:
+            value = self.bank.text(column, self.id)
+            if value:
+                record[column] = value
+        return record
+
+    def to_transformed(self):
+        """Format de `text_to_quizz.transform` (clés A..D et reponse)."""
+        options = self.options
+        item = {"question": self.question}
+        item.update({key.upper(): options.get(key, "") for key in OPTION_KEYS[:4]})
+        item["reponse"] = self.answer.upper()
+        return item
+
+    def __repr__(self):
+        return f"Question({self.id}, {self.question[:40]!r})"
+
+
+class QuestionBank:
+    """Questions en colonnes : codes entiers vers une arène de chaînes internées."""
+
+    def __init__(self, strings, columns, options, answer):
+        self.strings = strings  # StringArena ; l'entrée 0 est la chaîne vide
+        self.columns = columns  # colonne de TEXT_COLUMNS -> (n,) int32
+        self.options = options  # (n, k) int32, 0 pour une option absente
+        self.answer = answer    # (n,) int8, indice de la bonne option ou -1
+
+    # ---------------------------------------------------------- construction
+    @classmethod
+    def from_records(cls, records):
+        """Banque à partir de questions au format commun (voir `Question.to_record`)."""
+        records = list(records)
+        interned = {"": 0}
+        intern = lambda s: interned.setdefault("" if s is None else str(s).strip(), len(interned))
+
+        n_options = max((len(r.get("options", {})) for r in records), default=0)
+        if n_options > len(OPTION_KEYS):
+            raise ValueError(f"Au plus {len(OPTION_KEYS)} options par question ({n_options} reçues)")
+        columns = {column: np.zeros(len(records), dtype=np.int32) for column in TEXT_COLUMNS}
+        options = np.zeros((len(records), n_options), dtype=np.int32)
+        answer = np.full(len(records), -1, dtype=np.int8)
+
+        for i, record in enumerate(records):
+            for column in TEXT_COLUMNS:
+                columns[column][i] = intern(record.get(column))
+            # Options rangées dans l'ordre a, b, c... quelle que soit leur clé d'origine
+            keys = list(record.get("options", {}))
+            for j, key in enumerate(keys):
+                options[i, j] = intern(record["options"][key])
+            key = answer_key({"answer": str(record.get("answer", ""))})
+            if key in keys:
+                answer[i] = keys.index(key)
+
+        return cls(StringArena.from_strings(interned), columns, options, answer)
+
+    @classmethod
+    def from_transformed(cls, items):
+        """Banque à partir de la sortie de `text_to_quizz.transform`."""
+        return cls.from_records(from_transformed(item) for item in items)
+
+    @classmethod
+    def from_quiz_json(cls, quiz, **fields):
+        """
+        Banque à partir d'un quiz JSON de `streamlit_app` ({"1": {"question",
+        "options", "correct", "explanation"}}) ; `fields` (topic, difficulty,
+        pmid) s'applique à toutes ses questions.
+        """
+        return cls.from_records({**record, **fields} for record in parse_json_quiz(quiz))
+
+    @classmethod
+    def from_jsonl(cls, paths):
+        """Banque à partir des shards de `batch_quiz` (une ligne par abstract, avec son PMID)."""
+        def records():
+            for path in paths:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            for q in entry["questions"]:
+                                yield {**q, "pmid": entry["pmid"]}
+        return cls.from_records(records())
+
+    # ----------------------------------------------------------------- accès
+    def __len__(self):
+        return len(self.answer)
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return Question(self, i % len(self))
+
+    def __iter__(self):
+        return (Question(self, i) for i in range(len(self)))
+
+    def text(self, column, i):
+        return self.strings[self.columns[column][i]]
+
+    def to_records(self, ids=None):
+        ids = range(len(self)) if ids is None else ids
+        return [self[int(i)].to_record() for i in ids]
+
+    def to_quiz_json(self, ids=None):
+        """Quiz au format JSON de `streamlit_app`, numéroté à partir de "1"."""
+        ids = range(len(self)) if ids is None else ids
+        quiz = {}
+        for n, i in enumerate(ids, start=1):
+            q = self[int(i)]
+            quiz[str(n)] = {"question": q.question, "options": q.options, "correct": q.answer,
+                            "explanation": q.explanation}
+        return quiz
+
+    def nbytes(self):
+        """Taille des tableaux de la banque (octets)."""
+        arrays = [self.strings.data, self.strings.offsets, self.options, self.answer, *self.columns.values()]
+        return sum(a.nbytes for a in arrays)
+
+    # ------------------------------------------------------------ sauvegarde
+    def save(self, directory):
+        """Écrit les tableaux en `.npy` dans un répertoire temporaire, puis le substitue à `directory`."""
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        self.strings.save(tmp_dir, "strings")
+        np.save(os.path.join(tmp_dir, "options.npy"), self.options)
+        np.save(os.path.join(tmp_dir, "answer.npy"), self.answer)
+        for column, codes in self.columns.items():
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), codes)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Ouvre une banque sauvegardée ; avec `mmap_mode="r"`, rien n'est lu avant l'accès."""
+        load = lambda name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        return cls(
+            StringArena.load(directory, "strings", mmap_mode),
+            {column: load(column) for column in TEXT_COLUMNS},
+            load("options"),
+            load("answer"),
+        )
+
+
+def dict_size(obj):
+    """Taille approximative (octets) d'une structure de dictionnaires, listes et chaînes."""
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(dict_size(k) + dict_size(v) for k, v in obj.items())
+    if isinstance(obj, list):
+        return sys.getsizeof(obj) + sum(dict_size(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Répertoire de sortie de batch_quiz.py (shards .jsonl)")
+    parser.add_argument("--output", default=".question_bank")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.input, "shard-*.jsonl")))
+    paths = [path for path in paths if not path.endswith(".partial.jsonl")]
+    bank = QuestionBank.from_jsonl(paths)
+    bank.save(args.output)
+    print(f"✅ {len(bank)} questions ({len(bank.strings)} chaînes distinctes) écrites dans {args.output}")
+    print(f"📦 {bank.nbytes() / 1e3:.1f} ko en colonnes, contre ≈ {dict_size(bank.to_records()) / 1e3:.1f} ko en dictionnaires")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""Fichier binaire de banque de quiz : ajout seul, projeté en mémoire, accès O(1).
+
+Une banque `bank.qbk` est formée de deux fichiers principaux :
+- `bank.qbk` : un en-tête fixe de `HEADER_SIZE` octets puis la table des
+  entrées, une entrée de 32 octets par question (`ENTRY_DTYPE` : position et
+  longueur de l'enregistrement, CRC32, empreintes du thème, de la difficulté et
+  du PMID) ;
+- `bank.qbk.data` : les enregistrements (JSON UTF-8 au format commun de
+  `quiz_validation`), mis bout à bout.
+La question `i` se lit donc en O(1) : entrée `i` de la table, puis une tranche
+du fichier de données, sans rien charger d'autre.
+
+Écriture (`QuizBankWriter`, un seul écrivain à la fois, sous verrou `flock`) :
+les questions ajoutées restent en mémoire jusqu'à `commit`, qui écrit les
+données puis les entrées à la suite des précédentes, les synchronise sur disque
+(fsync), et seulement alors publie le nouveau nombre de questions dans l'en-tête.
+L'en-tête a deux emplacements de validation, écrits en alternance et protégés
+par un CRC : une écriture interrompue laisse intact le précédent. Ce qui suit la
+dernière validation est ignoré par les lecteurs et tronqué à la prochaine
+ouverture en écriture.
+
+Déduplication : l'écrivain tient un `dedup_index.DedupIndex` des empreintes
+de la banque (SimHash de l'énoncé, hachage exact de la réponse), conservées
+dans `bank.qbk.dedup` et validées avec le reste. Un quasi-doublon (énoncé à
+quelques mots près, même réponse) n'est pas ajouté ; `--rebuild-dedup`
+recalcule toutes les empreintes en bloc. L'index est gardé en mémoire d'un
+écrivain au suivant dans le même processus (`append_quiz` à chaque génération
+de `streamlit_app`) : seules les questions validées entre-temps, par ce
+processus ou un autre, y sont ajoutées.
+
+Lecture (`QuizBankReader`) : les deux fichiers sont projetés en lecture seule
+(mmap), ce qui permet à plusieurs processus serveurs de partager la banque via le
+cache de pages ; `refresh` prend en compte les questions validées depuis.
+`ids(topic=..., difficulty=..., pmid=...)` sert d'index secondaire : il est
+construit à la demande à partir des empreintes de la table seule.
+
+Exemples :
+    python quiz_bank_file.py bank.qbk --import quiz_output --topic "Insuffisance Rénale Chronique"
+    python quiz_bank_file.py bank.qbk --pmid 39917798
+    python quiz_bank_file.py bank.qbk --get 12
+    python quiz_bank_file.py bank.qbk --rebuild-dedup
+"""
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from dedup_index import FINGERPRINT_DTYPE, DedupIndex, fingerprint, fingerprints
+from quiz_validation import from_quiz_json
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+MAGIC = b"QBANK\x00\r\n"
+VERSION = 1
+HEADER_SIZE = 128
+# Préambule : magic, version, taille d'une entrée
+PREAMBLE = struct.Struct("<8sII")
+# Emplacement de validation : génération, nombre de questions, taille des données, CRC des trois champs
+SLOT = struct.Struct("<QQQI4x")
+SLOT_OFFSETS = (PREAMBLE.size, PREAMBLE.size + SLOT.size)
+ENTRY_DTYPE = np.dtype([
+    ("offset", "<u8"), ("length", "<u4"), ("crc", "<u4"),
+    ("topic", "<u4"), ("difficulty", "<u4"), ("pmid", "<u4"), ("reserved", "<u4"),
+])
+INDEXED_FIELDS = ("topic", "difficulty", "pmid")
+
+
+# Index de déduplication laissé par le dernier écrivain fermé de chaque banque :
+# (chemin, périphérique, inode) -> (génération, DedupIndex)
+_DEDUP_CACHE = {}
+
+
+class CorruptBankError(ValueError):
+    pass
+
+
+def key_hash(value):
+    """Empreinte stable d'une valeur indexée (0 = absente)."""
+    value = "" if value is None else str(value).strip().casefold()
+    return (zlib.crc32(value.encode("utf-8")) or 1) if value else 0
+
+
+def read_header(buffer):
+    """(génération, nombre de questions, taille des données) du dernier emplacement valide."""
+    if len(buffer) < HEADER_SIZE:
+        raise CorruptBankError("En-tête incomplet")
+    magic, version, entry_size = PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION or entry_size != ENTRY_DTYPE.itemsize:
+        raise CorruptBankError("Fichier de banque invalide ou de version inconnue")
+    slots = []
+    for offset in SLOT_OFFSETS:
+        generation, count, data_size, crc = SLOT.unpack_from(buffer, offset)
+        if crc == zlib.crc32(buffer[offset:offset + 24]):
+            slots.append((generation, count, data_size))
+    if not slots:
+        raise CorruptBankError("Aucun emplacement de validation valide")
+    return max(slots)
+
+
+def _open_rw(path):
+    """Ouvre `path` en lecture-écriture, en le créant s'il n'existe pas mais sans jamais le tronquer."""
+    return os.fdopen(os.open(path, os.O_CREAT | os.O_RDWR | getattr(os, "O_BINARY", 0), 0o644), "r+b")
+
+
+def _slot_bytes(generation, count, data_size):
+    fields = struct.pack("<QQQ", generation, count, data_size)
+    return SLOT.pack(generation, count, data_size, zlib.crc32(fields))
+
+
+class QuizBankWriter:
+    """
+    Écrivain de la banque `path` (créée si besoin). À utiliser comme gestionnaire
+    de contexte : la sortie valide les ajouts, une exception les abandonne.
+    """
+
+    def __init__(self, path, dedup=True, max_distance=9):
+        self.path = path
+        # Création et ouverture en une fois, puis verrou : la taille n'est lue que
+        # sous verrou, un second écrivain ne peut donc pas écraser une banque neuve
+        self.index = _open_rw(path)
+        if fcntl is not None:
+            fcntl.flock(self.index, fcntl.LOCK_EX)
+        self.data = _open_rw(f"{path}.data")
+        stat = os.fstat(self.index.fileno())
+        self._identity = (os.path.abspath(path), stat.st_dev, stat.st_ino)
+        if stat.st_size == 0:
+            header = bytearray(HEADER_SIZE)
+            PREAMBLE.pack_into(header, 0, MAGIC, VERSION, ENTRY_DTYPE.itemsize)
+            header[SLOT_OFFSETS[0]:SLOT_OFFSETS[0] + SLOT.size] = _slot_bytes(0, 0, 0)
+            self.index.write(header)
+            self._sync(self.index)
+        self.index.seek(0)
+        self.generation, self.count, self.data_size = read_header(self.index.read(HEADER_SIZE))
+        # Reprise après une interruption : on oublie tout ce qui n'a pas été validé
+        self.index.truncate(HEADER_SIZE + self.count * ENTRY_DTYPE.itemsize)
+        self.data.truncate(self.data_size)
+        self.pending = []
+        self.duplicates = 0
+        self.dedup = self._load_dedup(max_distance) if dedup else None
+
+    def _records(self, start, stop):
+        self.index.seek(HEADER_SIZE + start * ENTRY_DTYPE.itemsize)
+        entries = np.frombuffer(self.index.read((stop - start) * ENTRY_DTYPE.itemsize), dtype=ENTRY_DTYPE)
+        for entry in entries:
+            self.data.seek(int(entry["offset"]))
+            yield json.loads(self.data.read(int(entry["length"])))
+
+    def _load_dedup(self, max_distance):
+        """
+        Index de déduplication des questions validées. Leurs empreintes sont
+        conservées dans `bank.qbk.dedup` (16 octets par question) ; celles qui
+        manquent (fichier absent ou en retard) sont recalculées en bloc. L'index
+        du dernier écrivain de ce processus est repris s'il est toujours valable :
+        seules les empreintes des questions validées depuis sont alors lues.
+        """
+        itemsize = FINGERPRINT_DTYPE.itemsize
+        self.fingerprint_file = _open_rw(f"{self.path}.dedup")
+        generation, dedup = _DEDUP_CACHE.pop(self._identity, (None, None))
+        if (dedup is None or dedup.max_distance != max_distance
+                or generation > self.generation or len(dedup) > self.count):
+            dedup = None
+        start = len(dedup) if dedup is not None else 0
+
+        on_disk = min(os.fstat(self.fingerprint_file.fileno()).st_size // itemsize, self.count)
+        self.fingerprint_file.seek(start * itemsize)
+        stored = np.frombuffer(self.fingerprint_file.read(max(on_disk - start, 0) * itemsize), dtype=FINGERPRINT_DTYPE)
+        if start + len(stored) < self.count:
+            missing = fingerprints(self._records(start + len(stored), self.count))
+            self.fingerprint_file.seek((start + len(stored)) * itemsize)
+            self.fingerprint_file.write(missing.tobytes())
+            stored = np.concatenate([stored, missing])
+        self.fingerprint_file.truncate(self.count * itemsize)
+        self._sync(self.fingerprint_file)
+
+        if dedup is None:
+            return DedupIndex(max_distance).rebuild(stored)
+        for stem, key in stored.tolist():
+            dedup.add(stem, key)
+        return dedup
+
+    def append(self, record):
+        """
+        Ajoute une question (format commun, plus topic/difficulty/pmid) ; renvoie
+        son identifiant. Avec la déduplication, un quasi-doublon d'une question de
+        la banque (ou d'un ajout en attente) n'est pas ajouté : l'identifiant de
+        la question existante est renvoyé.
+        """
+        prints = (0, 0)
+        if self.dedup is not None:
+            prints = fingerprint(record)
+            existing = self.dedup.query(*prints)
+            if existing is not None:
+                self.duplicates += 1
+                return existing
+            self.dedup.add(*prints)
+        payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.pending.append((payload, *(key_hash(record.get(field)) for field in INDEXED_FIELDS), prints))
+        return self.count + len(self.pending) - 1
+
+    def commit(self):
+        """Écrit et valide les questions ajoutées ; renvoie le nombre total de questions."""
+        if not self.pending:
+            return self.count
+        entries = np.zeros(len(self.pending), dtype=ENTRY_DTYPE)
+        offset = self.data_size
+        for i, (payload, topic, difficulty, pmid, _) in enumerate(self.pending):
+            entries[i] = (offset, len(payload), zlib.crc32(payload), topic, difficulty, pmid, 0)
+            offset += len(payload)
+
+        self.data.seek(self.data_size)
+        self.data.write(b"".join(payload for payload, *_ in self.pending))
+        self._sync(self.data)
+        self.index.seek(HEADER_SIZE + self.count * ENTRY_DTYPE.itemsize)
+        self.index.write(entries.tobytes())
+        self._sync(self.index)
+        if self.dedup is not None:
+            self.fingerprint_file.seek(self.count * FINGERPRINT_DTYPE.itemsize)
+            self.fingerprint_file.write(np.array([p[-1] for p in self.pending], dtype=FINGERPRINT_DTYPE).tobytes())
+            self._sync(self.fingerprint_file)
+
+        # Publication : un seul emplacement réécrit, l'autre garde la validation précédente
+        generation = self.generation + 1
+        self.index.seek(SLOT_OFFSETS[generation % 2])
+        self.index.write(_slot_bytes(generation, self.count + len(self.pending), offset))
+        self._sync(self.index)
+        self.generation, self.count, self.data_size = generation, self.count + len(self.pending), offset
+        self.pending = []
+        return self.count
+
+    def rollback(self):
+        self.pending = []
+        if self.dedup is not None:
+            self.dedup.rebuild(self.dedup.fingerprints[:self.count])
+
+    @staticmethod
+    def _sync(f):
+        f.flush()
+        os.fsync(f.fileno())
+
+    def close(self):
+        self.data.close()
+        if self.dedup is not None:
+            if not self.pending:  # L'index ne contient alors que des questions validées
+                _DEDUP_CACHE[self._identity] = (self.generation, self.dedup)
+            self.fingerprint_file.close()
+        self.index.close()  # Libère aussi le verrou
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
+
+
+class QuizBankReader:
+    """Lecture seule, projetée en mémoire ; plusieurs processus peuvent ouvrir la même banque."""
+
+    def __init__(self, path):
+        self.path = path
+        self._index_map = self._data_map = None
+        self.refresh()
+
+    @staticmethod
+    def _map(path):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) if size else b""
+
+    def refresh(self):
+        """Relit l'en-tête et prend en compte les questions validées depuis l'ouverture."""
+        index_map = self._map(self.path)
+        generation, count, data_size = read_header(index_map)
+        if self._index_map is not None and generation == self.generation:
+            return
+        data_map = self._map(f"{self.path}.data")
+        if len(data_map) < data_size or len(index_map) < HEADER_SIZE + count * ENTRY_DTYPE.itemsize:
+            raise CorruptBankError("Fichier tronqué après la dernière validation")
+        self._index_map, self._data_map = index_map, data_map
+        self.generation, self.count = generation, count
+        self.entries = np.frombuffer(index_map, dtype=ENTRY_DTYPE, count=count, offset=HEADER_SIZE)
+        self._postings = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        """Question `i` (décodée à la demande)."""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        entry = self.entries[i]
+        offset, length, crc = int(entry["offset"]), int(entry["length"]), int(entry["crc"])
+        payload = self._data_map[offset:offset + length]
+        if zlib.crc32(payload) != crc:
+            raise CorruptBankError(f"Question {i} corrompue")
+        return json.loads(payload)
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
+
+    def _posting(self, field):
+        """Identifiants triés par empreinte du champ `field`, construit une fois par validation lue."""
+        if field not in self._postings:
+            hashes = self.entries[field]
+            order = np.argsort(hashes, kind="stable")
+            self._postings[field] = (hashes[order], order)
+        return self._postings[field]
+
+    def ids(self, **criteria):
+        """
+        Identifiants des questions dont chaque champ (topic, difficulty, pmid)
+        vaut la valeur demandée, par ordre croissant. Seules les questions
+        candidates (même empreinte) sont relues, pour écarter les collisions.
+        """
+        unknown = set(criteria) - set(INDEXED_FIELDS)
+        if unknown:
+            raise ValueError(f"Champs non indexés : {sorted(unknown)}")
+        ids = None
+        for field, value in criteria.items():
+            hashes, order = self._posting(field)
+            h = key_hash(value)
+            lo, hi = np.searchsorted(hashes, h), np.searchsorted(hashes, h, side="right")
+            matches = np.sort(order[lo:hi])
+            ids = matches if ids is None else np.intersect1d(ids, matches, assume_unique=True)
+        if ids is None:
+            return np.arange(self.count)
+        wanted = {field: key_hash(value) for field, value in criteria.items()}
+        return np.array([
+            i for i in ids
+            if all(key_hash(self[int(i)].get(field)) == h for field, h in wanted.items())
+        ], dtype=np.int64)
+
+    def values(self, field):
+        """Nombre de questions par valeur du champ indexé `field` (lit une question par valeur)."""
+        hashes, order = self._posting(field)
+        distinct, starts, counts = np.unique(hashes, return_index=True, return_counts=True)
+        return {
+            self[int(order[start])].get(field, ""): int(count)
+            for h, start, count in zip(distinct, starts, counts) if h
+        }
+
+    def close(self):
+        self.entries = None
+        for m in (self._index_map, self._data_map):
+            if isinstance(m, mmap.mmap):
+                m.close()
+
+
+def append_quiz(path, quiz, topic="", difficulty=""):
+    """
+    Ajoute à la banque un quiz JSON de `streamlit_app` ; renvoie les identifiants
+    attribués. L'index de déduplication du processus est repris d'un appel à
+    l'autre, sans relire toute la banque.
+    """
+    with QuizBankWriter(path) as writer:
+        return [
+            writer.append({**from_quiz_json(q), "topic": topic, "difficulty": difficulty})
+            for q in quiz.values() if isinstance(q, dict)
+        ]
+
+
+def import_shards(path, input_dir, topic="", difficulty=""):
+    """
+    Ajoute les questions des shards terminés de `batch_quiz` (une validation par
+    shard) ; renvoie (questions ajoutées, quasi-doublons écartés).
+    """
+    paths = [p for p in sorted(glob.glob(os.path.join(input_dir, "shard-*.jsonl"))) if not p.endswith(".partial.jsonl")]
+    with QuizBankWriter(path) as writer:
+        start = writer.count
+        for shard in paths:
+            with open(shard, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        for q in entry["questions"]:
+                            writer.append({**q, "pmid": entry["pmid"], "topic": topic, "difficulty": difficulty})
+            writer.commit()
+        return writer.count - start, writer.duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("bank", help="Fichier de banque (.qbk)")
+    parser.add_argument("--import", dest="import_dir", help="Importer les shards de batch_quiz.py de ce répertoire")
+    parser.add_argument("--topic", help="Thème des questions importées, ou filtre")
+    parser.add_argument("--difficulty", help="Difficulté des questions importées, ou filtre")
+    parser.add_argument("--pmid", help="Filtre par PMID source")
+    parser.add_argument("--get", type=int, help="Afficher la question d'identifiant donné")
+    parser.add_argument("--rebuild-dedup", action="store_true", help="Recalculer toutes les empreintes de déduplication")
+    args = parser.parse_args()
+
+    if args.rebuild_dedup:
+        if os.path.exists(f"{args.bank}.dedup"):
+            os.remove(f"{args.bank}.dedup")
+        with QuizBankWriter(args.bank) as writer:
+            print(f"✅ {len(writer.dedup)} empreintes recalculées")
+        return
+    if args.import_dir:
+        added, duplicates = import_shards(args.bank, args.import_dir, args.topic or "", args.difficulty or "")
+        print(f"✅ {added} questions importées dans {args.bank}, {duplicates} quasi-doublons écartés")
+        return
+
+    reader = QuizBankReader(args.bank)
+    if args.get is not None:
+        print(json.dumps(reader[args.get], ensure_ascii=False, indent=2))
+        return
+    criteria = {field: getattr(args, field) for field in INDEXED_FIELDS if getattr(args, field)}
+    if criteria:
+        ids = reader.ids(**criteria)
+        print(f"🔎 {len(ids)} questions : {ids[:20].tolist()}{' ...' if len(ids) > 20 else ''}")
+        return
+    print(f"📚 {len(reader)} questions (génération {reader.generation})")
+    for field in ("topic", "difficulty"):
+        print(f"  {field} : {reader.values(field)}")
+
+
+if __name__ == "__main__":
+    main()
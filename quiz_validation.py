@@ -0,0 +1,86 @@
+"""Mise au format commun et validation des QCM générés.
+
+Chaque backend produit ses questions dans son propre format (JSON Groq, texte
+"Question / CHOICE_A..D / Answer" de `QCMGenerateChain`, dictionnaires de
+`text_to_quizz.transform`). Elles sont ramenées à un seul format :
+{"question": str, "options": {"a": str, ...}, "answer": str}.
+"""
+import re
+
+# Bloc "Question / CHOICE_A..D / Answer" produit par la chaîne (et attendu du modèle fine-tuné)
+BLOCK_PATTERN = re.compile(
+    r"Question\s?\d?:\s*(.*?)\s*\n\s*CHOICE_A:?(.*?)\n\s*CHOICE_B:?(.*?)\n\s*CHOICE_C:?(.*?)\n\s*CHOICE_D:?(.*?)\n+\s*Answer:\s*(.*)",
+    re.IGNORECASE,
+)
+
+
+def parse_blocks(text):
+    """Questions au format texte de `QCMGenerateChain` : [{question, options, answer}]."""
+    return [
+        {
+            "question": question.strip(),
+            "options": {key: value.strip() for key, value in zip("abcd", choices)},
+            "answer": answer.strip(),
+        }
+        for question, *choices, answer in BLOCK_PATTERN.findall(text or "")
+    ]
+
+
+def from_quiz_json(q):
+    """
+    Question du JSON Groq de `streamlit_app` (clés options, correct et, si
+    présentes, explanation/explication et sources ; le premier PMID cité est gardé).
+    """
+    record = {
+        "question": str(q.get("question", "")),
+        "options": {str(k).lower(): str(v) for k, v in q.get("options", {}).items()},
+        "answer": str(q.get("correct", "")),
+    }
+    explanation = q.get("explanation", q.get("explication"))
+    if explanation:
+        record["explanation"] = str(explanation)
+    if q.get("sources"):
+        record["pmid"] = str(q["sources"][0])
+    return record
+
+
+def parse_json_quiz(quiz):
+    """Questions du JSON Groq (déjà décodé par `extract_json_from_text`)."""
+    if not isinstance(quiz, dict) or "error" in quiz:
+        return []
+    return [from_quiz_json(q) for q in quiz.values() if isinstance(q, dict)]
+
+
+def from_transformed(q):
+    """Question au format de `text_to_quizz.transform` (clés A..D et reponse)."""
+    return {
+        "question": q.get("question", "").strip(),
+        "options": {key.lower(): q.get(key, "").lstrip(": ").strip() for key in "ABCD"},
+        "answer": q.get("reponse", "").strip(),
+    }
+
+
+def is_well_formed(q):
+    return bool(q["question"]) and sum(bool(v) for v in q["options"].values()) >= 2
+
+
+def has_duplicate_options(q):
+    texts = [v.strip().casefold() for v in q["options"].values() if v.strip()]
+    return len(set(texts)) < len(texts)
+
+
+def answer_key(q):
+    """Clé d'option désignée par la réponse (« A », « a) », « b: ... » sont acceptés), ou None."""
+    match = re.match(r"\s*([a-dA-D])\b", q["answer"])
+    return match.group(1).lower() if match else None
+
+
+def answer_is_consistent(q):
+    """La réponse désigne une des options."""
+    key = answer_key(q)
+    return key is not None and bool(q["options"].get(key))
+
+
+def is_valid(q):
+    """Question publiable : bien formée, sans options dupliquées, réponse parmi les options."""
+    return is_well_formed(q) and not has_duplicate_options(q) and answer_is_consistent(q)
@@ -1,5 +1,9 @@
-from qcm_chain import QCMGenerateChain
-from qa_llm import QaLlm
+import os
+from contextlib import contextmanager
+
+from langchain_core.callbacks import CallbackManager
+from qcm_chain import PROMPT_PREFIX, QCMGenerateChain
+from qa_llm import MODEL_NAME, QaLlm
 from langchain.output_parsers.regex import RegexParser
 from typing import List
 import asyncio
@@ -33,8 +37,13 @@ parsers = {
 }
 
 
-qa_llm = QaLlm()
-qa_chain = QCMGenerateChain.from_llm(qa_llm.get_llm())
+# QUIZ_MODEL permet de tourner sur CPU avec un modèle minuscule (profilage, CI) ;
+# QUIZ_DRAFT_MODEL active le décodage spéculatif (par exemple qa_llm.DRAFT_MODEL) ;
+# QUIZ_BACKEND choisit un backend CPU quantifié (voir `cpu_inference`)
+qa_llm = QaLlm(os.environ.get("QUIZ_MODEL", MODEL_NAME), draft_model=os.environ.get("QUIZ_DRAFT_MODEL"),
+               prefix=PROMPT_PREFIX, backend=os.environ.get("QUIZ_BACKEND", "torch"))
+# Le gestionnaire de mesures est aussi celui de la chaîne : les runs LLM deviennent ses enfants
+qa_chain = QCMGenerateChain.from_llm(qa_llm.get_llm(), callbacks=[qa_llm.metrics])
 
 async def llm_call(qa_chain: QCMGenerateChain, texts: List[str]):
     """
@@ -54,7 +63,46 @@ async def generate_quizz(contents: List[str]):
     """
     Génère un quiz à partir des contenus fournis.
     """
-    docs = [{"text": content} for content in contents]
+    return await llm_call(qa_chain, contents)
+
+
+@contextmanager
+def chain_run(name: str, **inputs):
+    """
+    Run de niveau chaîne autour d'appels directs au LLM de `qa_chain` : les
+    callbacks de la chaîne le voient comme une exécution de chaîne. Le
+    gestionnaire renvoyé sert de parent aux appels du LLM (`run.get_child()`)
+    et aux étapes hors LangChain (`run.run_id`).
+    """
+    manager = CallbackManager.configure(inheritable_callbacks=qa_chain.callbacks)
+    run = manager.on_chain_start({"name": name}, inputs, name=name)
+    try:
+        yield run
+    except BaseException as e:
+        run.on_chain_error(e)
+        raise
+    run.on_chain_end({})
+
+
+async def generate_from_prompts(prompts: List[str], inline: bool = False, callbacks=None):
+    """
+    Appelle directement le LLM de la chaîne sur des prompts déjà formatés
+    (en un seul lot), pour chronométrer séparément le formatage et la génération.
+    Avec `inline=True`, la génération tourne dans le thread appelant (et non
+    dans l'exécuteur d'asyncio), là où les profileurs l'observent. `callbacks` :
+    par exemple `run.get_child()` d'un `chain_run`.
+    """
+    if inline:
+        result = qa_chain.llm.generate(prompts, callbacks=callbacks)
+    else:
+        result = await qa_chain.llm.agenerate(prompts, callbacks=callbacks)
+    return [generations[0].text for generations in result.generations]
+
 
-    return await llm_call(qa_chain, docs)  
+def parse_output(text: str):
+    """Champs question1, A_1, ..., reponse2 de la sortie brute, ou {} si le format n'est pas reconnu."""
+    try:
+        return qa_chain.prompt.output_parser.parse(text)
+    except ValueError:
+        return {}
     
\ No newline at end of file
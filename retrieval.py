@@ -0,0 +1,333 @@
+"""Recherche BM25 dans le corpus PubMed des maladies rénales.
+
+L'index inversé est construit une seule fois à partir des abstracts nettoyés
+(anglais et français) puis sauvegardé sous forme de tableaux NumPy. Ces
+tableaux sont rechargés en mémoire mappée (``mmap_mode="r"``) : le corpus
+n'est pas re-tokenisé à chaque démarrage et plusieurs processus partagent les
+mêmes pages.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from clean_text import clean_text
+
+# Fichiers sources : le CSV racine et le CSV daté portent les PMID, le CSV
+# traduit (abstract_fr) est rattaché aux PMID par le titre de l'article.
+CORPUS_FILES = (
+    "articles_maladies_renales.csv",
+    "Collect_Dataset_Kidney_Disease/articles_maladies_renales_20250226-115315.csv",
+    "Collect_Dataset_Kidney_Disease/articles_maladies_renales.csv",
+)
+INDEX_DIR = ".bm25_index"
+
+PASSAGE_WORDS = 120  # Taille d'un passage (en mots)
+K1 = 1.5
+B = 0.75
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it of on or that the this to was were with
+au aux avec ce ces dans de des du elle en est et il ils la le les leur lors mais ne par pas
+plus pour qu que qui sa se ses son sont sur un une ou
+""".split())
+
+
+def tokenize(text):
+    """
+    Découpe un texte en termes normalisés (minuscules, sans accents, sans mots vides).
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    tokens = []
+    for token in re.findall(r"\w+", text):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        # Racinisation minimale : "renales" et "renale" partagent le même terme
+        if len(token) > 3 and token.endswith("s"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def estimate_tokens(text):
+    """Estimation grossière du nombre de tokens d'un texte (≈ 4 caractères par token)."""
+    return len(text) // 4 + 1
+
+
+def _extract_pmids(df):
+    """Renvoie les PMID d'un DataFrame d'articles (colonne `pmid` ou URL PubMed)."""
+    pmids = [""] * len(df)
+    if "pmid" in df:
+        pmids = [str(int(p)) if pd.notna(p) else "" for p in df["pmid"]]
+    if "url" in df:
+        for i, url in enumerate(df["url"]):
+            match = re.search(r"pubmed\.ncbi\.nlm\.nih\.gov/(\d+)", str(url))
+            if not pmids[i] and match:
+                pmids[i] = match.group(1)
+    return pmids
+
+
+def load_passages(files=CORPUS_FILES):
+    """
+    Charge les abstracts nettoyés (EN et FR) et les découpe en passages de
+    `PASSAGE_WORDS` mots. Chaque passage garde le PMID de son article.
+    """
+    frames = [pd.read_csv(path) for path in files if os.path.exists(path)]
+
+    title_to_pmid = {}
+    for df in frames:
+        for title, pmid in zip(df["title"], _extract_pmids(df)):
+            if pmid:
+                title_to_pmid[title] = pmid
+
+    passages = []
+    seen = set()
+    for df in frames:
+        pmids = [pmid or title_to_pmid.get(title, "") for title, pmid in zip(df["title"], _extract_pmids(df))]
+        for column, lang in (("abstract", "en"), ("abstract_fr", "fr")):
+            if column not in df:
+                continue
+            for pmid, abstract in zip(pmids, df[column]):
+                if not pmid or (pmid, lang) in seen:
+                    continue
+                words = clean_text(abstract).split()
+                if not words:
+                    continue
+                seen.add((pmid, lang))
+                for start in range(0, len(words), PASSAGE_WORDS):
+                    passages.append({
+                        "pmid": pmid,
+                        "lang": lang,
+                        "text": " ".join(words[start:start + PASSAGE_WORDS]),
+                    })
+    return passages
+
+
+def load_articles(files=CORPUS_FILES, columns=("abstract_fr", "abstract")):
+    """
+    Un abstract nettoyé par PMID : le premier non vide parmi `columns`
+    (français d'abord par défaut). Renvoie une liste de {"pmid", "title", "text"}.
+    """
+    frames = [pd.read_csv(path) for path in files if os.path.exists(path)]
+
+    title_to_pmid = {}
+    for df in frames:
+        for title, pmid in zip(df["title"], _extract_pmids(df)):
+            if pmid:
+                title_to_pmid[title] = pmid
+
+    articles = {}
+    for column in columns:
+        for df in frames:
+            if column not in df:
+                continue
+            pmids = [pmid or title_to_pmid.get(title, "") for title, pmid in zip(df["title"], _extract_pmids(df))]
+            for pmid, title, abstract in zip(pmids, df["title"], df[column]):
+                if not pmid or pmid in articles:
+                    continue
+                text = clean_text(abstract)
+                if text:
+                    articles[pmid] = {"pmid": pmid, "title": title, "text": text}
+    return list(articles.values())
+
+
+def corpus_fingerprint(files=CORPUS_FILES):
+    """Empreinte des fichiers sources : l'index est reconstruit si elle change."""
+    digest = hashlib.sha1()
+    for path in files:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    digest.update(f"{PASSAGE_WORDS}".encode())
+    return digest.hexdigest()
+
+
+def build_index(passages, index_dir=INDEX_DIR, fingerprint=""):
+    """
+    Construit l'index inversé et l'écrit dans `index_dir` :
+    - offsets.npy : début des postings de chaque terme (CSR)
+    - docs.npy / tfs.npy : identifiants de passages et fréquences
+    - doc_len.npy : longueur de chaque passage
+    - vocab.json, passages.json, meta.json
+    """
+    vocab = {}
+    terms, docs, tfs = [], [], []
+    doc_len = np.zeros(len(passages), dtype=np.float32)
+    for doc_id, passage in enumerate(passages):
+        counts = Counter(tokenize(passage["text"]))
+        doc_len[doc_id] = sum(counts.values())
+        for term, tf in counts.items():
+            terms.append(vocab.setdefault(term, len(vocab)))
+            docs.append(doc_id)
+            tfs.append(tf)
+
+    terms = np.asarray(terms, dtype=np.int32)
+    order = np.argsort(terms, kind="stable")
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(terms, minlength=len(vocab)))
+
+    # Écriture dans un répertoire temporaire puis remplacement atomique
+    tmp_dir = f"{index_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "docs.npy"), np.asarray(docs, dtype=np.int32)[order])
+    np.save(os.path.join(tmp_dir, "tfs.npy"), np.asarray(tfs, dtype=np.float32)[order])
+    np.save(os.path.join(tmp_dir, "doc_len.npy"), doc_len)
+    with open(os.path.join(tmp_dir, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    with open(os.path.join(tmp_dir, "passages.json"), "w", encoding="utf-8") as f:
+        json.dump(passages, f, ensure_ascii=False)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "k1": K1, "b": B}, f)
+
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.replace(tmp_dir, index_dir)
+
+
+class BM25Index:
+    """Index BM25 chargé en mémoire mappée depuis `index_dir`."""
+
+    def __init__(self, index_dir=INDEX_DIR):
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode="r")
+
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_dir, "vocab.json"), encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(index_dir, "passages.json"), encoding="utf-8") as f:
+            self.passages = json.load(f)
+
+        self.offsets = load("offsets.npy")
+        self.docs = load("docs.npy")
+        self.tfs = load("tfs.npy")
+        self.doc_len = load("doc_len.npy")
+
+        n_docs = len(self.passages)
+        doc_freq = np.diff(self.offsets).astype(np.float32)
+        self.idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        self.avgdl = float(self.doc_len.mean()) if n_docs else 0.0
+
+    def search(self, query, k=5):
+        """Renvoie les `k` passages les plus pertinents pour `query`, avec leur score."""
+        n_docs = len(self.passages)
+        if n_docs == 0:
+            return []
+
+        k1, b = self.meta["k1"], self.meta["b"]
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.docs[start:end]
+            tf = self.tfs[start:end]
+            norm = k1 * (1 - b + b * self.doc_len[docs] / self.avgdl)
+            # Un terme n'apparaît qu'une fois par passage : pas de doublons dans `docs`
+            scores[docs] += self.idf[term_id] * tf * (k1 + 1) / (tf + norm)
+
+        k = min(k, n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [dict(self.passages[i], score=float(scores[i])) for i in top if scores[i] > 0]
+
+
+@lru_cache(maxsize=None)
+def get_index(files=CORPUS_FILES, index_dir=INDEX_DIR):
+    """
+    Ouvre l'index BM25, en le (re)construisant si le corpus a changé.
+    """
+    fingerprint = corpus_fingerprint(files)
+    meta_path = os.path.join(index_dir, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            if json.load(f).get("fingerprint") == fingerprint:
+                return BM25Index(index_dir)
+
+    print("🛠️ Construction de l'index BM25...")
+    passages = load_passages(files)
+    build_index(passages, index_dir, fingerprint)
+    print(f"✅ Index construit : {len(passages)} passages.")
+    return BM25Index(index_dir)
+
+
+def pack_passages(hits, token_budget=1500):
+    """
+    Assemble les passages (par ordre de pertinence) dans la limite de `token_budget`.
+    Renvoie le contexte formaté et la liste des PMID utilisés.
+    """
+    blocks, pmids = [], []
+    used = 0
+    for hit in hits:
+        block = f"[PMID {hit['pmid']}] {hit['text']}"
+        cost = estimate_tokens(block)
+        if used + cost > token_budget:
+            continue
+        blocks.append(block)
+        used += cost
+        if hit["pmid"] not in pmids:
+            pmids.append(hit["pmid"])
+    return "\n\n".join(blocks), pmids
+
+
+def attach_citations(quiz_data, pmids):
+    """
+    Ajoute les PMID sources à l'explication de chaque question.
+    Seuls les PMID cités par le modèle et présents dans le contexte sont conservés ;
+    si aucun ne l'est, la question reste sans citation. Les mentions « PMID … »
+    de l'explication qui ne font pas partie du contexte sont retirées.
+    """
+    retrieved = {str(pmid) for pmid in pmids}
+    for q_data in quiz_data.values():
+        if not isinstance(q_data, dict):
+            continue
+        sources = q_data.get("sources") or []
+        if not isinstance(sources, list):
+            sources = [sources]  # "PMID 123, PMID 456" ou 123
+        cited = [pmid for source in sources for pmid in re.findall(r"\d+", str(source))]
+        cited = [pmid for pmid in dict.fromkeys(cited) if pmid in retrieved]
+        q_data["sources"] = cited
+
+        explanation_key = "explication" if "explication" in q_data else "explanation"
+        explanation = _strip_unknown_pmids(str(q_data.get(explanation_key, "")), retrieved)
+        if cited and not re.search(r"PMID", explanation, re.IGNORECASE):
+            references = ", ".join(f"PMID {pmid}" for pmid in cited)
+            explanation = f"{explanation} (Sources : {references})".strip()
+        if explanation_key in q_data or explanation:
+            q_data[explanation_key] = explanation
+    return quiz_data
+
+
+# « PMID 123 », « PMID: 123 », « (PMID 123, 456) » et la ponctuation qui les entoure
+_PMID_MENTION = re.compile(r"\s*[(\[]?\s*PMIDs?\s*:?\s*\d+(?:\s*(?:,|et|and)\s*\d+)*\s*[)\]]?", re.IGNORECASE)
+
+
+def _strip_unknown_pmids(explanation, retrieved):
+    """Explication sans les mentions de PMID absents du contexte (les mentions valides restent)."""
+    def keep_known(match):
+        numbers = re.findall(r"\d+", match.group(0))
+        known = [pmid for pmid in numbers if pmid in retrieved]
+        if not known:
+            return ""
+        if len(known) == len(numbers):
+            return match.group(0)
+        return " (" + ", ".join(f"PMID {pmid}" for pmid in known) + ")"
+
+    explanation = _PMID_MENTION.sub(keep_known, explanation)
+    return re.sub(r"\s+([.,;:])", r"\1", explanation).strip()
+
+
+if __name__ == "__main__":
+    index = get_index()
+    for hit in index.search("Insuffisance Rénale Chronique", k=5):
+        print(f"{hit['score']:.2f} [PMID {hit['pmid']}] ({hit['lang']}) {hit['text'][:80]}...")
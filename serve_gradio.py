@@ -0,0 +1,69 @@
+"""Production serving of the Gradio quiz: several worker processes sharing one memory-mapped bank.
+
+The CSV bank is converted once into a directory of `.npy` files (see
+`AnswerKey.save`); every worker maps it read-only, so the question texts are
+held once in the OS page cache whatever the number of workers. Each worker is a
+`gradio_app.py` process with its own request queue, listening on
+`port`, `port + 1`, ... Session state (`gr.State`) lives in the worker that
+created it: put a load balancer with sticky sessions in front of the workers.
+
+Example:
+    python serve_gradio.py --workers 4 --concurrency 16 --max-queue 512
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+
+from answer_key import AnswerKey
+from gradio_app import BANK_PATH
+
+MMAP_DIR = ".answer_key"
+
+
+def prepare_bank(csv_path=BANK_PATH, directory=MMAP_DIR):
+    """Write the memory-mapped copy of the bank unless it is newer than the CSV."""
+    meta = os.path.join(directory, "meta.json")
+    if not os.path.exists(meta) or os.path.getmtime(meta) < os.path.getmtime(csv_path):
+        AnswerKey.from_csv(csv_path).save(directory)
+        print(f"✅ Bank written to {directory}")
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bank", default=BANK_PATH, help="CSV bank")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=8, help="Events processed concurrently per worker")
+    parser.add_argument("--max-queue", type=int, default=256, help="Waiting requests per worker")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7860, help="Port of the first worker")
+    parser.add_argument("--mode", choices=["session", "full"], default="session")
+    args = parser.parse_args()
+
+    directory = prepare_bank(args.bank)
+    workers = [
+        subprocess.Popen([
+            sys.executable, "gradio_app.py", "--mode", args.mode, "--bank", directory,
+            "--concurrency", str(args.concurrency), "--max-queue", str(args.max_queue),
+            "--host", args.host, "--port", str(args.port + i),
+        ])
+        for i in range(args.workers)
+    ]
+    print(f"✅ {args.workers} workers on ports {args.port}-{args.port + args.workers - 1}")
+
+    def stop(*_):
+        for worker in workers:
+            worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt:
+        stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -391,196 +391,218 @@
 
 
 
+import math
+import os
+import uuid
 import streamlit as st
-import requests
-import re
-import json
-import time
-from langchain.prompts import PromptTemplate
-
-# ✅ Initialisation des variables de session
-if "quiz_data" not in st.session_state:
-    st.session_state["quiz_data"] = None
-if "quiz_submitted" not in st.session_state:
-    st.session_state["quiz_submitted"] = False
-if "user_answers" not in st.session_state:
-    st.session_state["user_answers"] = {}
-if "score" not in st.session_state:
-    st.session_state["score"] = 0
-if "quiz_count" not in st.session_state:
-    st.session_state["quiz_count"] = 0
-if "current_difficulty" not in st.session_state:
-    st.session_state["current_difficulty"] = "Moyen"
-
-# ✅ Configuration de l'API Groq
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_API_KEY = "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"  # Remplace par ta clé API
-
-HEADERS = {
-    "Authorization": f"Bearer {GROQ_API_KEY}",
-    "Content-Type": "application/json"
-}
-
-def query_groq(prompt, model="mistral-saba-24b", max_retries=3, wait_time=5):
+from groq_client import extract_json_from_text
+from irt import AdaptiveEngine, difficulty_label
+from learner_store import LearnerStore
+from llm_router import BackendError, build_router
+from prompts import DEFAULT_VARIANT, PROMPT_TEMPLATES, create_prompt_with_langchain
+from quality_filter import QualityFilter, make_judge
+from quiz_bank_file import append_quiz
+from retrieval import attach_citations, get_index, pack_passages
+
+# Affichage du prompt et des réponses brutes (QUIZ_DEBUG=1 pour l'activer par défaut)
+DEBUG = os.environ.get("QUIZ_DEBUG", "0") == "1"
+# Backends de secours du routeur LLM : modèle Ollama local (OLLAMA_MODEL=mistral par exemple)
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL")
+# Banque des quiz générés (voir quiz_bank_file.py) ; QUIZ_BANK= pour ne rien conserver
+BANK_PATH = os.environ.get("QUIZ_BANK", "quiz_bank.qbk")
+
+@st.cache_resource
+def get_store():
+    """Base SQLite des apprenants, partagée par toutes les sessions du processus."""
+    return LearnerStore()
+
+def get_learner_id():
     """
-    Envoie une requête à l'API Groq et gère les erreurs.
+    Identifiant de l'apprenant, conservé dans l'URL (?learner=...) pour survivre aux rechargements.
     """
-    payload = {
-        "model": model,  
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.7,
-        "max_tokens": 1024  # Augmentez cette valeur
-    }
-    
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(GROQ_URL, headers=HEADERS, json=payload, timeout=30)
-            
-            if response.status_code == 404:
-                st.error("❌ Erreur 404 : Vérifiez l'URL de l'API Groq")
-                return None
-
-            if response.status_code == 401:
-                st.error("❌ Erreur 401 : Vérifiez votre clé API Groq")
-                return None
+    if "learner" not in st.query_params:
+        st.query_params["learner"] = uuid.uuid4().hex
+    return st.query_params["learner"]
 
-            if response.status_code == 503:
-                st.warning(f"🔄 Serveur occupé, attente de {wait_time} secondes...")
-                time.sleep(wait_time)
-                continue
+LEARNER_ID = get_learner_id()
 
-            response.raise_for_status()
-            
-            response_json = response.json()
-            if "choices" in response_json:
-                return response_json["choices"][0]["message"]["content"]
-            else:
-                st.error(f"⚠️ Réponse inattendue de Groq : {response_json}")
-                return None
-        
-        except requests.exceptions.RequestException as e:
-            st.error(f"❌ Tentative {attempt+1}/{max_retries} échouée : {e}")
-            time.sleep(wait_time)
-
-    return None
-
-def create_prompt_with_langchain(topic, number, difficulty):
-    """
-    Génère un prompt optimisé pour Groq en utilisant LangChain.
-    """
-    template = PromptTemplate.from_template("""
-    Vous êtes un expert médical en néphrologie.
-    Générez EXACTEMENT {number} questions (ni plus, ni moins) de niveau {difficulty} sur le sujet suivant : "{topic}".
-
-    **TRÈS IMPORTANT**: 
-    1. Votre réponse doit contenir EXACTEMENT {number} questions numérotées de 1 à {number}.
-    2. Votre réponse doit être UNIQUEMENT un objet JSON valide, sans aucun texte avant ou après.
-    3. Ne commencez pas par ```json ou ``` et ne terminez pas par ```.
-    
-    Format exact attendu avec {number} questions:
-    
-    {{
-        "1": {{
-            "question": "Question 1 ?",
-            "options": {{
-                "a": "Option A",
-                "b": "Option B",
-                "c": "Option C",
-                "d": "Option D"
-            }},
-            "correct": "a",
-            "explanation": "Explication détaillée."
-        }},
-        ... répétez pour toutes les {number} questions ...
-        "{number}": {{
-            "question": "Question {number} ?",
-            "options": {{
-                "a": "Option A",
-                "b": "Option B",
-                "c": "Option C",
-                "d": "Option D"
-            }},
-            "correct": "c",
-            "explanation": "Explication détaillée."
-        }}
-    }}
-    """)
-    
-    return template.format(topic=topic, number=number, difficulty=difficulty)
-
-def extract_json_from_text(text):
+# ✅ Initialisation des variables de session (restaurées depuis la base après un rechargement)
+if "quiz_data" not in st.session_state:
+    quiz, answers, topic, submitted = get_store().load_draft(LEARNER_ID) or (None, {}, "", False)
+    st.session_state["quiz_data"] = quiz
+    st.session_state["user_answers"] = answers
+    st.session_state["quiz_topic"] = topic
+    st.session_state["quiz_submitted"] = submitted
+
+def save_draft():
+    """Sauvegarde le quiz en cours et les réponses cochées (écriture différée)."""
+    get_store().save_draft(
+        LEARNER_ID,
+        st.session_state["quiz_data"],
+        st.session_state["user_answers"],
+        st.session_state["quiz_topic"],
+        st.session_state["quiz_submitted"],
+    )
+
+@st.cache_resource(ttl=600, max_entries=1)
+def _calibrated_engine(bank_bucket):
+    return AdaptiveEngine.from_store(get_store())
+
+def get_engine():
     """
-    Extrait proprement le JSON de la réponse du modèle.
+    Modèle IRT calibré sur toutes les réponses de la base. Il est recalibré
+    toutes les 10 minutes, ou dès que la banque a grossi d'environ 10 %.
     """
-    if not text:
-        return {"error": "Aucune réponse obtenue du modèle"}
-    
-    # Afficher le texte brut pour débogage (temporairement)
-    st.code(text, language="json")
-    
-    # Tentative d'extraction et nettoyage du JSON
-    try:
-        # Essayer d'abord de charger le texte directement
-        return json.loads(text)
-    except json.JSONDecodeError:
-        # Si échec, tenter d'extraire avec regex et nettoyer
-        json_match = re.search(r"\{.*\}", text, re.DOTALL)
-        
-        if json_match:
-            json_text = json_match.group(0)
-            
-            # Nettoyage supplémentaire du JSON
-            try:
-                # Remplacer les sauts de ligne non échappés dans les chaînes
-                cleaned_json = re.sub(r'(?<!\\)\\n', '\\\\n', json_text)
-                # Corriger les virgules en trop avant les accolades fermantes
-                cleaned_json = re.sub(r',(\s*})', r'\1', cleaned_json)
-                # Ajouter les accolades manquantes si nécessaire
-                if cleaned_json.count('{') > cleaned_json.count('}'):
-                    cleaned_json += "}" * (cleaned_json.count('{') - cleaned_json.count('}'))
-                
-                return json.loads(cleaned_json)
-            except json.JSONDecodeError as e:
-                st.error(f"🚨 Erreur JSON après nettoyage : {e}")
-                st.code(cleaned_json, language="json")
-                return {"error": f"JSON invalide : {e}"}
-        else:
-            return {"error": "Aucun JSON détecté dans la réponse"}
+    return _calibrated_engine(int(math.log(get_store().bank_size() + 1, 1.1)))
 
 def adjust_difficulty():
     """
-    Ajuste dynamiquement la difficulté en fonction du score.
+    Ajuste dynamiquement la difficulté selon le niveau IRT estimé de l'apprenant.
+    Sans réponse enregistrée, l'estimation vaut 0 et le niveau reste "Moyen".
     """
-    score = st.session_state["score"]
-    quiz_count = st.session_state["quiz_count"]
+    responses = get_store().get_responses(LEARNER_ID)
+    return difficulty_label(get_engine().ability(LEARNER_ID, responses))
 
-    if quiz_count < 3:
-        return "Moyen"
+def select_bank_questions(number):
+    """
+    Sélectionne dans la banque les `number` questions inédites les plus
+    informatives pour le niveau actuel de l'apprenant.
+    """
+    responses = get_store().get_responses(LEARNER_ID)
+    engine = get_engine()
+    theta = engine.ability(LEARNER_ID, responses)
+    question_ids = engine.next_questions(LEARNER_ID, number, theta, exclude={q_id for q_id, _, _ in responses})
+    get_store().set_difficulty(LEARNER_ID, difficulty_label(theta))
+    return {str(i): q_data for i, q_data in enumerate(get_store().get_questions(question_ids), start=1)}
+
+def start_quiz(quiz, topic):
+    """Remplace le quiz en cours et le sauvegarde comme brouillon."""
+    st.session_state["quiz_data"] = quiz
+    st.session_state["quiz_topic"] = topic
+    st.session_state["quiz_submitted"] = False
+    st.session_state["user_answers"] = {}
+    for key in [key for key in st.session_state if key.startswith("q_")]:
+        del st.session_state[key]
+    save_draft()
+    st.rerun()
+
+@st.cache_resource
+def get_retriever():
+    """Index BM25 du corpus PubMed, ouvert une seule fois par processus."""
+    return get_index()
+
+@st.cache_resource
+def get_router(model):
+    """
+    Routeur LLM du processus : Groq (modèle choisi), avec bascule vers Ollama
+    s'il est configuré. Ses statistiques de latence et d'erreurs sont partagées
+    par toutes les sessions.
+    """
+    return build_router(model, OLLAMA_MODEL)
 
-    if score / quiz_count >= 0.8:  
-        return "Difficile"
-    elif score / quiz_count <= 0.4:  
-        return "Facile"
-    
-    return "Moyen"
+@st.cache_resource
+def get_quality_filter(model):
+    """Contrôle qualité des QCM ; seules les questions douteuses sont relues par le modèle Groq."""
+    return QualityFilter(make_judge("groq", model))
 
-def generate_mcq(topic, number=5, model="mistral"):
+def generate_mcq(topic, number=5, model="mistral", use_corpus=True, top_k=8, token_budget=1500,
+                 variant=DEFAULT_VARIANT, debug=DEBUG):
     difficulty = adjust_difficulty()
-    prompt = create_prompt_with_langchain(topic, number, difficulty)
+
+    # 🔍 Récupération des passages PubMed pertinents pour le sujet
+    context, pmids = "", []
+    if use_corpus:
+        hits = get_retriever().search(topic, k=top_k)
+        context, pmids = pack_passages(hits, token_budget)
+
+    prompt = create_prompt_with_langchain(topic, number, difficulty, context, variant)
+    
+    if debug:
+        st.write("Prompt envoyé à l'API:", prompt)
+    
+    try:
+        response_text = get_router(model).generate_sync(prompt)
+    except BackendError as e:
+        return {"error": f"Aucune réponse du modèle : {e}"}
     
-    st.write("Prompt envoyé à l'API:", prompt)  # Débogage
+    if debug:
+        st.write("Réponse brute de l'API:", response_text)
     
-    response_text = query_groq(prompt, model)
+    quiz_data = extract_json_from_text(response_text, debug)
+    if pmids and "error" not in quiz_data:
+        quiz_data = attach_citations(quiz_data, pmids)
     
-    st.write("Réponse brute de l'API:", response_text)  # Débogage
+    if "error" not in quiz_data:
+        quiz_data = get_quality_filter(model).filter_quiz(quiz_data, context or None) or {
+            "error": "Aucune question n'a passé le contrôle qualité"
+        }
     
-    quiz_data = extract_json_from_text(response_text)
+    if debug:
+        st.write("Données JSON extraites:", quiz_data)
     
-    st.write("Données JSON extraites:", quiz_data)  # Débogage
+    if BANK_PATH and "error" not in quiz_data:
+        append_quiz(BANK_PATH, quiz_data, topic, difficulty)
     
-    st.session_state["current_difficulty"] = difficulty
+    get_store().set_difficulty(LEARNER_ID, difficulty)
     return quiz_data
 
+@st.cache_data
+def load_css(path=os.path.join(os.path.dirname(__file__), "assets", "style.css")):
+    """Feuille de style de l'application, mise en cache."""
+    with open(path, encoding="utf-8") as f:
+        return f"<style>{f.read()}</style>"
+
+@st.cache_data
+def prepare_quiz(quiz_data):
+    """
+    Prépare une seule fois par quiz l'affichage des questions :
+    (numéro, énoncé, clés des options, libellés des options).
+    """
+    questions = []
+    for q_num, q_data in quiz_data.items():
+        options = q_data.get("options", {})
+        questions.append((
+            q_num,
+            q_data.get("question", q_data.get("mcq", "Question manquante")),
+            list(options),
+            {key: f"{key}: {value}" for key, value in options.items()},
+        ))
+    return questions
+
+def record_answer(q_num):
+    """Callback des boutons radio : enregistre la réponse et met à jour le brouillon."""
+    st.session_state["user_answers"][q_num] = st.session_state[f"q_{q_num}"]
+    save_draft()
+
+@st.fragment
+def render_question(q_num, question_text, option_keys, labels, total_questions):
+    """
+    Affiche une question. Un clic sur une option ne relance que ce fragment ;
+    le script complet n'est relancé que lorsque le quiz devient complet,
+    pour activer le bouton de soumission.
+    """
+    st.markdown(f"**{question_text}**")
+
+    # Réponse restaurée depuis la base après un rechargement
+    saved_answer = st.session_state["user_answers"].get(q_num)
+
+    st.radio(
+        "Sélectionnez votre réponse:",
+        option_keys,
+        format_func=labels.get,
+        key=f"q_{q_num}",
+        index=option_keys.index(saved_answer) if saved_answer in option_keys else None,
+        disabled=st.session_state["quiz_submitted"],
+        on_change=record_answer,
+        args=(q_num,),
+    )
+
+    complete = len(st.session_state["user_answers"]) >= total_questions
+    if complete != st.session_state["answers_complete"]:
+        st.rerun()
+
+    st.divider()
+
 def display_interactive_quiz(quiz_data):
     """
     Affiche un quiz interactif avec des boutons radio pour chaque question
@@ -590,45 +612,12 @@ def display_interactive_quiz(quiz_data):
         st.error(f"Erreur: {quiz_data.get('error', 'Données de quiz invalides')}")
         return
     
-    # Initialiser les réponses de l'utilisateur si ce n'est pas déjà fait
-    if "user_answers" not in st.session_state:
-        st.session_state["user_answers"] = {}
+    questions = prepare_quiz(quiz_data)
+    st.session_state["answers_complete"] = len(st.session_state["user_answers"]) >= len(questions)
     
-    # Initialiser l'état de soumission
-    if "quiz_submitted" not in st.session_state:
-        st.session_state["quiz_submitted"] = False
-    
-    # Afficher chaque question avec des boutons radio
-    for q_num, q_data in quiz_data.items():
-        # st.markdown(f"### Question {q_num}")
-        
-        # Afficher la question
-        question_text = q_data.get("question", q_data.get("mcq", "Question manquante"))
-        st.markdown(f"**{question_text}**")
-        
-        # Afficher les options comme boutons radio
-        options = q_data.get("options", {})
-        option_keys = list(options.keys())
-        option_values = [f"{key}: {options[key]}" for key in option_keys]
-        
-        # Créer un identifiant unique pour chaque question
-        q_id = f"q_{q_num}"
-        
-        # Afficher les boutons radio
-        user_choice = st.radio(
-            "Sélectionnez votre réponse:",
-            option_values,
-            key=q_id,
-            index=None,
-            disabled=st.session_state["quiz_submitted"]
-        )
-        
-        # Enregistrer la réponse de l'utilisateur
-        if user_choice:
-            selected_key = user_choice.split(":")[0].strip()
-            st.session_state["user_answers"][q_num] = selected_key
-            
-        st.divider()
+    # Afficher chaque question dans son propre fragment
+    for question in questions:
+        render_question(*question, len(questions))
     
     # Bouton de soumission
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -636,15 +625,50 @@ def display_interactive_quiz(quiz_data):
         if not st.session_state["quiz_submitted"]:
             if st.button("Soumettre vos réponses", 
                          use_container_width=True, 
-                         disabled=len(st.session_state["user_answers"]) < len(quiz_data)):
+                         disabled=not st.session_state["answers_complete"]):
+                # La tentative est enregistrée une seule fois, au moment de la soumission
+                get_store().record_attempt(
+                    LEARNER_ID,
+                    quiz_data,
+                    st.session_state["user_answers"],
+                    st.session_state["quiz_topic"],
+                    get_store().get_stats(LEARNER_ID)["current_difficulty"],
+                )
                 st.session_state["quiz_submitted"] = True
                 st.rerun()
         else:
             if st.button("Réinitialiser le quiz", use_container_width=True):
                 st.session_state["quiz_submitted"] = False
                 st.session_state["user_answers"] = {}
+                for q_num in quiz_data:
+                    st.session_state.pop(f"q_{q_num}", None)
+                save_draft()
                 st.rerun()
 
+@st.cache_data
+def score_quiz(quiz_data, user_answers):
+    """
+    Corrige le quiz (une seule fois par soumission) : renvoie pour chaque question
+    (numéro, énoncé, options, réponse choisie, bonne réponse, explication) et le
+    nombre de bonnes réponses.
+    """
+    rows = []
+    correct_count = 0
+    for q_num, q_data in quiz_data.items():
+        user_answer = user_answers.get(q_num, "")
+        correct_answer = q_data.get("correct", "")
+        correct_count += user_answer == correct_answer
+        explanation_key = "explanation" if "explanation" in q_data else "explication"
+        rows.append((
+            q_num,
+            q_data.get("question", q_data.get("mcq", "")),
+            q_data.get("options", {}),
+            user_answer,
+            correct_answer,
+            q_data.get(explanation_key),
+        ))
+    return rows, correct_count
+
 def display_quiz_results(quiz_data):
     """
     Affiche les résultats du quiz avec les réponses correctes et les explications.
@@ -654,29 +678,18 @@ def display_quiz_results(quiz_data):
     
     st.markdown("## 📊 Résultats du Quiz")
     
-    correct_count = 0
-    total_questions = len(quiz_data)
-    
-    incorrect_answers = []  # Pour stocker les questions mal répondues
+    rows, correct_count = score_quiz(quiz_data, st.session_state["user_answers"])
+    total_questions = len(rows)
     
-    for q_num, q_data in quiz_data.items():
-        user_answer = st.session_state["user_answers"].get(q_num, "")
-        correct_answer = q_data.get("correct", "")
-        
+    for q_num, question_text, options, user_answer, correct_answer, explanation in rows:
         # Affichage de la question
-        question_text = q_data.get("question", q_data.get("mcq", ""))
         st.markdown(f"**{q_num}. {question_text}**")
         
         # Vérifier si la réponse est correcte
         is_correct = user_answer == correct_answer
-        if is_correct:
-            correct_count += 1
-        else:
-            incorrect_answers.append(q_num)
         
         # ✅ Afficher la réponse de l'utilisateur
         st.markdown("### 📝 Vos réponses")
-        options = q_data.get("options", {})
         
         for opt_key, opt_value in options.items():
             prefix = "✅ " if opt_key == correct_answer else "❌ " if opt_key == user_answer else "   "
@@ -688,15 +701,10 @@ def display_quiz_results(quiz_data):
             st.warning(f"💡 La bonne réponse était : **{correct_answer} - {options.get(correct_answer, '')}**")
 
         # ✅ Afficher l'explication
-        explanation_key = "explanation" if "explanation" in q_data else "explication"
-        if explanation_key in q_data:
-            st.info(f"📚 **Explication**: {q_data[explanation_key]}")
+        if explanation is not None:
+            st.info(f"📚 **Explication**: {explanation}")
         
         st.divider()
-        
-        st.session_state["score"] += correct_count
-        st.session_state["quiz_count"] += 1
-        
     
     # ✅ Afficher le score global
     score_percentage = (correct_count / total_questions) * 100 if total_questions > 0 else 0
@@ -716,60 +724,9 @@ def display_quiz_results(quiz_data):
         else:
             st.error("📚 Ce sujet nécessite plus de révision. Ne vous découragez pas !")
 
-    # # ✅ Affichage des erreurs
-    # if incorrect_answers:
-    #     st.markdown("### ❌ Questions mal répondues")
-    #     for q_num in incorrect_answers:
-    #         st.markdown(f"- **Question {q_num}**")
-
-st.markdown("""
-    <style>
-        /* 💎 Background et design */
-        body {
-            background-color: #FBF8F1;
-            font-family: 'Arial', sans-serif;
-        }
-        .main-header {
-            text-align: center;
-            color: #EF4D89;
-            font-size: 2.5rem;
-            font-weight: bold;
-            padding: 1rem 0;
-            margin-bottom: 1rem;
-        }
-        .subtitle {
-            text-align: center;
-            color: #00BAC6;
-            font-size: 1.5rem;
-            margin-bottom: 2rem;
-            border-top: 2px solid #00BAC6;
-        }
-        .stButton>button {
-            background-color: #EF4D89 !important;
-            color: white !important;
-            font-size: 1.1rem !important;
-            font-weight: bold !important;
-            border-radius: 10px !important;
-            padding: 10px !important;
-        }
-        .stButton>button:hover {
-            background-color: #D43F76 !important;
-        }
-        .stRadio > label {
-            font-size: 1rem;
-            font-weight: bold;
-            color: #34495E;
-        }
-        .footer {
-            text-align: center;
-            margin-top: 2rem;
-            padding-top: 1rem;
-            # border-top: 2px solid #00BAC6;
-            font-size: 0.9rem;
-            color: #95A5A6;
-        }
-    </style>
-""", unsafe_allow_html=True)
+
+# 💎 Feuille de style (lue une seule fois par processus)
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # 🚀 **Interface Streamlit**
 st.markdown("<h1 class='main-header'>AKA CARE</h1>", unsafe_allow_html=True)
@@ -780,21 +737,28 @@ with st.sidebar:
     model = st.selectbox("Modèle Groq :", ["mistral-saba-24b", "llama3-70b-8192", "llama3"], index=0)
     topic = st.text_input("Sujet du QCM :", "Insuffisance Rénale Chronique")
     number = st.number_input("Nombre de questions :", min_value=0, max_value=20, value=5, step=1)
+    use_corpus = st.checkbox("S'appuyer sur le corpus PubMed", value=True)
+    variant = st.selectbox("Format du prompt :", list(PROMPT_TEMPLATES), index=list(PROMPT_TEMPLATES).index(DEFAULT_VARIANT))
+    debug = st.checkbox("Mode débogage", value=DEBUG)
 
     if st.button("Générer le QCM", use_container_width=True):
         with st.spinner("Génération en cours..."):
-            quiz = generate_mcq(topic, number, model)
+            quiz = generate_mcq(topic, number, model, use_corpus=use_corpus, variant=variant, debug=debug)
         
         if isinstance(quiz, dict) and "error" in quiz:
             st.error(f"Erreur : {quiz['error']}")
         else:
-            st.session_state["quiz_data"] = quiz
-            st.session_state["quiz_submitted"] = False
-            st.session_state["user_answers"] = {}
-            st.rerun()
+            start_quiz(quiz, topic)
+
+    if st.button("Quiz adaptatif (banque de questions)", use_container_width=True):
+        quiz = select_bank_questions(number)
+        if quiz:
+            start_quiz(quiz, "Banque adaptative")
+        else:
+            st.warning("La banque ne contient pas encore de questions inédites pour vous.")
 
 if st.session_state["quiz_data"]:
-    st.markdown(f"### 📝 Niveau actuel : **{st.session_state['current_difficulty']}**")
+    st.markdown(f"### 📝 Niveau actuel : **{get_store().get_stats(LEARNER_ID)['current_difficulty']}**")
 
     # Afficher le quiz interactif
     display_interactive_quiz(st.session_state["quiz_data"])
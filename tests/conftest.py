@@ -0,0 +1,43 @@
+import pytest
+import torch
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+from qcm_chain import template
+
+CORPUS = [
+    template,
+    "La créatinine sérique permet d'estimer le débit de filtration glomérulaire.",
+    "Le diabète est la première cause d'insuffisance rénale chronique terminale.",
+    "L'hypertension artérielle accélère la progression de la maladie rénale.",
+]
+
+
+def _tokenizer():
+    tok = Tokenizer(models.BPE(unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(vocab_size=400, special_tokens=["<unk>", "<s>", "</s>"],
+                                  initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    tok.train_from_iterator(CORPUS, trainer)
+    return PreTrainedTokenizerFast(tokenizer_object=tok, unk_token="<unk>", bos_token="<s>", eos_token="</s>")
+
+
+@pytest.fixture(scope="session")
+def tiny_llama(tmp_path_factory):
+    """(modèle cible, brouillon) : LLaMA minuscules aléatoires ; le brouillon est la première couche de la cible."""
+    root = tmp_path_factory.mktemp("tiny_llama")
+    tokenizer = _tokenizer()
+    config = dict(vocab_size=len(tokenizer), hidden_size=64, intermediate_size=128, num_attention_heads=4,
+                  num_key_value_heads=4, max_position_embeddings=2048, bos_token_id=1, eos_token_id=2,
+                  tie_word_embeddings=False)
+    torch.manual_seed(0)
+    target = LlamaForCausalLM(LlamaConfig(num_hidden_layers=4, **config))
+    draft = LlamaForCausalLM(LlamaConfig(num_hidden_layers=1, **config))
+    draft.load_state_dict(target.state_dict(), strict=False)
+    paths = []
+    for name, model in (("target", target), ("draft", draft)):
+        model.save_pretrained(root / name)
+        tokenizer.save_pretrained(root / name)
+        paths.append(str(root / name))
+    return tuple(paths)
@@ -0,0 +1,46 @@
+import pytest
+import torch
+from peft import LoraConfig, get_peft_model
+from transformers import LlamaForCausalLM
+
+from qa_llm import QaLlm
+from qcm_chain import PROMPT, PROMPT_PREFIX
+
+PROMPT_TEXT = PROMPT.format(text="La créatinine sérique permet d'estimer le débit de filtration glomérulaire.")
+
+
+@pytest.fixture(scope="module")
+def adapter_path(tiny_llama, tmp_path_factory):
+    """Adaptateur LoRA aux poids aléatoires (non nuls) : il change la sortie du modèle."""
+    target, _ = tiny_llama
+    torch.manual_seed(1)
+    config = LoraConfig(r=4, lora_alpha=64, target_modules=["q_proj", "v_proj"], init_lora_weights=False)
+    model = get_peft_model(LlamaForCausalLM.from_pretrained(target), config)
+    path = tmp_path_factory.mktemp("adapters") / "qcm-lora"
+    model.save_pretrained(path)
+    return str(path)
+
+
+def _generate(qa_llm):
+    llm = qa_llm.get_llm()
+    llm.pipeline_kwargs = {"do_sample": False, "max_new_tokens": 16, "return_full_text": False}
+    return llm.invoke(PROMPT_TEXT)
+
+
+@pytest.mark.parametrize("prefix", [None, PROMPT_PREFIX])
+def test_adapter_is_per_instance(tiny_llama, adapter_path, prefix):
+    target, _ = tiny_llama
+    base = QaLlm(target, prefix=prefix)
+    reference = _generate(base)
+
+    tuned = QaLlm(target, adapter=adapter_path, prefix=prefix)
+    tuned_output = _generate(tuned)
+    assert tuned_output != reference
+
+    # Instances alternées sur le même modèle de base : chacune garde ses poids
+    assert _generate(base) == reference
+    assert _generate(tuned) == tuned_output
+    assert _generate(QaLlm(target, prefix=prefix)) == reference
+
+    tuned.unload_adapter()
+    assert _generate(tuned) == reference
@@ -0,0 +1,39 @@
+import pytest
+
+from retrieval import attach_citations
+
+PMIDS = ["31234567", "32345678"]
+
+
+@pytest.mark.parametrize("sources, expected", [
+    (["PMID 31234567"], ["31234567"]),
+    ("31234567", ["31234567"]),
+    ("PMID 32345678, PMID 31234567", ["32345678", "31234567"]),
+    (31234567, ["31234567"]),
+    (["31234567", "31234567"], ["31234567"]),
+])
+def test_cites_only_retrieved_pmids(sources, expected):
+    quiz = {"question1": {"question": "?", "explication": "Parce que.", "sources": sources}}
+    q = attach_citations(quiz, PMIDS)["question1"]
+    assert q["sources"] == expected
+    assert q["explication"] == "Parce que. (Sources : " + ", ".join(f"PMID {p}" for p in expected) + ")"
+
+
+@pytest.mark.parametrize("sources", [None, [], "aucune", "3", ["99999999"]])
+def test_no_retrieved_pmid_leaves_citations_empty(sources):
+    quiz = {"question1": {"question": "?", "explication": "Parce que.", "sources": sources}}
+    q = attach_citations(quiz, PMIDS)["question1"]
+    assert q["sources"] == []
+    assert q["explication"] == "Parce que."
+
+
+@pytest.mark.parametrize("explanation, sources, expected", [
+    ("Parce que (PMID 99999999).", [], "Parce que."),
+    ("PMID 99999999 montre que le DFG baisse.", ["99999999"], "montre que le DFG baisse."),
+    ("Le DFG baisse (PMID 99999999).", ["31234567"], "Le DFG baisse. (Sources : PMID 31234567)"),
+    ("Le DFG baisse (PMID 31234567, 99999999).", ["31234567"], "Le DFG baisse (PMID 31234567)."),
+    ("Le DFG baisse (PMID 31234567).", ["31234567"], "Le DFG baisse (PMID 31234567)."),
+])
+def test_hallucinated_pmids_are_removed_from_explanation(explanation, sources, expected):
+    quiz = {"question1": {"question": "?", "explication": explanation, "sources": sources}}
+    assert attach_citations(quiz, PMIDS)["question1"]["explication"] == expected
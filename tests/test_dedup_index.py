@@ -0,0 +1,58 @@
+import pytest
+
+from quiz_bank_file import QuizBankWriter
+
+
+def _q(question, answer, distractor="Aucune"):
+    return {"question": question, "options": {"a": answer, "b": distractor}, "answer": "a"}
+
+
+MERGED = [
+    (_q("Quel marqueur sanguin permet d'estimer le débit de filtration glomérulaire ?", "La créatinine"),
+     _q("Quel marqueur sanguin permet-il d'estimer le débit de filtration glomérulaire ?", "La créatinine")),
+    (_q("Quelle est la première cause d'insuffisance rénale chronique terminale ?", "Le diabète"),
+     _q("Quelles sont les premières causes d'insuffisance rénale chronique terminale ?", "le Diabète.")),
+    (_q("Quel stade de MRC correspond à un DFG inférieur à 15 mL/min ?", "Stade 5"),
+     _q("À quel stade de MRC correspond un DFG inférieur à 15 mL/min ?", "Stade 5", "Stade 3")),
+]
+
+DISTINCT = [
+    (_q("Quel stade de MRC correspond à un DFG inférieur à 15 mL/min ?", "Stade 5"),
+     _q("Quel stade de MRC correspond à un DFG inférieur à 30 mL/min ?", "Stade 4")),
+    (_q("Un DFG inférieur à 60 mL/min pendant 3 mois définit-il la MRC ?", "Oui"),
+     _q("Un DFG inférieur à 60 mL/min pendant 1 mois définit-il la MRC ?", "Oui")),
+    (_q("Quelle est la première cause d'insuffisance rénale chronique terminale ?", "Le diabète"),
+     _q("Quelle est la deuxième cause d'insuffisance rénale chronique terminale ?", "L'hypertension artérielle")),
+    (_q("Faut-il surveiller la kaliémie chez le diabétique ?", "Oui", "Non"),
+     _q("Faut-il surveiller la kaliémie chez l'enfant ?", "Oui", "Non")),
+    (_q("Faut-il surveiller la créatinine au stade 5 ?", "Oui", "Non"),
+     _q("Faut-il surveiller la kaliémie au stade 5 ?", "Oui", "Non")),
+    (_q("La dialyse est-elle indiquée au stade 5 ?", "Oui", "Non"),
+     _q("La dialyse n'est-elle pas indiquée au stade 5 ?", "Oui", "Non")),
+    (_q("Quel est le traitement de première intention de l'hyperkaliémie sévère ?", "Le gluconate de calcium"),
+     _q("Quel est le traitement de première intention de l'acidose métabolique ?", "Le bicarbonate de sodium")),
+]
+
+
+def _ids(tmp_path, records):
+    with QuizBankWriter(str(tmp_path / "bank.qbk")) as writer:
+        return [writer.append(record) for record in records], writer
+
+
+@pytest.mark.parametrize("first, second", MERGED)
+def test_rewording_with_same_answer_is_merged(tmp_path, first, second):
+    ids, writer = _ids(tmp_path, [first, second])
+    assert ids == [0, 0] and writer.duplicates == 1
+
+
+@pytest.mark.parametrize("first, second", DISTINCT)
+def test_distinct_questions_are_kept(tmp_path, first, second):
+    ids, writer = _ids(tmp_path, [first, second])
+    assert ids == [0, 1] and writer.duplicates == 0
+
+
+def test_duplicates_are_found_after_reopening(tmp_path):
+    _ids(tmp_path, [first for first, _ in MERGED])
+    with QuizBankWriter(str(tmp_path / "bank.qbk")) as writer:
+        assert [writer.append(second) for _, second in MERGED] == [0, 1, 2]
+        assert writer.append(DISTINCT[0][1]) == 3
@@ -0,0 +1,33 @@
+import os
+import sys
+
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "Collect_Dataset_Kidney_Disease"))
+from generate_qcm_with_llama2 import generate_qcms  # noqa: E402
+
+INSTRUCTION = "Génère une question à choix multiples sur ce sujet."
+LONG_ABSTRACT = " ".join(["Le diabète est la première cause d'insuffisance rénale chronique terminale."] * 40)
+
+
+def test_long_context_is_cut_before_the_instruction(tiny_llama):
+    target, _ = tiny_llama
+    model, tokenizer = AutoModelForCausalLM.from_pretrained(target), AutoTokenizer.from_pretrained(target)
+    tokenizer.pad_token = tokenizer.unk_token
+    prompts = []
+    generate = model.generate
+
+    def recording_generate(**kwargs):
+        prompts.extend(kwargs["input_ids"])
+        return generate(**kwargs)
+
+    model.generate = recording_generate
+    contexts = [LONG_ABSTRACT, "La créatinine sérique permet d'estimer le débit de filtration glomérulaire."]
+    results = dict(generate_qcms(contexts, model, tokenizer, max_new_tokens=4, max_prompt_length=64))
+
+    assert sorted(results) == [0, 1]
+    for ids in prompts:
+        ids = ids[ids != tokenizer.pad_token_id]
+        assert len(ids) <= 64
+        text = tokenizer.decode(ids, skip_special_tokens=True)
+        assert text.startswith("Contexte:") and text.endswith(INSTRUCTION)
@@ -0,0 +1,35 @@
+import time
+
+from learner_store import LearnerStore
+
+QUIZ = {
+    "question1": {"question": "Marqueur du DFG ?", "options": {"a": "Créatinine", "b": "Glucose"}, "correct": "a"},
+    "question2": {"question": "Première cause d'IRC ?", "options": {"a": "Diabète", "b": "Grippe"}, "correct": "a"},
+}
+
+
+def test_stats_see_writes_from_another_process(tmp_path):
+    path = str(tmp_path / "learners.db")
+    reader, writer = LearnerStore(path), LearnerStore(path)  # Deux processus Streamlit
+    assert reader.get_stats("alice")["quiz_count"] == 0
+
+    writer.record_attempt("alice", QUIZ, {"question1": "a", "question2": "b"})
+    writer.set_difficulty("alice", "Difficile")
+
+    assert reader.get_stats("alice") == {
+        "quiz_count": 1, "questions": 2, "correct": 1, "current_difficulty": "Difficile",
+    }
+
+
+def test_idle_session_draft_reaches_other_processes(tmp_path):
+    path = str(tmp_path / "learners.db")
+    writer, replica = LearnerStore(path, flush_interval=0.2), LearnerStore(path)
+    writer.save_draft("alice", QUIZ, {"question1": "a"}, topic="IRC")
+    assert replica.load_draft("alice") is None  # Encore en attente
+
+    # Aucun autre enregistrement : la minuterie écrit le brouillon
+    deadline = time.monotonic() + 5
+    while replica.load_draft("alice") is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert replica.load_draft("alice") == (QUIZ, {"question1": "a"}, "IRC", False)
+    assert writer._timer is None
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from callback import MetricsRegistry
+from llm_router import BackendError, FakeBackend, GroqBackend, OllamaBackend, RateLimited, Router
+
+
+async def _slow_ollama(events):
+    async def handler(request):
+        events.append("début")
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            events.append("annulée")  # Le client a fermé la connexion
+            raise
+        return web.json_response({"response": "trop tard"})
+
+    app = web.Application(handler_args={"handler_cancellation": True})
+    app.router.add_post("/api/generate", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/generate"
+
+
+def test_losing_hedge_aborts_http_request():
+    async def scenario():
+        events = []
+        runner, url = await _slow_ollama(events)
+        try:
+            slow = OllamaBackend(url=url, timeout=10)
+            fast = FakeBackend("rapide", latency=0.05, jitter=0.0, response="ok")
+            router = Router([slow, fast], hedge_after=0.1, registry=MetricsRegistry())
+            router.stats[fast.name].ewma = 10.0  # Force Ollama en premier choix
+            text = await router.generate("prompt")
+            assert router.stats[slow.name].inflight == 0
+            await asyncio.sleep(0.2)
+            return text, events
+        finally:
+            await runner.cleanup()
+
+    text, events = asyncio.run(scenario())
+    assert text == "ok"
+    assert events == ["début", "annulée"]
+
+
+def test_quota_limited_backend_is_never_a_hedge_target():
+    async def scenario():
+        slow = FakeBackend("lent", latency=0.3, jitter=0.0)
+        groq = GroqBackend()
+        registry = MetricsRegistry()
+        router = Router([slow, groq], hedge_after=0.05, registry=registry)
+        router.stats[groq.name].ewma = 10.0
+        return await router.generate("prompt"), registry, router
+
+    text, registry, router = asyncio.run(scenario())
+    assert text == "{}"
+    assert not registry.counters
+    assert router.stats["groq:mistral-saba-24b"].inflight == 0
+
+
+class Flaky(FakeBackend):
+    """Échoue (`RateLimited` ou `BackendError`) aux `failures` premiers appels."""
+
+    def __init__(self, failures, error, **kwargs):
+        super().__init__("seul", latency=0.01, jitter=0.0, response="ok", **kwargs)
+        self.failures, self.error, self.calls_made = failures, error, 0
+
+    async def complete(self, prompt):
+        self.calls_made += 1
+        if self.calls_made <= self.failures:
+            raise self.error
+        return await super().complete(prompt)
+
+
+def test_single_backend_is_retried_with_backoff():
+    for error in (RateLimited("429", retry_after=0.05), BackendError("503")):
+        backend = Flaky(2, error)
+        router = Router([backend], retry_wait=0.01, registry=MetricsRegistry())
+        assert router.generate_sync("prompt") == "ok"
+        assert backend.calls_made == 3
+
+
+def test_failure_reason_is_surfaced():
+    backend = Flaky(10, BackendError("Groq HTTP 503"))
+    router = Router([backend], retry_wait=0.01, registry=MetricsRegistry())
+    with pytest.raises(BackendError, match="Groq HTTP 503"):
+        router.generate_sync("prompt")
+
+
+def test_long_pause_fails_fast_with_its_reason():
+    backend = Flaky(1, RateLimited("429", retry_after=120))
+    router = Router([backend], registry=MetricsRegistry())
+    with pytest.raises(BackendError, match="en pause encore"):
+        router.generate_sync("prompt")
+    assert backend.calls_made == 1
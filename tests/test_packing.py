@@ -0,0 +1,55 @@
+import os
+import sys
+
+import torch
+from datasets import Dataset
+from transformers import AutoModelForCausalLM
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "Collect_Dataset_Kidney_Disease"))
+from generate_qcm_with_llama2 import causal_lm_collator, pack_examples  # noqa: E402
+
+EXAMPLES = [[5, 17, 42, 8, 99, 2], [31, 7, 64, 2], [11, 12, 13, 14, 15, 16, 2]]
+
+
+def _packed_batch():
+    dataset = Dataset.from_dict({"input_ids": EXAMPLES, "length": [len(ids) for ids in EXAMPLES]})
+    packed = pack_examples(dataset, max_length=32)
+    assert len(packed) == 1
+    return packed[0], causal_lm_collator(pad_token_id=0)([packed[0]])
+
+
+def test_packed_batch_has_no_attention_mask():
+    row, batch = _packed_batch()
+    assert "attention_mask" not in batch
+    assert batch["use_cache"] is False
+    assert batch["position_ids"][0, :len(row["input_ids"])].tolist() == row["position_ids"]
+    assert (batch["labels"][0, len(row["input_ids"]):] == -100).all()
+
+
+def test_packed_segment_starts_are_not_targets():
+    # Sinon, après décalage, le dernier token d'un exemple apprend le premier du suivant
+    row, batch = _packed_batch()
+    n = len(row["input_ids"])
+    labels = batch["labels"][0, :n].tolist()
+    starts = [i for i, p in enumerate(row["position_ids"]) if p == 0]
+    assert starts == [0, 7, 13]
+    assert [labels[i] for i in starts] == [-100] * len(starts)
+    assert [t for i, t in enumerate(labels) if i not in starts] == \
+        [t for i, t in enumerate(row["input_ids"]) if i not in starts]
+
+
+def test_no_attention_across_packed_segments(tiny_llama):
+    model = AutoModelForCausalLM.from_pretrained(tiny_llama[0], attention_dropout=0.0)
+    row, batch = _packed_batch()
+    model.train()  # Comme dans `Trainer` : le lot du collator tel quel
+    with torch.no_grad():
+        packed_logits = model(**batch).logits[0]
+    model.eval()
+
+    # Chaque segment regroupé doit donner exactement les logits de l'exemple seul
+    boundaries = [i for i, p in enumerate(row["position_ids"]) if p == 0] + [len(row["input_ids"])]
+    for start, end in zip(boundaries, boundaries[1:]):
+        ids = torch.tensor([row["input_ids"][start:end]])
+        with torch.no_grad():
+            alone = model(input_ids=ids).logits[0]
+        torch.testing.assert_close(packed_logits[start:end], alone, rtol=1e-4, atol=1e-4)
@@ -0,0 +1,37 @@
+import pytest
+
+from qa_llm import QaLlm
+from qcm_chain import PROMPT, PROMPT_PREFIX
+
+ABSTRACTS = [
+    "La créatinine sérique permet d'estimer le débit de filtration glomérulaire.",
+    "Le diabète est la première cause d'insuffisance rénale chronique terminale.",
+    "L'hypertension artérielle accélère la progression de la maladie rénale.",
+]
+
+
+def _generate(qa_llm, prompt):
+    llm = qa_llm.get_llm()
+    llm.pipeline_kwargs = {"do_sample": False, "max_new_tokens": 24, "return_full_text": False}
+    return llm.invoke(prompt)
+
+
+@pytest.mark.parametrize("abstract", ABSTRACTS)
+def test_prefix_cache_keeps_greedy_output(tiny_llama, abstract):
+    target, _ = tiny_llama
+    prompt = PROMPT.format(text=abstract)
+    assert _generate(QaLlm(target, prefix=PROMPT_PREFIX), prompt) == _generate(QaLlm(target), prompt)
+
+
+@pytest.mark.parametrize("abstract", ABSTRACTS)
+def test_prefix_cache_with_draft_keeps_greedy_output(tiny_llama, abstract):
+    target, draft = tiny_llama
+    prompt = PROMPT.format(text=abstract)
+    reference = _generate(QaLlm(target), prompt)
+    speculative = QaLlm(target, prefix=PROMPT_PREFIX, draft_model=draft)
+    assert speculative.prefix_cache is None
+    assert _generate(speculative, prompt) == reference
+    # Même avec un cache attaché au pipeline, il est ignoré en présence du brouillon
+    speculative.get_llm().pipeline.prefix_cache = QaLlm(target, prefix=PROMPT_PREFIX).prefix_cache
+    assert _generate(speculative, prompt) == reference
+    assert speculative.speculation.accepted > 0
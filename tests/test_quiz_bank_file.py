@@ -0,0 +1,135 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import quiz_bank_file
+from quiz_bank_file import (
+    ENTRY_DTYPE, HEADER_SIZE, SLOT_OFFSETS, QuizBankReader, QuizBankWriter, append_quiz,
+)
+
+
+def _q(i, topic="IRC", difficulty="Moyen", pmid=None):
+    record = {"question": f"Question numéro {i} sur la néphrologie ?", "options": {"a": f"Réponse {i}", "b": "Aucune"},
+              "answer": "a", "topic": topic, "difficulty": difficulty}
+    if pmid:
+        record["pmid"] = pmid
+    return record
+
+
+def _bank(tmp_path, *batches):
+    """Banque validée une fois par lot ; renvoie son chemin."""
+    path = str(tmp_path / "bank.qbk")
+    with QuizBankWriter(path) as writer:
+        for batch in batches:
+            for record in batch:
+                writer.append(record)
+            writer.commit()
+    return path
+
+
+def test_torn_slot_keeps_previous_commit(tmp_path):
+    path = _bank(tmp_path, [_q(0), _q(1)], [_q(2)])
+    # La deuxième validation (génération 2) a réécrit l'emplacement 0 : on l'abîme
+    with open(path, "r+b") as f:
+        f.seek(SLOT_OFFSETS[0] + 8)
+        f.write(b"\xff")
+
+    reader = QuizBankReader(path)
+    assert (reader.generation, len(reader)) == (1, 2)
+    assert [q["question"] for q in reader] == [_q(0)["question"], _q(1)["question"]]
+    reader.close()
+
+    with QuizBankWriter(path) as writer:
+        assert writer.count == 2
+        assert writer.append(_q(3)) == 2
+    assert QuizBankReader(path)[2]["question"] == _q(3)["question"]
+
+
+def test_uncommitted_tail_is_ignored_then_truncated(tmp_path):
+    path = _bank(tmp_path, [_q(0), _q(1)])
+    sizes = [os.path.getsize(p) for p in (path, f"{path}.data", f"{path}.dedup")]
+    # Validation interrompue : données, entrées et empreintes écrites, en-tête pas encore publié
+    for p, garbage in ((path, b"\x01" * ENTRY_DTYPE.itemsize), (f"{path}.data", b'{"question":'),
+                       (f"{path}.dedup", b"\x02" * 16)):
+        with open(p, "ab") as f:
+            f.write(garbage)
+
+    reader = QuizBankReader(path)
+    assert len(reader) == 2 and reader[1]["question"] == _q(1)["question"]
+    with pytest.raises(IndexError):
+        reader[2]
+
+    with QuizBankWriter(path) as writer:
+        assert [os.path.getsize(p) for p in (path, f"{path}.data", f"{path}.dedup")] == sizes
+        writer.append(_q(2))
+    reader.refresh()
+    assert len(reader) == 3 and reader[2]["question"] == _q(2)["question"]
+    assert os.path.getsize(path) == HEADER_SIZE + 3 * ENTRY_DTYPE.itemsize
+
+
+def test_exception_discards_pending_questions(tmp_path):
+    path = _bank(tmp_path, [_q(0)])
+    with pytest.raises(RuntimeError):
+        with QuizBankWriter(path) as writer:
+            writer.append(_q(1))
+            raise RuntimeError
+    with QuizBankWriter(path) as writer:
+        assert writer.count == 1
+        assert writer.append(_q(1)) == 1  # Plus dans l'index de déduplication
+
+
+@pytest.mark.skipif(quiz_bank_file.fcntl is None, reason="verrou flock indisponible")
+def test_second_writer_never_truncates_a_new_bank(tmp_path, monkeypatch):
+    path = str(tmp_path / "bank.qbk")
+    first = QuizBankWriter(path)
+    first.append(_q(0))
+    first.commit()
+    # Le second écrivain a vu la banque absente juste avant que le premier ne la crée
+    exists = os.path.exists
+    monkeypatch.setattr(os.path, "exists", lambda p: False if str(p).startswith(path) else exists(p))
+    opened = []
+    thread = threading.Thread(target=lambda: opened.append(QuizBankWriter(path)))
+    thread.start()
+    thread.join(0.2)
+    assert thread.is_alive()  # Bloqué par le verrou du premier
+    assert len(QuizBankReader(path)) == 1
+    first.close()
+    thread.join(5)
+    second, = opened
+    assert second.count == 1
+    second.close()
+
+
+def test_ids_by_indexed_fields(tmp_path):
+    path = _bank(tmp_path, [
+        _q(0, pmid="111"), _q(1, difficulty="Difficile", pmid="222"),
+        _q(2, topic="Dialyse", pmid="111"), _q(3, topic="irc "),
+    ])
+    reader = QuizBankReader(path)
+    assert reader.ids(topic="IRC").tolist() == [0, 1, 3]  # Casse et espaces ignorés
+    assert reader.ids(topic="IRC", difficulty="Moyen").tolist() == [0, 3]
+    assert reader.ids(pmid="111").tolist() == [0, 2]
+    assert reader.ids(pmid="999").tolist() == []
+    assert reader.ids().tolist() == [0, 1, 2, 3]
+    assert reader.values("topic") == {"IRC": 3, "Dialyse": 1}
+    with pytest.raises(ValueError):
+        reader.ids(question="x")
+
+
+def test_append_quiz_reuses_the_dedup_index(tmp_path, monkeypatch):
+    path = str(tmp_path / "bank.qbk")
+    quiz = lambda *ids: {str(i): {"question": _q(i)["question"], "options": _q(i)["options"], "correct": "a"}
+                         for i in ids}
+    assert append_quiz(path, quiz(0, 1)) == [0, 1]
+    # Question validée par un autre processus, sans empreinte dans bank.qbk.dedup
+    with QuizBankWriter(path, dedup=False) as other:
+        other.append(_q(2))
+
+    def no_rebuild(self, fingerprints):
+        raise AssertionError("index reconstruit")
+
+    monkeypatch.setattr(quiz_bank_file.DedupIndex, "rebuild", no_rebuild)
+    assert append_quiz(path, quiz(1, 2, 3)) == [1, 2, 3]
+    assert len(np.fromfile(f"{path}.dedup", dtype=quiz_bank_file.FINGERPRINT_DTYPE)) == 4
@@ -0,0 +1,35 @@
+import os
+import sys
+import threading
+
+import pytest
+
+pytest.importorskip("bs4")
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "Collect_Dataset_Kidney_Disease"))
+from extract_questionnaires_from_articles import MedicalScraper, _result  # noqa: E402
+
+
+def test_timed_out_source_keeps_streamed_articles():
+    scraper = MedicalScraper(mode="browser", timeouts={"INSERM": 0.3})
+    finished = threading.Event()
+
+    def slow_page(search_url, selector, source, sink=None, cancelled=None):
+        # Deux articles lus, puis la page reste bloquée jusqu'à l'abandon de la source
+        articles = [_result(source, f"Article numéro {i} sur la maladie rénale chronique", "Résumé",
+                            f"https://www.inserm.fr/article-{i}/") for i in range(3)]
+        for article in articles[:2]:
+            sink([article])
+        cancelled.wait(5)
+        sink(articles[2:])  # Trop tard : ignoré
+        finished.set()
+        return articles
+
+    scraper._scrape_results = slow_page
+    df = scraper.collect_all_sources("rein", sources=["INSERM"])
+
+    assert scraper.report["INSERM"]["statut"] == "délai dépassé"
+    assert scraper.report["INSERM"]["articles"] == 2
+    assert df["url"].tolist() == ["https://www.inserm.fr/article-0/", "https://www.inserm.fr/article-1/"]
+    scraper.close_driver()
+    assert finished.is_set()  # Les navigateurs ne sont fermés qu'après la fin du thread
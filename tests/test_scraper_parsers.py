@@ -0,0 +1,42 @@
+import glob
+import os
+import sys
+from urllib.parse import urlparse
+
+import pytest
+
+pytest.importorskip("bs4")
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "Collect_Dataset_Kidney_Disease"))
+from extract_questionnaires_from_articles import FIXTURES_DIR, SEARCH_PAGES, parse_search_results  # noqa: E402
+
+# Pages de résultats de fixtures/. Les pages actuelles ont été écrites à la main d'après
+# les sélecteurs : ce test ne fait que vérifier l'analyse sur ces sélecteurs, et ne dit
+# rien des sites réels tant qu'elles n'ont pas été remplacées par des pages enregistrées
+# avec `extract_questionnaires_from_articles.py --save-html`.
+PAGES = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*_*.html")))
+
+
+def _source(path):
+    return os.path.basename(path).split("_")[0].upper()
+
+
+def test_every_source_has_a_saved_page():
+    assert {_source(path) for path in PAGES} >= set(SEARCH_PAGES)
+
+
+@pytest.mark.parametrize("path", PAGES, ids=os.path.basename)
+def test_saved_page_yields_complete_articles(path):
+    source = _source(path)
+    with open(path, encoding="utf-8") as f:
+        articles = parse_search_results(f.read(), source)
+
+    selector = SEARCH_PAGES[source]["selector"]
+    assert articles, f"aucun résultat dans {path} : le sélecteur {selector!r} a-t-il changé ?"
+    site = urlparse(SEARCH_PAGES[source]["url"]).netloc
+    for article in articles:
+        assert article["source"] == source
+        assert article["title"] and article["abstract"]
+        assert "\n" not in article["title"] and "  " not in article["abstract"]
+        assert urlparse(article["url"]).netloc == site  # Liens relatifs rendus absolus
+    assert len({article["url"] for article in articles}) == len(articles)
@@ -0,0 +1,54 @@
+import asyncio
+import importlib
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter  # noqa: E402
+
+ABSTRACT = "La créatinine sérique permet d'estimer le débit de filtration glomérulaire."
+
+
+@pytest.fixture
+def traced(tiny_llama, monkeypatch):
+    """(text_to_quizz, exportateur) : le pipeline de production sur le LLaMA minuscule, spans en mémoire."""
+    monkeypatch.setenv("QUIZ_MODEL", tiny_llama[0])
+    text_to_quizz = importlib.import_module("text_to_quizz")
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(text_to_quizz.qa_llm.metrics, "tracer", provider.get_tracer("test"))
+    monkeypatch.setattr(text_to_quizz.qa_llm.llm, "pipeline_kwargs", {"max_new_tokens": 8})
+    return text_to_quizz, exporter
+
+
+def _by_name(exporter):
+    spans = {}
+    for span in exporter.get_finished_spans():
+        spans.setdefault(span.name, []).append(span)
+    return spans
+
+
+def test_txt_to_quizz_nests_llm_and_parse_under_chain(traced):
+    text_to_quizz, exporter = traced
+    asyncio.run(text_to_quizz.txt_to_quizz([ABSTRACT]))
+
+    spans = _by_name(exporter)
+    assert sorted(spans) == ["chain", "llm", "parse"]
+    [chain], [llm], [parse] = spans["chain"], spans["llm"], spans["parse"]
+    assert chain.parent is None
+    assert llm.parent.span_id == chain.context.span_id
+    assert parse.parent.span_id == chain.context.span_id
+    assert len({span.context.trace_id for span in (chain, llm, parse)}) == 1
+
+
+def test_chain_predict_nests_llm_under_chain(traced):
+    text_to_quizz, exporter = traced
+    asyncio.run(text_to_quizz.qa_chain.apredict(text=ABSTRACT))
+
+    spans = _by_name(exporter)
+    [chain], [llm] = spans["chain"], spans["llm"]
+    assert chain.parent is None
+    assert llm.parent.span_id == chain.context.span_id
@@ -1,6 +1,11 @@
+import argparse
 import asyncio
-from quizz_generator import generate_quizz
-from clean_text import list_abstract_fr_clean
+
+from clean_text import clean_text, load_clean_articles
+from profiling import NULL_PROFILER, PROFILERS, PipelineProfiler
+from quizz_generator import chain_run, generate_from_prompts, parse_output, qa_chain, qa_llm
+
+DATA_PATH = "Collect_Dataset_Kidney_Disease/articles_maladies_renales.csv"
 
 
 def transform(input_list):
@@ -29,20 +34,55 @@ def transform(input_list):
 
 
 
-async def txt_to_quizz(content):
+async def txt_to_quizz(content, profiler=NULL_PROFILER):
     """
-    Génère un quiz à partir d'un texte donné.
+    Génère un quiz à partir d'une liste de textes, étape par étape :
+    nettoyage → prompt → génération → parsing → transformation.
     """
-    quizz = await generate_quizz(content)
-    
-    if quizz:
-        transformed_quizz = transform(quizz)
-        return transformed_quizz
+    with profiler.stage("clean"):
+        texts = [clean_text(text) for text in content]
+    with profiler.stage("prompt"):
+        prompts = [qa_chain.prompt.format(text=text) for text in texts]
+    # Spans imbriqués : chaîne → LLM et chaîne → parsing
+    with chain_run("txt_to_quizz", texts=len(texts)) as run:
+        with profiler.stage("generate", trace=True):
+            outputs = await generate_from_prompts(prompts, inline=profiler.inline, callbacks=run.get_child())
+        with profiler.stage("parse"), qa_llm.metrics.stage("parse", parent_run_id=run.run_id):
+            quizz = [parsed for parsed in map(parse_output, outputs) if parsed]
+    with profiler.stage("transform"):
+        return transform(quizz) if quizz else ''
+
+
+async def run_batches(abstracts, batch_size, profiler=NULL_PROFILER):
+    results = []
+    for start in range(0, len(abstracts), batch_size):
+        with profiler.batch():
+            results.extend(await txt_to_quizz(abstracts[start:start + batch_size], profiler) or [])
+    return results
 
-    return ''
 
 # Exécution principale
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génération de quiz à partir des abstracts (QUIZ_MODEL pour changer de modèle)")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("-n", "--number", type=int, default=5, help="Nombre d'abstracts")
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--profile", action="store_true", help="Chronométrer les étapes et profiler les lots")
+    parser.add_argument("--profile-dir", default=".profile")
+    parser.add_argument("--profiler", choices=PROFILERS, default="cprofile")
+    parser.add_argument("--sample-every", type=int, default=1, help="Profiler côté Python un lot sur N")
+    parser.add_argument("--torch-trace", action="store_true", help="Trace torch.profiler de l'étape de génération")
+    args = parser.parse_args()
+
+    abstracts = load_clean_articles(args.data)["abstract_fr_clean"].head(args.number).tolist()
+    profiler = NULL_PROFILER
+    if args.profile:
+        profiler = PipelineProfiler(args.profile_dir, args.sample_every, args.profiler, args.torch_trace)
+
     # On utilise asyncio pour exécuter l'appel au modèle LLM
-    quiz_result = asyncio.run(txt_to_quizz(list_abstract_fr_clean[:5]))  # On teste avec 5 abstracts
-    print(quiz_result)
\ No newline at end of file
+    quiz_result = asyncio.run(run_batches(abstracts, args.batch_size, profiler))
+    print(quiz_result)
+
+    if args.profile:
+        print(profiler.summary())
+        print(f"✅ Profils et récapitulatif écrits dans {profiler.write_summary()}")